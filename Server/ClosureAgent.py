@@ -40,8 +40,16 @@ async def handle_input() -> None:
 
 
 async def collect_result(_agent: ClosureContext, message: AgentResponse, ctx: MessageContext) -> None:
+    if message.end_of_turn:
+        # 本轮结束才允许下一次输入
+        print()
+        input_event.set()
+        return
     context=message.context
     for msg in context:
+        if message.chunk:
+            print(msg.content, end="", flush=True)
+            continue
         if msg.type=="UserMessage":
             print(f"{str(msg.source).center(60, '=')}\n{msg.content}\n")
         if msg.type == 'AssistantMessage':
@@ -56,8 +64,6 @@ async def collect_result(_agent: ClosureContext, message: AgentResponse, ctx: Me
         else:
             print(f"{Fore.RED}未知消息类型: {msg.type}\n")
 
-    input_event.set()
-
 
 
 
@@ -1,4 +1,4 @@
-from typing import List
+from typing import List, Optional
 
 from autogen_core import (AgentId,
                           MessageContext,
@@ -11,6 +11,7 @@ from autogen_ext.models.openai import OpenAIChatCompletionClient
 from autogen_ext.tools.mcp import StdioMcpToolAdapter
 
 from .base import BaseAgent
+from .memory import ConversationMemory
 from .messages import (
     UserRequest,
     AgentResponse,
@@ -24,5 +25,6 @@ class Commander(BaseAgent):
                  system_message: str,
                  model_client: OpenAIChatCompletionClient,
                  tools: List[Tool] | list[StdioMcpToolAdapter],
-                 delegate_tools: List[Tool]) -> None:
-        super().__init__(description,model_client, system_message, tools, delegate_tools)
+                 delegate_tools: List[Tool],
+                 memory: Optional[ConversationMemory] = None) -> None:
+        super().__init__(description,model_client, system_message, tools, delegate_tools, memory=memory)
@@ -1,17 +1,20 @@
+import asyncio
 import json
-from typing import List, Tuple,Optional
+from typing import Dict, List, Tuple, Optional
 
 from autogen_core import (MessageContext,
                           RoutedAgent,
                           message_handler,
                           FunctionCall,
                           CancellationToken,
+                          TopicId,
                           )
 from autogen_core.models import (SystemMessage,
                                  LLMMessage,
                                  FunctionExecutionResult,
                                  FunctionExecutionResultMessage,
                                  AssistantMessage,
+                                 CreateResult,
                                  UserMessage,)
 from autogen_core.tools import Tool
 from autogen_ext.models.openai import OpenAIChatCompletionClient
@@ -22,7 +25,26 @@ from .messages import (
     TOPICS,
     USER_TOPIC_TYPE,
     MESSAGES,
+    session_topic_id,
 )
+from .memory import ConversationMemory, default_memory, transcript
+from Server.fast_api.common.config import config
+
+SUMMARY_PROMPT = """
+你负责压缩对话历史。请将已有摘要与新的对话记录合并为一份简洁的中文摘要，
+保留用户的身份、偏好、提到的院校与地区、已确认的结论和未完成的请求，省略寒暄与工具调用细节，不超过 300 字。
+"""
+
+# 未显式传入会话记忆时，同一进程内同类型的智能体共用一份（会话实例按会话创建，各自持有记忆会使淘汰失效）
+_shared_memories: Dict[str, ConversationMemory] = {}
+
+# 同一轮中的多个工具调用并发执行：并发上限与单个工具的超时（秒），可按工具名单独配置
+_tools_config = config.get('agent_tools', {})
+MAX_TOOL_CONCURRENCY = _tools_config.get('max_concurrency', 4)
+TOOL_TIMEOUT = _tools_config.get('tool_timeout', 30)
+TOOL_TIMEOUTS: Dict[str, float] = _tools_config.get('tool_timeouts', {})
+# 流式调用模型，文本边生成边发布给用户
+MODEL_STREAM = config.get('chat_stream', {}).get('model_stream', True)
 
 
 class BaseAgent(RoutedAgent):
@@ -32,7 +54,12 @@ class BaseAgent(RoutedAgent):
         model_client: OpenAIChatCompletionClient,
         system_message:str,
         tools: List[Tool] | list[StdioMcpToolAdapter] ,
-        delegate_tools:Optional[List[Tool]]
+        delegate_tools:Optional[List[Tool]],
+        max_tool_concurrency: int = MAX_TOOL_CONCURRENCY,
+        tool_timeout: float = TOOL_TIMEOUT,
+        tool_timeouts: Optional[Dict[str, float]] = None,
+        memory: Optional[ConversationMemory] = None,
+        stream: bool = MODEL_STREAM,
     ) -> None:
         super().__init__(description=description)
         self._model_client = model_client
@@ -41,8 +68,16 @@ class BaseAgent(RoutedAgent):
         self._tool_schema = [tool.schema for tool in tools]
         self._delegate_tools = dict([(tool.name, tool) for tool in delegate_tools])
         self._delegate_tool_schema = [tool.schema for tool in delegate_tools]
-        self._session: List[LLMMessage] = []
-        self._session.append(SystemMessage(content=system_message))
+        # 会话历史按会话 ID（主题 source）分别保存在同类型智能体共用的记忆中，长度有上限，旧的轮次滚动合并为摘要
+        if memory is None:
+            memory = _shared_memories.get(self.id.type)
+            if memory is None:
+                memory = _shared_memories[self.id.type] = default_memory()
+        self._memory = memory
+        self._tool_semaphore = asyncio.Semaphore(max(1, max_tool_concurrency))
+        self._tool_timeout = tool_timeout
+        self._tool_timeouts = TOOL_TIMEOUTS if tool_timeouts is None else tool_timeouts
+        self._stream = stream
 
     async def _execute_tool(self, call: FunctionCall, message: UserRequest, ctx: MessageContext) -> Tuple[
         List[FunctionExecutionResult], List[Tuple[str, UserRequest]]]:
@@ -83,31 +118,107 @@ class BaseAgent(RoutedAgent):
                     ]
                 ),
             ]
-            delegate_targets.append((agent_type, UserRequest(context=delegate_messages)))
+            delegate_targets.append((agent_type, UserRequest(context=delegate_messages,
+                                                             correlation_id=message.correlation_id,
+                                                             reply_topic_type=message.reply_topic_type,
+                                                             remember=message.remember)))
         else:
             raise ValueError(f"Unknown tool: {call.name}")
 
         return tool_call_results, delegate_targets
 
+    async def _run_tool_call(self, call: FunctionCall, message: UserRequest, ctx: MessageContext) -> Tuple[
+        List[FunctionExecutionResult], List[Tuple[str, UserRequest]]]:
+        """
+        在并发上限内执行单个工具调用，超时的调用返回错误结果，不影响同一轮的其他调用
+        """
+        timeout = self._tool_timeouts.get(call.name, self._tool_timeout)
+        async with self._tool_semaphore:
+            try:
+                return await asyncio.wait_for(self._execute_tool(call, message, ctx), timeout)
+            except asyncio.TimeoutError:
+                return [FunctionExecutionResult(call_id=call.id, content=f"工具 {call.name} 执行超时（{timeout}秒）",
+                                                is_error=True, name=call.name)], []
+
+    @staticmethod
+    def _conversation_id(ctx: MessageContext) -> str:
+        # 会话 ID 即主题 source，每个会话对应一个独立的智能体实例
+        return ctx.topic_id.source if ctx.topic_id is not None else "default"
+
+    async def _reply(self, content, message: UserRequest, ctx: MessageContext, chunk: bool = False) -> None:
+        """
+        发布响应到当前会话的响应主题，并带上请求的关联 ID
+        """
+        await self.publish_message(
+            topic_id=session_topic_id(message.reply_topic_type, self._conversation_id(ctx)),
+            message=AgentResponse(context=[AssistantMessage(content=content, source=self.id.type)],
+                                  correlation_id=message.correlation_id, chunk=chunk))
+
+    async def _end_turn(self, message: UserRequest, ctx: MessageContext) -> None:
+        # 通知接口层本轮已结束，流式响应可以立即关闭
+        await self.publish_message(
+            topic_id=session_topic_id(message.reply_topic_type, self._conversation_id(ctx)),
+            message=AgentResponse(context=[], correlation_id=message.correlation_id, end_of_turn=True))
+
+    async def _create(self, messages: List[LLMMessage], message: UserRequest, ctx: MessageContext,
+                      cancellation_token: CancellationToken) -> Tuple[CreateResult, bool]:
+        """
+        调用模型。开启流式时文本片段一生成就发布给用户
+        :return: 模型结果，以及文本是否已经以片段形式发布
+        """
+        tools = self._tool_schema + self._delegate_tool_schema
+        if not self._stream:
+            return await self._model_client.create(messages=messages, tools=tools,
+                                                   cancellation_token=cancellation_token), False
+        result, streamed = None, False
+        async for item in self._model_client.create_stream(messages=messages, tools=tools,
+                                                           cancellation_token=cancellation_token):
+            if isinstance(item, str):
+                if item:
+                    await self._reply(item, message, ctx, chunk=True)
+                    streamed = True
+            else:
+                result = item
+        return result, streamed
+
+    def _delegate_topic(self, topic_id: TopicId, ctx: MessageContext) -> TopicId:
+        # 委托给其他智能体时保持在同一会话内；委托回 Commander 时沿用当前分片的主题
+        topic_type = topic_id.type
+        if topic_type == USER_TOPIC_TYPE and ctx.topic_id is not None and ctx.topic_id.type.startswith(USER_TOPIC_TYPE):
+            topic_type = ctx.topic_id.type
+        return session_topic_id(topic_type, self._conversation_id(ctx))
+
+    async def _summarize(self, summary: str, messages: List[LLMMessage]) -> str:
+        content = f"已有摘要：\n{summary or '无'}\n\n新的对话记录：\n{transcript(messages)}"
+        result = await self._model_client.create(
+            messages=[SystemMessage(content=SUMMARY_PROMPT), UserMessage(content=content, source="User")],
+            cancellation_token=CancellationToken(),
+        )
+        return result.content if isinstance(result.content, str) else summary
+
     @message_handler
     async def handle_user_request(self, message: UserRequest, ctx: MessageContext) -> None:
+        delegated = False
         try:
-            self._session.extend(message.context)
+            conversation_id = self._conversation_id(ctx)
+            if message.remember:
+                self._memory.append(conversation_id, message.context)
+                history = await self._memory.history(conversation_id, self._summarize)
+            else:
+                # 不保留历史的请求（未指定会话的匿名请求）只使用本次的上下文
+                history = list(message.context)
             # await self.publish_message(topic_id=TOPICS["response_topic_id"], message=AgentResponse(context=[msg for msg in message.context if isinstance(msg, UserMessage)]))
-            task = await self._model_client.create(
-                messages=self._session,
-                tools=self._tool_schema + self._delegate_tool_schema,
-                cancellation_token=CancellationToken(),
-            )
-            await self.publish_message(topic_id=TOPICS["response_topic_id"], message=AgentResponse(
-                context=[AssistantMessage(content=task.content, source=self.id.type)]))
+            task, streamed = await self._create([SystemMessage(content=self._system_message)] + history,
+                                                message, ctx, CancellationToken())
+            if not (streamed and isinstance(task.content, str)):
+                await self._reply(task.content, message, ctx)
 
             if isinstance(task.content, list) and all(isinstance(m, FunctionCall) for m in task.content):
                 tool_call_results: List[FunctionExecutionResult] = []
                 delegate_targets: List[Tuple[str, UserRequest]] = []
-                # Process each function call.
-                for call in task.content:
-                    tool_call_results_tmp, delegate_targets_tmp = await self._execute_tool(call, message, ctx)
+                # 并发执行本轮的所有工具调用，gather 按调用顺序返回结果
+                outcomes = await asyncio.gather(*[self._run_tool_call(call, message, ctx) for call in task.content])
+                for tool_call_results_tmp, delegate_targets_tmp in outcomes:
                     tool_call_results.extend(tool_call_results_tmp)
                     delegate_targets.extend(delegate_targets_tmp)
 
@@ -117,11 +228,13 @@ class BaseAgent(RoutedAgent):
                         # await self.publish_message(topic_id=TOPICS["response_topic_id"], message=AgentResponse(
                         #     context=[AssistantMessage(content=f"Delegating to {agent_type}", source=self.id.type)]))
                         if agent_type == "GeoAnalyst":
-                            await self.publish_message(message=t, topic_id=TOPICS["gis_topic_id"])
+                            await self.publish_message(message=t, topic_id=self._delegate_topic(TOPICS["gis_topic_id"], ctx))
                         if agent_type == "UAVController":
-                            await self.publish_message(message=t, topic_id=TOPICS["uav_topic_id"])
+                            await self.publish_message(message=t, topic_id=self._delegate_topic(TOPICS["uav_topic_id"], ctx))
                         if agent_type == "Commander":
-                            await self.publish_message(message=t, topic_id=TOPICS["user_topic_id"])
+                            await self.publish_message(message=t, topic_id=self._delegate_topic(TOPICS["user_topic_id"], ctx))
+                    # 委托成功后由接收方结束本轮
+                    delegated = True
                     # return None
                 if len(tool_call_results) > 0:
                     # Make another LLM call with the results.
@@ -131,20 +244,20 @@ class BaseAgent(RoutedAgent):
                             FunctionExecutionResultMessage(content=tool_call_results),
                         ]
                     )
-                    llm_result = await self._model_client.create(
-                        messages=[SystemMessage(content=self._system_message)] + message.context,
-                        tools=self._tool_schema + self._delegate_tool_schema,
-                        cancellation_token=ctx.cancellation_token,
-                    )
+                    llm_result, streamed = await self._create(
+                        [SystemMessage(content=self._system_message)] + message.context,
+                        message, ctx, ctx.cancellation_token)
                     if isinstance(llm_result.content, str):
-                        await self.publish_message(topic_id=TOPICS["response_topic_id"], message=AgentResponse(
-                            context=[AssistantMessage(content=llm_result.content, source=self.id.type)]))
-                        self._session.append(AssistantMessage(content=llm_result.content, source=self.id.type))
+                        if not streamed:
+                            await self._reply(llm_result.content, message, ctx)
+                        if message.remember:
+                            self._memory.append(conversation_id, [AssistantMessage(content=llm_result.content, source=self.id.type)])
 
-            if isinstance(task.content, str):
-                self._session.append(AssistantMessage(content=task.content, source=self.id.type))
+            if isinstance(task.content, str) and message.remember:
+                self._memory.append(conversation_id, [AssistantMessage(content=task.content, source=self.id.type)])
             # message.context.append(AssistantMessage(content=task.content, source=self.id.type))
 
         except Exception as e:
-            await self.publish_message(topic_id=TOPICS["response_topic_id"], message=AgentResponse(
-                context=[AssistantMessage(content=f"处理用户请求时发生错误: {e}", source=self.id.type)]))
+            await self._reply(f"处理用户请求时发生错误: {e}", message, ctx)
+        if not delegated:
+            await self._end_turn(message, ctx)
@@ -0,0 +1,222 @@
+import re
+import time
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from typing import Awaitable, Callable, List, Optional
+
+from autogen_core import FunctionCall
+from autogen_core.models import (FunctionExecutionResultMessage,
+                                 LLMMessage,
+                                 SystemMessage,
+                                 UserMessage,)
+
+from Server.fast_api.common.config import config
+
+# 摘要函数：(已有摘要, 需要并入摘要的旧消息) -> 新摘要
+Summarizer = Callable[[str, List[LLMMessage]], Awaitable[str]]
+
+_CJK = re.compile(r"[\u3000-\u9fff\uff00-\uffef]")
+
+
+def estimate_tokens(text: str) -> int:
+    """
+    粗略估计 token 数：中日韩字符按 1 个，其余按 4 个字符 1 个
+    """
+    cjk = len(_CJK.findall(text))
+    return cjk + (len(text) - cjk + 3) // 4
+
+
+def message_text(message: LLMMessage) -> str:
+    content = message.content
+    if isinstance(content, str):
+        return content
+    parts = []
+    for item in content:
+        if isinstance(item, FunctionCall):
+            parts.append(f"{item.name}({item.arguments})")
+        elif hasattr(item, "content"):
+            # FunctionExecutionResult
+            parts.append(str(item.content))
+        else:
+            parts.append(str(item))
+    return "\n".join(parts)
+
+
+def message_tokens(message: LLMMessage) -> int:
+    # 每条消息另计角色等固定开销
+    return estimate_tokens(message_text(message)) + 4
+
+
+def split_turns(messages: List[LLMMessage]) -> List[List[LLMMessage]]:
+    """
+    按用户消息切分为轮次，保证工具调用与其执行结果始终在同一轮内，截断时不会被拆开
+    """
+    turns: List[List[LLMMessage]] = []
+    for message in messages:
+        if isinstance(message, UserMessage) or not turns:
+            turns.append([message])
+        else:
+            turns[-1].append(message)
+    return turns
+
+
+class _Conversation:
+    __slots__ = ('summary', 'messages', 'tokens', 'accessed')
+
+    def __init__(self):
+        self.summary = ""
+        self.messages: List[LLMMessage] = []
+        self.tokens = 0
+        self.accessed = time.monotonic()
+
+
+class ConversationMemory(ABC):
+    """
+    会话记忆接口：按会话 ID 保存历史，BaseAgent 每轮取出历史拼接到系统提示之后
+    """
+
+    @abstractmethod
+    def append(self, conversation_id: str, messages: List[LLMMessage]) -> None:
+        ...
+
+    @abstractmethod
+    async def history(self, conversation_id: str, summarizer: Optional[Summarizer] = None) -> List[LLMMessage]:
+        ...
+
+    @abstractmethod
+    def clear(self, conversation_id: str) -> None:
+        ...
+
+    @abstractmethod
+    def __contains__(self, conversation_id: str) -> bool:
+        ...
+
+    def stats(self) -> dict:
+        return {}
+
+
+class SummarizingMemory(ConversationMemory):
+    """
+    有上限的会话记忆
+    - 每个会话的历史超过 max_tokens 时，从最早的轮次开始移出，直到降到 max_tokens 的一半以下（至少保留最近一轮），
+      移出的轮次交给 summarizer 与已有摘要合并为新的摘要；未提供 summarizer 或摘要失败时直接丢弃
+    - 摘要以系统消息的形式放在历史最前面，长度不超过 summary_tokens
+    - 超过 idle_seconds 未访问的会话被清除，会话数超过 max_conversations 时淘汰最久未访问的
+    """
+
+    def __init__(self, max_tokens: int = 6000, summary_tokens: int = 800, idle_seconds: float = 3600,
+                 max_conversations: int = 1000, token_counter: Callable[[LLMMessage], int] = message_tokens):
+        self.max_tokens = max_tokens
+        self.summary_tokens = summary_tokens
+        self.idle_seconds = idle_seconds
+        self.max_conversations = max_conversations
+        self.token_counter = token_counter
+        self._conversations: "OrderedDict[str, _Conversation]" = OrderedDict()
+        self.summaries = 0
+        self.dropped_messages = 0
+        self.evicted = 0
+
+    def _evict(self):
+        deadline = time.monotonic() - self.idle_seconds
+        while self._conversations:
+            conversation_id, conversation = next(iter(self._conversations.items()))
+            if conversation.accessed >= deadline and len(self._conversations) <= self.max_conversations:
+                break
+            del self._conversations[conversation_id]
+            self.evicted += 1
+
+    def _get(self, conversation_id: str) -> _Conversation:
+        conversation = self._conversations.get(conversation_id)
+        if conversation is None:
+            conversation = self._conversations[conversation_id] = _Conversation()
+        else:
+            self._conversations.move_to_end(conversation_id)
+        conversation.accessed = time.monotonic()
+        self._evict()
+        return conversation
+
+    def append(self, conversation_id: str, messages: List[LLMMessage]) -> None:
+        conversation = self._get(conversation_id)
+        conversation.messages.extend(messages)
+        conversation.tokens += sum(self.token_counter(message) for message in messages)
+
+    async def _compact(self, conversation: _Conversation, summarizer: Optional[Summarizer]):
+        turns = split_turns(conversation.messages)
+        target = self.max_tokens // 2
+        removed: List[LLMMessage] = []
+        tokens = conversation.tokens
+        while len(turns) > 1 and tokens > target:
+            turn = turns.pop(0)
+            removed.extend(turn)
+            tokens -= sum(self.token_counter(message) for message in turn)
+        if not removed:
+            return
+        conversation.messages = [message for turn in turns for message in turn]
+        conversation.tokens = tokens
+        if summarizer is not None:
+            try:
+                summary = await summarizer(conversation.summary, removed)
+                conversation.summary = self._clip(summary)
+                self.summaries += 1
+                return
+            except Exception as e:
+                print(f"会话摘要失败，直接丢弃旧消息: {e}")
+        self.dropped_messages += len(removed)
+
+    def _clip(self, summary: str) -> str:
+        # 按估计的 token 数截断摘要，保证摘要本身有上限
+        summary = summary.strip()
+        while summary and estimate_tokens(summary) > self.summary_tokens:
+            summary = summary[:int(len(summary) * 0.9)]
+        return summary
+
+    async def history(self, conversation_id: str, summarizer: Optional[Summarizer] = None) -> List[LLMMessage]:
+        conversation = self._get(conversation_id)
+        if conversation.tokens > self.max_tokens:
+            await self._compact(conversation, summarizer)
+        history: List[LLMMessage] = []
+        if conversation.summary:
+            history.append(SystemMessage(content=f"此前对话的摘要：\n{conversation.summary}"))
+        return history + conversation.messages
+
+    def clear(self, conversation_id: str) -> None:
+        self._conversations.pop(conversation_id, None)
+
+    def __contains__(self, conversation_id: str) -> bool:
+        # 先清除过期会话，已被淘汰的会话视为不存在
+        self._evict()
+        return conversation_id in self._conversations
+
+    def stats(self) -> dict:
+        return {
+            "conversations": len(self._conversations),
+            "tokens": sum(conversation.tokens for conversation in self._conversations.values()),
+            "max_tokens": self.max_tokens,
+            "summaries": self.summaries,
+            "dropped_messages": self.dropped_messages,
+            "evicted": self.evicted,
+        }
+
+
+def transcript(messages: List[LLMMessage]) -> str:
+    """
+    将消息渲染为供摘要使用的纯文本对话记录，工具结果只保留开头部分
+    """
+    lines = []
+    for message in messages:
+        text = message_text(message)
+        if isinstance(message, FunctionExecutionResultMessage):
+            lines.append(f"[工具结果] {text[:500]}")
+        else:
+            lines.append(f"[{getattr(message, 'source', None) or message.type}] {text}")
+    return "\n".join(lines)
+
+
+_memory_config = config.get('agent_memory', {})
+
+
+def default_memory() -> ConversationMemory:
+    return SummarizingMemory(max_tokens=_memory_config.get('max_tokens', 6000),
+                             summary_tokens=_memory_config.get('summary_tokens', 800),
+                             idle_seconds=_memory_config.get('idle_seconds', 3600),
+                             max_conversations=_memory_config.get('max_conversations', 1000))
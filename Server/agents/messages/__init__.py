@@ -4,6 +4,9 @@ from .base import (
     RESPONSE_TOPIC_TYPE,
     user_topic_id,
     response_topic_id,
+    session_topic_id,
+    shard_topic_type,
+    session_shard,
     TOPICS
 )
 from .user import UserRequest,AgentResponse
@@ -19,6 +22,9 @@ __all__ = [
     'RESPONSE_TOPIC_TYPE',
     'user_topic_id',
     'response_topic_id',
+    'session_topic_id',
+    'shard_topic_type',
+    'session_shard',
     'TOPICS',
     'UserRequest',
     'AgentResponse',
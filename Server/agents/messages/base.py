@@ -1,3 +1,5 @@
+import zlib
+
 from pydantic import BaseModel
 from autogen_core import TopicId
 
@@ -13,6 +15,27 @@ RESPONSE_TOPIC_TYPE= "Response"
 user_topic_id = TopicId(type=USER_TOPIC_TYPE, source="default")
 response_topic_id = TopicId(type=RESPONSE_TOPIC_TYPE, source="default")
 
+
+
+def session_topic_id(topic_type: str, session_id: str) -> TopicId:
+    """
+    会话主题：source 为会话 ID，TypeSubscription 按 source 为每个会话创建独立的智能体实例
+    """
+    return TopicId(type=topic_type, source=session_id)
+
+
+def shard_topic_type(topic_type: str, shard: int, shards: int) -> str:
+    # 只有一个分片时沿用原主题类型，多个分片时为 "User.0"、"User.1" ...
+    return topic_type if shards <= 1 else f"{topic_type}.{shard}"
+
+
+def session_shard(session_id: str, shards: int) -> int:
+    """
+    会话所在的分片：按会话 ID 的 CRC32 取模，跨进程稳定，同一会话总是由同一个工作进程处理
+    """
+    return zlib.crc32(session_id.encode('utf-8')) % shards if shards > 1 else 0
+
+
 TOPICS = {
     "user_topic_id": user_topic_id,
     "response_topic_id":response_topic_id
@@ -11,7 +11,18 @@ class UserLogin(BaseMessage):
 class UserRequest(BaseMessage):
     """用户请求消息""" 
     context: List[LLMMessage]
+    # 关联 ID：同一请求产生的所有响应都带上它，接口层据此把响应送回发起请求的连接
+    correlation_id: Optional[str] = None
+    # 响应发布到的主题类型：每个接口进程订阅自己的响应主题，多进程部署时响应只回到发起请求的进程
+    reply_topic_type: str = RESPONSE_TOPIC_TYPE
+    # 是否写入会话记忆；未指定会话的匿名请求彼此独立，不保留历史
+    remember: bool = True
 
 class AgentResponse(BaseMessage):
     """智能体响应消息"""
     context: List[LLMMessage]
+    correlation_id: Optional[str] = None
+    # 流式输出的文本片段，按顺序拼接即为完整回答
+    chunk: bool = False
+    # 本轮处理结束（不含委托给其他智能体的后续处理），context 为空
+    end_of_turn: bool = False
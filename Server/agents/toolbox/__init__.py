@@ -10,6 +10,7 @@ from .db_assistant import (
     get_geo_info,
     plan_transit_route,
     add_college_tool,
+    add_colleges_bulk_tool,
     add_evaluation_for_college_tool,
     update_evaluation_for_college_tool,
     del_evaluation_by_id_tool,
@@ -34,6 +35,7 @@ tool_box_for_agent=[
     get_all_admin_divisions_tool,
     get_admin_division_by_id_tool,
     add_college_tool,
+    add_colleges_bulk_tool,
     add_evaluation_for_college_tool,
     update_evaluation_for_college_tool,
     del_evaluation_by_id_tool,
@@ -63,6 +65,7 @@ __all__=[
     'plan_transit_route',
     'ai_response',
     'add_college_tool',
+    'add_colleges_bulk_tool',
     'add_evaluation_for_college_tool',
     'update_evaluation_for_college_tool',
     'del_evaluation_by_id_tool',
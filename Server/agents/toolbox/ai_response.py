@@ -2,11 +2,16 @@ from Server.models import model
 from autogen_core.models import (SystemMessage,
                                  UserMessage,)
 from autogen_core import CancellationToken
+from Server.fast_api.common.config import config
+from Server.fast_api.common.response_cache import llm_cache, response_key
 import asyncio
 model_client = model
 from typing import Literal
 
-async def ai_response(content: str,task:Literal['traffic','climate']):
+async def ai_response(content: str,task:Literal['traffic','climate'],refresh: bool = False):
+    """
+    相同任务、提示与模型的回答从缓存返回；refresh 为 True 时跳过缓存重新生成
+    """
     traffic_system_message = """
     # 你的角色： 路线规划分析师
     # 背景:你将收到一份关于高考生与目标院校之间的路线规划文件，请帮助用户分析交通便利度
@@ -32,15 +37,18 @@ async def ai_response(content: str,task:Literal['traffic','climate']):
 
     system_message = traffic_system_message if task == "traffic" else climate_system_message
 
-    response = await model_client.create(
-        messages = [
-            SystemMessage(content=system_message),
-            UserMessage(content=content,source="user")
-        ],
-        cancellation_token=CancellationToken(),
-    )
+    async def create():
+        response = await model_client.create(
+            messages = [
+                SystemMessage(content=system_message),
+                UserMessage(content=content,source="user")
+            ],
+            cancellation_token=CancellationToken(),
+        )
+        return response.content
 
-    return response.content
+    key = response_key(task, system_message, content, config['model']['name'])
+    return await llm_cache.get_or_create(task, key, create, refresh=refresh)
 async def main():
     response = await ai_response("",task="traffic")
     print(response)
@@ -1,14 +1,20 @@
-import requests
+import asyncio
 import json
 from typing import List, Literal, Optional, Dict, Any
+
+import httpx
 from autogen_core.tools import FunctionTool
+from Server.fast_api.common.amap import amap_client
+from Server.fast_api.common.config import config
 
 BASE_URL = "http://localhost:8080"
 
-# 高德地图API配置（需要在config.json中配置）
-AMAP_API_KEY = ""  # 需要在实际使用中替换为真实API密钥
-AMAP_TRANSIT_ROUTE_URL = "https://restapi.amap.com/v3/direction/transit/integrated"
-AMAP_GEO_CODING_URL = "https://restapi.amap.com/v3/geocode/geo"
+# 工具与 FastAPI 在同一进程时（start.py），写操作经 ASGI 直接调用应用，不走本机网络；
+# 只读工具直接调用 service 层，不经过 HTTP 与 JSON 序列化
+_tools_config = config.get('agent_tools', {})
+_http_client: Optional[httpx.AsyncClient] = None
+
+# 高德地图API密钥、地址与缓存在 Server/config.json 的 AMAP 中配置，请求经 amap_client 缓存与重试
 
 # 全局变量用于存储认证token
 _auth_token = ""
@@ -35,7 +41,40 @@ def _get_headers():
         headers["Authorization"] = f"Bearer {_auth_token}"
     return headers
 
-def add_admin(admin_code: int, shape: str, name: str, level: Literal["省", "市", "县"]):
+def _http() -> httpx.AsyncClient:
+    """
+    工具共用的异步 HTTP 客户端（连接池复用），首次使用时创建
+    """
+    global _http_client
+    if _http_client is None:
+        timeout = _tools_config.get('timeout', 30)
+        if _tools_config.get('in_process', True):
+            from Server.fast_api.resources import app
+            _http_client = httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url=BASE_URL,
+                                             timeout=timeout, follow_redirects=True)
+        else:
+            limits = httpx.Limits(max_connections=_tools_config.get('max_connections', 20))
+            _http_client = httpx.AsyncClient(base_url=_tools_config.get('base_url', BASE_URL),
+                                             timeout=timeout, limits=limits, follow_redirects=True)
+    return _http_client
+
+async def _request(method: str, path: str, headers: Optional[Dict[str, str]] = None, **kwargs) -> Any:
+    """
+    带认证头调用后端接口，返回解析后的 JSON，非 2xx 时抛出异常
+    """
+    response = await _http().request(method, path, headers={**_get_headers(), **(headers or {})}, **kwargs)
+    response.raise_for_status()
+    return response.json()
+
+async def _with_session(query):
+    """
+    使用独立的数据库会话执行 service 层调用
+    """
+    from Server.fast_api.resources import AsyncSessionLocal
+    async with AsyncSessionLocal() as db_session:
+        return await query(db_session)
+
+async def add_admin(admin_code: int, shape: str, name: str, level: Literal["省", "市", "县"]):
     """
     添加新行政区划数据
 
@@ -49,17 +88,14 @@ def add_admin(admin_code: int, shape: str, name: str, level: Literal["省", "市
         Dict[str, Any]: 添加结果
     """
     try:
-        response = requests.post(
-            f"{BASE_URL}/admin/",
-            json={"admin_code": admin_code, "shape": shape, "name": name, "level": level},
-            headers=_get_headers()
+        return await _request(
+            "POST", "/admin/",
+            json={"admin_code": admin_code, "shape": shape, "name": name, "level": level}
         )
-        response.raise_for_status()
-        return response.json()
     except Exception as e:
         return {"error": str(e)}
 
-def get_admin_by_id(admin_code: int) -> Dict[str, Any]:
+async def get_admin_by_id(admin_code: int) -> Dict[str, Any]:
     """
     根据ID获取特定行政区划详细信息
 
@@ -70,13 +106,11 @@ def get_admin_by_id(admin_code: int) -> Dict[str, Any]:
         Dict[str, Any]: 行政区划详细信息
     """
     try:
-        response = requests.get(f"{BASE_URL}/admin/{admin_code}", headers=_get_headers())
-        response.raise_for_status()
-        return response.json()
+        return await get_admin_division_by_id(admin_code)
     except Exception as e:
         return {"error": str(e)}
 
-def get_all_colleges() -> List[Dict[str, Any]]:
+async def get_all_colleges() -> List[Dict[str, Any]]:
     """
     获取所有高校数据
     
@@ -84,13 +118,14 @@ def get_all_colleges() -> List[Dict[str, Any]]:
         List[Dict[str, Any]]: 高校数据列表
     """
     try:
-        response = requests.get(f"{BASE_URL}/colleges/", headers=_get_headers())
-        response.raise_for_status()
-        return response.json()
+        from Server.fast_api.services import CollegeService
+        from Server.fast_api.resources.college_resource import CollegeOut
+        colleges = await _with_session(CollegeService().get_all_colleges)
+        return [CollegeOut(**college).model_dump(mode="json") for college in colleges]
     except Exception as e:
         return {"error": str(e)}
 
-def get_college_by_id(college_id: int) -> Dict[str, Any]:
+async def get_college_by_id(college_id: int) -> Dict[str, Any]:
     """
     根据ID获取特定高校详细信息
     
@@ -101,13 +136,19 @@ def get_college_by_id(college_id: int) -> Dict[str, Any]:
         Dict[str, Any]: 高校详细信息
     """
     try:
-        response = requests.get(f"{BASE_URL}/colleges/{college_id}", headers=_get_headers())
-        response.raise_for_status()
-        return response.json()
+        from Server.fast_api.services import CollegeService
+        from Server.fast_api.resources.college_resource import CollegeOut
+        result = await _with_session(lambda db_session: CollegeService().get_college_with_evaluation(college_id, db_session))
+        if not result:
+            return {"error": f"College with ID {college_id} does not exist"}
+        return {
+            "college": CollegeOut(**result["college"].serialize()).model_dump(mode="json"),
+            "evaluations": [evaluation.serialize() for evaluation in result["evaluations"]]
+        }
     except Exception as e:
         return {"error": str(e)}
 
-def add_college(
+async def add_college(
     college_id:int,
     name: str,
     province: str,
@@ -146,8 +187,8 @@ def add_college(
     :return:Dict[str, Any]: 大学详细信息
     """
     try:
-        response = requests.post(
-            f"{BASE_URL}/colleges/",
+        return await _request(
+            "POST", "/colleges/",
             json={
                 "college_id":college_id,
                 "name": name,
@@ -165,15 +206,12 @@ def add_college(
                 "shape": shape,
                 "affiliation": affiliation,
                 "admin_code": admin_code
-            },
-            headers=_get_headers()
+            }
         )
-        response.raise_for_status()
-        return response.json()
     except Exception as e:
         return {"error": str(e)}
 
-def update_college(
+async def update_college(
     college_id: Optional[int],
     shape:Optional[str],
     name: Optional[str],
@@ -211,8 +249,8 @@ def update_college(
     :return:Dict[str, Any]: 大学详细信息
     """
     try:
-        response = requests.put(
-            f"{BASE_URL}/colleges/{college_id}",
+        return await _request(
+            "PUT", f"/colleges/{college_id}",
             json={
                 "college_id":college_id,
                 "name": name,
@@ -230,15 +268,12 @@ def update_college(
                 "shape": shape,
                 "affiliation": affiliation,
                 "admin_code": admin_code
-            },
-            headers=_get_headers()
+            }
         )
-        response.raise_for_status()
-        return response.json()
     except Exception as e:
         return {"error": str(e)}
 
-def search_colleges(
+async def search_colleges(
     name: Optional[str] = None,
     province: Optional[str] = None,
     city: Optional[str] = None,
@@ -267,27 +302,18 @@ def search_colleges(
         List[Dict[str, Any]]: 符合条件的高校列表
     """
     try:
-        params = {
-            "name": name,
-            "province": province,
-            "city": city,
-            "category": category,
-            "nature": nature,
-            "type": type,
-            "is_985": is_985,
-            "is_211": is_211,
-            "is_double_first": is_double_first
-        }
-        # 移除None值
-        params = {k: v for k, v in params.items() if v is not None}
-        
-        response = requests.get(f"{BASE_URL}/colleges/search/", params=params, headers=_get_headers())
-        response.raise_for_status()
-        return response.json()
+        from Server.fast_api.services import CollegeService
+        from Server.fast_api.resources.college_resource import CollegeOut
+        colleges = await _with_session(lambda db_session: CollegeService().search_colleges(
+            name=name, province=province, city=city, category=category,
+            nature=nature, type=type, is_985=is_985, is_211=is_211,
+            is_double_first=is_double_first, db_session=db_session
+        ))
+        return [CollegeOut(**college).model_dump(mode="json") for college in colleges]
     except Exception as e:
         return {"error": str(e)}
 
-def del_college_by_id(college_id: int):
+async def del_college_by_id(college_id: int):
     """
     根据ID删除特定高校数据
 
@@ -298,13 +324,11 @@ def del_college_by_id(college_id: int):
         Dict[str, Any]: 删除结果
     """
     try:
-        response = requests.delete(f"{BASE_URL}/colleges/{college_id}", headers=_get_headers())
-        response.raise_for_status()
-        return response.json()
+        return await _request("DELETE", f"/colleges/{college_id}")
     except Exception as e:
         return {"error": str(e)}
 
-def get_all_climate() -> List[Dict[str, Any]]:
+async def get_all_climate() -> List[Dict[str, Any]]:
     """
     获取所有气候数据
     
@@ -312,13 +336,14 @@ def get_all_climate() -> List[Dict[str, Any]]:
         List[Dict[str, Any]]: 气候数据列表
     """
     try:
-        response = requests.get(f"{BASE_URL}/climate/", headers=_get_headers())
-        response.raise_for_status()
-        return response.json()
+        from Server.fast_api.services import ClimateService
+        from Server.fast_api.resources.climate_resource import ClimateOut
+        climate = await _with_session(ClimateService().get_all_climate)
+        return [ClimateOut(**row).model_dump(mode="json") for row in climate]
     except Exception as e:
         return {"error": str(e)}
 
-def add_climate(
+async def add_climate(
     year: int,
     month: int,
     annual_avg_temp: float,
@@ -343,8 +368,8 @@ def add_climate(
         Dict[str, Any]: 添加结果
     """
     try:
-        response = requests.post(
-            f"{BASE_URL}/climate/",
+        return await _request(
+            "POST", "/climate/",
             json={
                 "year": year,
                 "month": month,
@@ -353,15 +378,33 @@ def add_climate(
                 "annual_precipitation": annual_precipitation,
                 "monthly_avg_precip": monthly_avg_precip,
                 "admin_code": admin_code
-            },
-            headers=_get_headers()
+            }
+        )
+    except Exception as e:
+        return {"error": str(e)}
+
+async def add_colleges_bulk(
+    colleges: List[Dict[str, Any]],
+    atomic: bool = True
+) -> Dict[str, Any]:
+    """
+    批量添加高校数据（仅管理员），一次请求导入多所高校
+    :param colleges: 高校数据列表，每项字段与 add_college 的参数相同；未提供 shape 时按经纬度生成
+    :param atomic: 是否全有或全无，False 时跳过出错的高校并返回逐条错误
+    :return:Dict[str, Any]: 导入结果，包括成功条数与错误明细
+    """
+    try:
+        body = "\n".join(json.dumps(college, ensure_ascii=False) for college in colleges)
+        return await _request(
+            "POST", "/colleges/bulk",
+            params={"atomic": str(atomic).lower()},
+            content=body.encode("utf-8"),
+            headers={"Content-Type": "application/x-ndjson"}
         )
-        response.raise_for_status()
-        return response.json()
     except Exception as e:
         return {"error": str(e)}
 
-def add_evaluation_for_college(college_id: int,
+async def add_evaluation_for_college(college_id: int,
                                Dietary_evaluation:Optional[str],
                                Traffic_evaluation:Optional[str],
                                Evaluation:Optional[str]):
@@ -378,21 +421,18 @@ def add_evaluation_for_college(college_id: int,
         Dict[str, Any]: 添加结果
     """
     try:
-        response = requests.post(
-            f"{BASE_URL}/colleges/{college_id}/evaluations/",
+        return await _request(
+            "POST", f"/colleges/{college_id}/evaluations/",
             json={
                 "Dietary_evaluation": Dietary_evaluation,
                 "Traffic_evaluation": Traffic_evaluation,
                 "Evaluation": Evaluation
-            },
-            headers=_get_headers()
+            }
         )
-        response.raise_for_status()
-        return response.json()
     except Exception as e:
         return {"error": str(e)}
 
-def update_evaluation_for_college(evaluation_id: int,
+async def update_evaluation_for_college(evaluation_id: int,
                                    Dietary_evaluation:Optional[str],
                                    Traffic_evaluation:Optional[str],
                                    Evaluation:Optional[str]):
@@ -409,21 +449,19 @@ def update_evaluation_for_college(evaluation_id: int,
         Dict[str, Any]: 更新结果
     """
     try:
-        response = requests.put(
-            f"{BASE_URL}/evaluations/{evaluation_id}",
+        return await _request(
+            "PUT", f"/evaluations/{evaluation_id}",
             json={
                 "Dietary_evaluation": Dietary_evaluation,
                 "Traffic_evaluation": Traffic_evaluation,
                 "Evaluation": Evaluation
             }
         )
-        response.raise_for_status()
-        return response.json()
     except Exception as e:
         return {"error": str(e)}
 
 
-def del_evaluation_by_id(evaluation_id: int):
+async def del_evaluation_by_id(evaluation_id: int):
     """
     根据ID删除特定评价数据
 
@@ -434,13 +472,11 @@ def del_evaluation_by_id(evaluation_id: int):
         Dict[str, Any]: 删除结果
     """
     try:
-        response = requests.delete(f"{BASE_URL}/evaluations/{evaluation_id}", headers=_get_headers())
-        response.raise_for_status()
-        return response.json()
+        return await _request("DELETE", f"/evaluations/{evaluation_id}")
     except Exception as e:
         return {"error": str(e)}
 
-def get_climate_by_id(climate_id: int) -> Dict[str, Any]:
+async def get_climate_by_id(climate_id: int) -> Dict[str, Any]:
     """
     根据ID获取特定区域气候详细信息
     
@@ -451,13 +487,16 @@ def get_climate_by_id(climate_id: int) -> Dict[str, Any]:
         Dict[str, Any]: 气候详细信息
     """
     try:
-        response = requests.get(f"{BASE_URL}/climate/{climate_id}", headers=_get_headers())
-        response.raise_for_status()
-        return response.json()
+        from Server.fast_api.services import ClimateService
+        from Server.fast_api.resources.climate_resource import ClimateOut
+        result = await _with_session(lambda db_session: ClimateService().get_climate_by_id(str(climate_id), db_session))
+        if not result:
+            return {"error": f"Climate with ID {climate_id} does not exist"}
+        return ClimateOut(**result).model_dump(mode="json")
     except Exception as e:
         return {"error": str(e)}
 
-def get_all_admin_divisions() -> List[Dict[str, Any]]:
+async def get_all_admin_divisions() -> List[Dict[str, Any]]:
     """
     获取所有行政区划数据
     
@@ -465,13 +504,14 @@ def get_all_admin_divisions() -> List[Dict[str, Any]]:
         List[Dict[str, Any]]: 行政区划数据列表
     """
     try:
-        response = requests.get(f"{BASE_URL}/admin/", headers=_get_headers())
-        response.raise_for_status()
-        return response.json()
+        from Server.fast_api.services import AdminDivisionService
+        from Server.fast_api.resources.admindivision_resource import AdminDivisionOut
+        divisions = await _with_session(AdminDivisionService().get_all_admin)
+        return [AdminDivisionOut(**division.serialize()).model_dump(mode="json") for division in divisions]
     except Exception as e:
         return {"error": str(e)}
 
-def get_all_evaluations() -> List[Dict[str, Any]]:
+async def get_all_evaluations() -> List[Dict[str, Any]]:
     """
     获取所有评价数据
 
@@ -479,13 +519,11 @@ def get_all_evaluations() -> List[Dict[str, Any]]:
         List[Dict[str, Any]]: 评价数据列表
     """
     try:
-        response = requests.get(f"{BASE_URL}/colleges/evaluations/", headers=_get_headers())
-        response.raise_for_status()
-        return response.json()
+        return await _request("GET", "/colleges/evaluations/")
     except Exception as e:
         return {"error": str(e)}
 
-def get_admin_division_by_id(admin_code: int) -> Dict[str, Any]:
+async def get_admin_division_by_id(admin_code: int) -> Dict[str, Any]:
     """
     根据ID获取特定行政区划详细信息
     
@@ -496,13 +534,16 @@ def get_admin_division_by_id(admin_code: int) -> Dict[str, Any]:
         Dict[str, Any]: 行政区划详细信息
     """
     try:
-        response = requests.get(f"{BASE_URL}/admin/{admin_code}", headers=_get_headers())
-        response.raise_for_status()
-        return response.json()
+        from Server.fast_api.services import AdminDivisionService
+        from Server.fast_api.resources.admindivision_resource import AdminDivisionOut
+        result = await _with_session(lambda db_session: AdminDivisionService().get_admin_by_id(admin_code, db_session))
+        if not result:
+            return {"error": f"Admin with ID {admin_code} does not exist"}
+        return AdminDivisionOut(**result.serialize()).model_dump(mode="json")
     except Exception as e:
         return {"error": str(e)}
 
-def get_all_users() -> List[Dict[str, Any]]:
+async def get_all_users() -> List[Dict[str, Any]]:
     """
     获取所有用户信息
 
@@ -510,9 +551,7 @@ def get_all_users() -> List[Dict[str, Any]]:
         List[Dict[str, Any]]: 用户信息列表
     """
     try:
-        response = requests.get(f"{BASE_URL}/user/", headers=_get_headers())
-        response.raise_for_status()
-        return response.json()
+        return await _request("GET", "/user/")
     except Exception as e:
         return {"error": str(e)}
 
@@ -529,16 +568,7 @@ def get_geo_info(address: str, city: Optional[str]) -> Dict[str, Any]:
         Dict[str, Any]: 地理信息编码，包括经纬度，citycode，adcode等
     """
     try:
-        params = {
-            "key": AMAP_API_KEY,
-            "address": address,
-            "city": city
-        }
-        # 移除空值参数
-        params = {k: v for k, v in params.items() if v}
-        response = requests.get(AMAP_GEO_CODING_URL, params=params)
-        response.raise_for_status()
-        result = response.json()
+        result = amap_client.geocode(address, city)
         if result.get("status") == "1":
             return result
         else:
@@ -576,21 +606,7 @@ def plan_transit_route(
         Dict[str, Any]: 路线规划结果
     """
     try:
-        params = {
-            "key": AMAP_API_KEY,
-            "origin": origin,
-            "destination": destination,
-            "city1": city,
-            "cityd": cityd,
-            "nightflag": nightflag,
-        }
-
-        # 移除空值参数
-        params = {k: v for k, v in params.items() if v}
-
-        response = requests.get(AMAP_TRANSIT_ROUTE_URL, params=params)
-        response.raise_for_status()
-        result = response.json()
+        result = amap_client.transit_route(origin, destination, city=city, cityd=cityd, nightflag=nightflag)
 
         if result.get("status") == "1":
             return result
@@ -607,20 +623,54 @@ def plan_transit_route(
             "message": "请求高德地图API时发生错误"
         }
 
-def analys_transit_route(college_name:str):
+async def get_geo_info_async(address: str, city: Optional[str]) -> Dict[str, Any]:
+    """
+    使用高德地图API v3获取地理信息编码，包括经纬度，citycode，adcode等
+
+    Args:
+        address (str): 结构化地址信息,规则遵循：国家、省份、城市、区县、城镇、乡村、街道、门牌号码、屋邨、大厦，如：北京市朝阳区阜通东大街6号。
+        city (str): 城市,指定查询的城市,可选输入内容包括：指定城市的中文（如北京）、指定城市的中文全拼（beijing）、citycode（010）、adcode（110000），不支持县级市。当指定城市查询内容为空时，会进行全国范围内的地址转换检索。
+
+    Returns:
+        Dict[str, Any]: 地理信息编码，包括经纬度，citycode，adcode等
+    """
+    # 高德客户端为同步请求，在线程中执行
+    return await asyncio.to_thread(get_geo_info, address, city)
+
+async def plan_transit_route_async(
+        origin: str,
+        destination: str,
+        city: str = "",
+        cityd: str = "",
+        nightflag: str = "1",
+) -> Dict[str, Any]:
+    """
+    使用高德地图API v3规划公交路线（路径规划）
+
+    Args:
+        origin (str): 起点经纬度，经纬度小数点后不超过6位，格式："经度,纬度"，例如："116.481488,39.990464"
+        destination (str): 终点经纬度，经纬度小数点后不超过6位，格式："经度,纬度"，例如："116.434446,39.90816"
+        city (str): 城市/跨城规划时的起点城市，可选值：城市名称/citycode，相同时代表同城，不同时代表跨城
+        cityd (str): 跨城公交规划时的终点城市，可选值：城市名称/citycode，跨城公交规划必填参数。
+
+    Returns:
+        Dict[str, Any]: 路线规划结果
+    """
+    return await asyncio.to_thread(plan_transit_route, origin, destination, city, cityd, nightflag)
+
+async def analys_transit_route(college_name:str):
     """
     访问后端api进行交通分析，只需要大学名称即可
     :param college_name: 大学名称
     :return:
     """
     try:
-        response = requests.get(f"{BASE_URL}/colleges/search/?name={college_name}", headers=_get_headers())
-        if response.status_code != 200:
+        colleges = await search_colleges(name=college_name)
+        if not colleges or "error" in colleges:
             return "无法获取高校信息"
-        college_id = response.json()[0]["college_id"]
-        traffic_analyst = requests.post(f"{BASE_URL}/server/traffic/{college_id}", headers=_get_headers())
-        traffic_analyst.raise_for_status()
-        return traffic_analyst.json()
+        college_id = colleges[0]["college_id"]
+        # 交通分析依赖当前用户的出发地，经接口鉴权获取
+        return await _request("POST", f"/server/traffic/{college_id}")
     except Exception as e:
         return str(e)
 
@@ -640,6 +690,11 @@ add_college_tool = FunctionTool(
     description="添加一个新高校"
 )
 
+add_colleges_bulk_tool = FunctionTool(
+    add_colleges_bulk,
+    description="批量添加多所高校"
+)
+
 add_evaluation_for_college_tool=FunctionTool(
     add_evaluation_for_college,
     description="为特定高校添加评价"
@@ -716,12 +771,14 @@ get_all_evaluations_tool = FunctionTool(
 )
 
 plan_transit_route_tool = FunctionTool(
-    plan_transit_route,
+    plan_transit_route_async,
+    name="plan_transit_route",
     description="使用高德地图API v3规划公交路线（路径规划），参数：起点经纬度(origin)、终点经纬度(destination)、起点城市(city)、终点城市(cityd),夜间出行(nightflag,默认为1，开启)"
 )
 
 get_geo_info_tool = FunctionTool(
-    get_geo_info,
+    get_geo_info_async,
+    name="get_geo_info",
     description="使用髙德地图API 地理编码查询接口，参数：地址(address)、城市(city，可选值)"
 )
 
@@ -1 +1,2 @@
-from .constants import LOGIN_SECRET,SERVER_URL,result_queue
\ No newline at end of file
+from .constants import LOGIN_SECRET,SERVER_URL,result_channels
+from .config import config
\ No newline at end of file
@@ -0,0 +1,187 @@
+import json
+import os
+import re
+import threading
+import time
+from concurrent.futures import Future
+from typing import Callable, Dict, Optional
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from .config import config
+from .response_cache import SERVER_DIR, ResponseCache, response_key
+
+GEOCODE_PATH = "/v3/geocode/geo"
+TRANSIT_ROUTE_PATH = "/v3/direction/transit/integrated"
+
+# 高德接口超出 QPS / 并发限制的 infocode，视为可重试
+RETRY_INFOCODES = {"10004", "10014", "10019", "10020", "10021"}
+RETRY_STATUS = {429, 500, 502, 503, 504}
+
+_SPACES = re.compile(r"\s+")
+
+
+def normalize_text(value: Optional[str]) -> str:
+    # 地址、城市去掉首尾与重复空白（含全角空格），作为缓存键
+    return _SPACES.sub(" ", (value or "").replace("　", " ")).strip()
+
+
+def normalize_location(value: str) -> str:
+    """
+    "经度,纬度" 统一为小数点后 6 位（高德接口上限），非法时原样返回
+    """
+    try:
+        longitude, latitude = (float(part) for part in value.split(","))
+    except (AttributeError, ValueError):
+        return value
+    return f"{longitude:.6f},{latitude:.6f}"
+
+
+class AMapError(Exception):
+    """
+    高德接口请求失败（网络错误或重试后仍返回限流、服务端错误）
+    """
+
+
+class AMapClient:
+    """
+    高德 Web 服务接口客户端
+    - 复用连接池（requests.Session），每次请求带超时，网络错误、5xx 与限流按指数退避重试
+    - 成功结果写入磁盘缓存：地理编码按规范化后的 (地址, 城市)，公交路线按 (起点, 终点, 城市, 终点城市, 夜班)
+    - 同一键的并发请求只发出一次，其余线程等待同一结果
+    base_url 可指向本地桩服务，便于离线测试（环境变量 AMAP_BASE_URL 优先）
+    """
+
+    def __init__(self, key: str, base_url: str = "https://restapi.amap.com", timeout: float = 5.0,
+                 retries: int = 2, backoff: float = 0.5, pool_size: int = 16,
+                 geocode_cache: Optional[ResponseCache] = None, route_cache: Optional[ResponseCache] = None):
+        self.key = key
+        self.base_url = base_url.rstrip("/")
+        self.timeout = timeout
+        self.retries = retries
+        self.backoff = backoff
+        self.geocode_cache = geocode_cache
+        self.route_cache = route_cache
+        self._session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=4, pool_maxsize=pool_size)
+        self._session.mount("http://", adapter)
+        self._session.mount("https://", adapter)
+        self._lock = threading.Lock()
+        self._inflight: Dict[str, Future] = {}
+        self.requests = 0
+        self.retried = 0
+        self.deduplicated = 0
+        self.failures = 0
+
+    def _request(self, path: str, params: dict) -> dict:
+        params = {k: v for k, v in dict(params, key=self.key).items() if v}
+        for attempt in range(self.retries + 1):
+            retry = attempt < self.retries
+            try:
+                self.requests += 1
+                response = self._session.get(self.base_url + path, params=params, timeout=self.timeout)
+                if response.status_code in RETRY_STATUS and retry:
+                    raise AMapError(f"HTTP {response.status_code}")
+                response.raise_for_status()
+                result = response.json()
+                if result.get("status") != "1" and str(result.get("infocode")) in RETRY_INFOCODES and retry:
+                    raise AMapError(result.get("info"))
+                return result
+            except (requests.ConnectionError, requests.Timeout, AMapError) as error:
+                if not retry:
+                    self.failures += 1
+                    raise AMapError(str(error)) from error
+                self.retried += 1
+                time.sleep(self.backoff * (2 ** attempt))
+            except Exception:
+                self.failures += 1
+                raise
+
+    def _cached(self, cache: Optional[ResponseCache], task: str, key: str, fetch: Callable[[], dict]) -> dict:
+        """
+        先查缓存，未命中时同一键只由一个线程请求，成功（status 为 1）的结果写入缓存
+        """
+        if cache is not None and cache.enabled:
+            text = cache.get(key)
+            if text is not None:
+                return json.loads(text)
+
+        with self._lock:
+            future = self._inflight.get(key)
+            owner = future is None
+            if owner:
+                future = self._inflight[key] = Future()
+        if not owner:
+            self.deduplicated += 1
+            # 每个调用方各自解析一份，避免共用同一个可变对象
+            return json.loads(future.result())
+
+        try:
+            start = time.perf_counter()
+            result = fetch()
+            text = json.dumps(result, ensure_ascii=False)
+            if cache is not None and cache.enabled and result.get("status") == "1":
+                cache.put(key, task, text, (time.perf_counter() - start) * 1000)
+            future.set_result(text)
+            return result
+        except BaseException as error:
+            future.set_exception(error)
+            raise
+        finally:
+            with self._lock:
+                self._inflight.pop(key, None)
+
+    def geocode(self, address: str, city: Optional[str] = None) -> dict:
+        """
+        地理编码，返回高德接口原始结果
+        """
+        address, city = normalize_text(address), normalize_text(city)
+        key = response_key("geocode", address, city)
+        return self._cached(self.geocode_cache, "geocode", key,
+                            lambda: self._request(GEOCODE_PATH, {"address": address, "city": city}))
+
+    def transit_route(self, origin: str, destination: str, city: str = "", cityd: str = "",
+                      nightflag: str = "1") -> dict:
+        """
+        公交路线规划，返回高德接口原始结果
+        """
+        origin, destination = normalize_location(origin), normalize_location(destination)
+        city, cityd = normalize_text(city), normalize_text(cityd)
+        key = response_key("route", origin, destination, city, cityd, nightflag)
+        params = {"origin": origin, "destination": destination, "city1": city, "cityd": cityd,
+                  "nightflag": nightflag}
+        return self._cached(self.route_cache, "route", key, lambda: self._request(TRANSIT_ROUTE_PATH, params))
+
+    def stats(self) -> dict:
+        return {
+            "requests": self.requests,
+            "retried": self.retried,
+            "deduplicated": self.deduplicated,
+            "failures": self.failures,
+            "geocode_cache": self.geocode_cache.stats() if self.geocode_cache else None,
+            "route_cache": self.route_cache.stats() if self.route_cache else None,
+        }
+
+
+def _build_client() -> AMapClient:
+    amap_config = config.get('AMAP', {})
+    cache_config = amap_config.get('cache', {})
+    cache_path = os.path.join(SERVER_DIR, cache_config.get('path', 'amap_cache.sqlite3'))
+    enabled = cache_config.get('enabled', True)
+    return AMapClient(
+        key=amap_config.get('AMAP_API_KEY', ''),
+        base_url=os.environ.get('AMAP_BASE_URL') or amap_config.get('base_url', 'https://restapi.amap.com'),
+        timeout=amap_config.get('timeout', 5.0),
+        retries=amap_config.get('retries', 2),
+        backoff=amap_config.get('backoff', 0.5),
+        geocode_cache=ResponseCache(cache_path, ttl=cache_config.get('geocode_ttl_seconds', 30 * 86400),
+                                    max_entries=cache_config.get('geocode_max_entries', 20000),
+                                    enabled=enabled, table='amap_geocode'),
+        route_cache=ResponseCache(cache_path, ttl=cache_config.get('route_ttl_seconds', 86400),
+                                  max_entries=cache_config.get('route_max_entries', 5000),
+                                  enabled=enabled, table='amap_route'),
+    )
+
+
+amap_client = _build_client()
@@ -0,0 +1,93 @@
+import codecs
+import csv
+import json
+from typing import AsyncIterator, Optional, Tuple
+
+NDJSON = "ndjson"
+CSV = "csv"
+
+# (行号, 记录, 解析错误)，解析失败时记录为 None
+Record = Tuple[int, Optional[dict], Optional[str]]
+
+
+def detect_format(content_type: Optional[str], data_format: Optional[str] = None) -> str:
+    """
+    根据显式参数或 Content-Type 判断请求体格式，默认 NDJSON
+    """
+    if data_format:
+        if data_format not in (NDJSON, CSV):
+            raise ValueError(f"不支持的格式: {data_format}")
+        return data_format
+    content_type = (content_type or '').lower()
+    if 'csv' in content_type:
+        return CSV
+    return NDJSON
+
+
+async def _iter_lines(chunks: AsyncIterator[bytes]) -> AsyncIterator[str]:
+    # 增量解码，兼容多字节字符跨块以及 Excel 导出的 BOM
+    decoder = codecs.getincrementaldecoder('utf-8-sig')()
+    buffer = ''
+    async for chunk in chunks:
+        buffer += decoder.decode(chunk)
+        *lines, buffer = buffer.split('\n')
+        for line in lines:
+            yield line.rstrip('\r')
+    buffer += decoder.decode(b'', final=True)
+    if buffer:
+        yield buffer.rstrip('\r')
+
+
+async def iter_ndjson(chunks: AsyncIterator[bytes]) -> AsyncIterator[Record]:
+    """
+    逐行解析 NDJSON，空行跳过
+    """
+    line_no = 0
+    async for line in _iter_lines(chunks):
+        line_no += 1
+        if not line.strip():
+            continue
+        try:
+            record = json.loads(line)
+        except json.JSONDecodeError as e:
+            yield line_no, None, f"JSON 格式错误: {e.msg}"
+            continue
+        if not isinstance(record, dict):
+            yield line_no, None, "每行必须是一个 JSON 对象"
+            continue
+        yield line_no, record, None
+
+
+async def iter_csv(chunks: AsyncIterator[bytes]) -> AsyncIterator[Record]:
+    """
+    逐行解析带表头的 CSV，空单元格视为未填写（不出现在记录中，由校验模型取默认值）；引号内的换行会合并为同一条记录
+    """
+    header = None
+    line_no = 0
+    pending = ''
+    start_line = 0
+    async for line in _iter_lines(chunks):
+        line_no += 1
+        if not pending:
+            start_line = line_no
+        pending = f"{pending}\n{line}" if pending else line
+        # 引号未闭合说明字段内含换行，继续拼接下一行
+        if pending.count('"') % 2:
+            continue
+        text, pending = pending, ''
+        if not text.strip():
+            continue
+        values = next(csv.reader([text]))
+        if header is None:
+            header = [name.strip() for name in values]
+            continue
+        if len(values) != len(header):
+            yield start_line, None, f"列数与表头不一致（{len(values)}/{len(header)}）"
+            continue
+        yield start_line, {name: value for name, value in zip(header, values) if value != ''}, None
+    if pending:
+        yield start_line, None, "引号未闭合"
+
+
+def iter_records(chunks: AsyncIterator[bytes], data_format: str) -> AsyncIterator[Record]:
+    return iter_csv(chunks) if data_format == CSV else iter_ndjson(chunks)
@@ -0,0 +1,109 @@
+import asyncio
+import uuid
+from typing import Dict, Optional, Tuple
+
+from .config import config
+
+# 队列中的结束标记：智能体本轮处理完毕
+END_OF_TURN = None
+
+
+class ResultChannels:
+    """
+    按关联 ID（correlation id）分发智能体响应
+    每个 /server 请求打开自己的队列，只读取带有自己关联 ID 的响应；请求结束后关闭，迟到的响应直接丢弃。
+    分发方不能因某个客户端读得慢而阻塞，队列积压超过 max_pending 条时该通道被标记为溢出并结束
+    """
+
+    def __init__(self, max_pending: int = 1000):
+        self.max_pending = max_pending
+        self._queues: Dict[str, asyncio.Queue] = {}
+        self.opened = 0
+        self.delivered = 0
+        self.dropped = 0
+        self.overflowed = 0
+
+    def open(self, correlation_id: Optional[str] = None) -> Tuple[str, asyncio.Queue]:
+        correlation_id = correlation_id or uuid.uuid4().hex
+        queue = self._queues[correlation_id] = asyncio.Queue()
+        self.opened += 1
+        return correlation_id, queue
+
+    def close(self, correlation_id: str):
+        self._queues.pop(correlation_id, None)
+
+    def put(self, correlation_id: Optional[str], item) -> bool:
+        queue = self._queues.get(correlation_id) if correlation_id else None
+        if queue is None:
+            self.dropped += 1
+            return False
+        if queue.qsize() >= self.max_pending:
+            # 客户端长期不读：关闭通道，读取方取到结束标记后退出
+            self.overflowed += 1
+            self.close(correlation_id)
+            queue.put_nowait(END_OF_TURN)
+            return False
+        queue.put_nowait(item)
+        self.delivered += 1
+        return True
+
+    def finish(self, correlation_id: Optional[str]) -> bool:
+        queue = self._queues.get(correlation_id) if correlation_id else None
+        if queue is None:
+            return False
+        queue.put_nowait(END_OF_TURN)
+        return True
+
+    def stats(self) -> dict:
+        return {
+            "open": len(self._queues),
+            "opened": self.opened,
+            "delivered": self.delivered,
+            "dropped": self.dropped,
+            "overflowed": self.overflowed,
+        }
+
+
+result_channels = ResultChannels(max_pending=config.get('chat_stream', {}).get('max_pending', 1000))
+
+
+def drain(queue: asyncio.Queue, first) -> list:
+    """
+    取出队列中已到达的全部结果，连续的同一发送方的文本片段合并为一条，
+    客户端读得慢时帧数随之减少；遇到结束标记即停止
+    """
+    items = [first]
+    while items[-1] is not END_OF_TURN and not queue.empty():
+        items.append(queue.get_nowait())
+    merged = []
+    for item in items:
+        previous = merged[-1] if merged else None
+        if (item is not END_OF_TURN and previous is not None and previous is not END_OF_TURN
+                and item.get("Chunk") and previous.get("Chunk") and item.get("Sender") == previous.get("Sender")):
+            merged[-1] = dict(previous, Content=previous["Content"] + item["Content"])
+        else:
+            merged.append(item)
+    return merged
+
+
+def deliver_response(message) -> None:
+    """
+    将智能体响应（AgentResponse）转换为接口返回的结果，送入发起请求的通道
+    """
+    correlation_id = message.correlation_id
+    if message.end_of_turn:
+        result_channels.finish(correlation_id)
+        return
+    for msg in message.context:
+        if msg.type == 'AssistantMessage' and isinstance(msg.content, list):
+            # 工具调用逐个转为文本
+            for func_call in msg.content:
+                response = f"工具ID：{func_call.id}\n工具名称：{func_call.name}\n工具参数：{func_call.arguments}"
+                result_channels.put(correlation_id, {"Sender": msg.source, "Content": response})
+        elif msg.type in ('UserMessage', 'AssistantMessage') and isinstance(msg.content, str):
+            result = {"Sender": msg.source, "Content": msg.content}
+            if message.chunk:
+                result["Chunk"] = True
+            result_channels.put(correlation_id, result)
+        elif msg.type != 'FunctionExecutionResultMessage':
+            raise Exception(f"未知消息类型:{msg.type}")
@@ -0,0 +1,244 @@
+import bisect
+import re
+import warnings
+from collections import OrderedDict
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+# 宽表列名 y202201_avg_temp / 原始表头 202201_avg_temp -> (月份 202201, 指标 avg_temp)
+_COLUMN = re.compile(r"^y?(\d{4})(\d{2})_([A-Za-z]\w*)$")
+
+# (admin_code, 月份 YYYYMM, 指标, 数值)
+ClimateValue = Tuple[str, int, str, float]
+
+# 按月累加有意义的指标，摘要中给出年总量
+SUMMED_METRICS = {'avg_precip'}
+SIMILAR_CACHE_SIZE = 1024
+
+
+def parse_column(name: str) -> Optional[Tuple[int, str]]:
+    """
+    解析宽表列名，不是气候数据列时返回 None
+    """
+    match = _COLUMN.match(name.strip())
+    if not match or not 1 <= int(match.group(2)) <= 12:
+        return None
+    return int(match.group(1) + match.group(2)), match.group(3)
+
+
+def column_name(month: int, metric: str) -> str:
+    return f"y{month}_{metric}"
+
+
+def wide_to_long(record: dict, admin_code: str) -> List[ClimateValue]:
+    """
+    宽表的一行（列名 -> 数值）转换为长表记录，空值不保存
+    """
+    values = []
+    for name, value in record.items():
+        key = parse_column(name)
+        if key is None or value is None or value == '':
+            continue
+        values.append((admin_code, key[0], key[1], float(value)))
+    return values
+
+
+class ClimateMatrix:
+    """
+    气候数据的内存矩阵：values[区划, 指标, 月份]，缺失值为 NaN
+    区划、指标、月份均有序，月份范围查询为二分定位后的切片
+    """
+
+    def __init__(self, values: Iterable[ClimateValue]):
+        values = list(values)
+        self.admin_codes: List[str] = sorted({value[0] for value in values})
+        self.months: List[int] = sorted({value[1] for value in values})
+        self.metrics: List[str] = sorted({value[2] for value in values})
+        self._code_index = {code: i for i, code in enumerate(self.admin_codes)}
+        self._metric_index = {metric: i for i, metric in enumerate(self.metrics)}
+        month_index = {month: i for i, month in enumerate(self.months)}
+        self.values = np.full((len(self.admin_codes), len(self.metrics), len(self.months)), np.nan)
+        if values:
+            codes, months, metrics, numbers = zip(*((self._code_index[code], month_index[month],
+                                                     self._metric_index[metric], number)
+                                                    for code, month, metric, number in values))
+            self.values[np.array(codes), np.array(metrics), np.array(months)] = np.array(numbers, dtype=float)
+        self._climatology: Optional[np.ndarray] = None
+        self._standardized: Optional[np.ndarray] = None
+        self._similar: "OrderedDict[tuple, List[dict]]" = OrderedDict()
+
+    def __len__(self):
+        return len(self.admin_codes)
+
+    def __contains__(self, admin_code: str) -> bool:
+        return admin_code in self._code_index
+
+    def index_of(self, admin_code: str) -> Optional[int]:
+        return self._code_index.get(admin_code)
+
+    def month_slice(self, start: Optional[int] = None, end: Optional[int] = None) -> slice:
+        """
+        [start, end] 月份范围（含两端）在月份轴上的切片
+        """
+        low = 0 if start is None else bisect.bisect_left(self.months, start)
+        high = len(self.months) if end is None else bisect.bisect_right(self.months, end)
+        return slice(low, high)
+
+    def metric_indexes(self, metrics: Optional[Sequence[str]] = None) -> List[int]:
+        if metrics is None:
+            return list(range(len(self.metrics)))
+        unknown = [metric for metric in metrics if metric not in self._metric_index]
+        if unknown:
+            raise ValueError(f"不支持的气候指标: {', '.join(unknown)}")
+        return [self._metric_index[metric] for metric in metrics]
+
+    @staticmethod
+    def _to_list(array: np.ndarray) -> List[Optional[float]]:
+        return [None if value != value else value for value in array.tolist()]
+
+    def series(self, admin_code: str, metrics: Optional[Sequence[str]] = None,
+               start: Optional[int] = None, end: Optional[int] = None) -> Optional[dict]:
+        """
+        单个区划在月份范围内各指标的时间序列（列式：共用一个月份数组）
+        """
+        index = self.index_of(admin_code)
+        if index is None:
+            return None
+        metric_indexes = self.metric_indexes(metrics)
+        months = self.month_slice(start, end)
+        block = self.values[index][:, months]
+        return {
+            "admin_code": admin_code,
+            "months": self.months[months],
+            "series": {self.metrics[i]: self._to_list(block[i]) for i in metric_indexes},
+        }
+
+    def wide(self, admin_code: str) -> Optional[dict]:
+        """
+        兼容原宽表的单行：admin_code 与 y{月份}_{指标} 列
+        """
+        index = self.index_of(admin_code)
+        if index is None:
+            return None
+        row: Dict[str, object] = {"admin_code": admin_code}
+        for metric_index, metric in enumerate(self.metrics):
+            for month, value in zip(self.months, self._to_list(self.values[index, metric_index])):
+                row[column_name(month, metric)] = value
+        return row
+
+    def all_wide(self) -> List[dict]:
+        return [self.wide(admin_code) for admin_code in self.admin_codes]
+
+    # ---------------------------------------------------------------- 统计与相似度
+    # 各指标按日历月份（1-12 月）取多年平均后的气候态，区划之间的比较均基于气候态
+
+    def climatology(self) -> np.ndarray:
+        """
+        [区划, 指标, 12] 各日历月份的多年平均，缺失为 NaN，首次调用时计算
+        """
+        if self._climatology is None:
+            calendar = np.array([month % 100 - 1 for month in self.months], dtype=int)
+            one_hot = np.zeros((len(self.months), 12))
+            one_hot[np.arange(len(self.months)), calendar] = 1.0
+            valid = ~np.isnan(self.values)
+            sums = np.where(valid, self.values, 0.0) @ one_hot
+            counts = valid.astype(float) @ one_hot
+            with np.errstate(invalid='ignore', divide='ignore'):
+                self._climatology = np.where(counts > 0, sums / counts, np.nan)
+        return self._climatology
+
+    def _features(self) -> np.ndarray:
+        # 相似度特征：气候态按列标准化，使各指标、各月份权重相同
+        if self._standardized is None:
+            climatology = self.climatology()
+            with warnings.catch_warnings():
+                # 全部缺失的列均值为 NaN，标准化后仍为 NaN，计算距离时跳过
+                warnings.simplefilter('ignore', RuntimeWarning)
+                mean = np.nanmean(climatology, axis=0)
+                std = np.nanstd(climatology, axis=0)
+            self._standardized = (climatology - mean) / np.where(std > 0, std, 1.0)
+        return self._standardized
+
+    def summary(self, admin_code: str, metrics: Optional[Sequence[str]] = None) -> Optional[dict]:
+        """
+        单个区划的气候摘要：各指标的年平均、最冷/最热月（最小/最大月均值）与季节振幅，
+        累加型指标（降水）另给出年总量
+        """
+        index = self.index_of(admin_code)
+        if index is None:
+            return None
+        climatology = self.climatology()[index]
+        result = {}
+        for i in self.metric_indexes(metrics):
+            monthly = climatology[i]
+            if np.isnan(monthly).all():
+                continue
+            metric = self.metrics[i]
+            stats = {
+                "mean": _round(np.nanmean(monthly)),
+                "min": _round(np.nanmin(monthly)),
+                "max": _round(np.nanmax(monthly)),
+                "amplitude": _round(np.nanmax(monthly) - np.nanmin(monthly)),
+                "min_month": int(np.nanargmin(monthly)) + 1,
+                "max_month": int(np.nanargmax(monthly)) + 1,
+            }
+            if metric in SUMMED_METRICS:
+                stats["total"] = _round(np.nansum(monthly))
+            result[metric] = stats
+        return result
+
+    def compare(self, admin_code: str, other: str, metrics: Optional[Sequence[str]] = None) -> Optional[dict]:
+        """
+        两个区划的气候摘要与差值（other - admin_code），含逐月差值
+        """
+        first, second = self.index_of(admin_code), self.index_of(other)
+        if first is None or second is None:
+            return None
+        base, target = self.summary(admin_code, metrics), self.summary(other, metrics)
+        climatology = self.climatology()
+        delta = {}
+        for metric in base.keys() & target.keys():
+            i = self._metric_index[metric]
+            delta[metric] = {key: _round(target[metric][key] - base[metric][key])
+                             for key in ("mean", "min", "max", "amplitude", "total") if key in base[metric]}
+            delta[metric]["monthly"] = self._to_list(np.round(climatology[second, i] - climatology[first, i], 2))
+        return {"admin_code": admin_code, "other": other, "summary": base, "other_summary": target, "delta": delta}
+
+    def similar(self, admin_code: str, k: int = 10, metrics: Optional[Sequence[str]] = None) -> Optional[List[dict]]:
+        """
+        按气候态与所有区划的距离（标准化后的均方根差）排序，返回最相似的 k 个区划（不含自身）
+        一次矩阵运算完成，结果按 (区划, 指标, k) 缓存
+        """
+        index = self.index_of(admin_code)
+        if index is None:
+            return None
+        metric_indexes = self.metric_indexes(metrics)
+        key = (admin_code, tuple(metric_indexes), k)
+        cached = self._similar.get(key)
+        if cached is not None:
+            self._similar.move_to_end(key)
+            return cached
+
+        features = self._features()[:, metric_indexes].reshape(len(self), -1)
+        difference = features - features[index]
+        valid = ~np.isnan(difference)
+        counts = valid.sum(axis=1)
+        squares = np.where(valid, difference, 0.0) ** 2
+        with np.errstate(invalid='ignore', divide='ignore'):
+            distances = np.where(counts > 0, np.sqrt(squares.sum(axis=1) / counts), np.inf)
+        distances[index] = np.inf
+        count = min(k, int(np.isfinite(distances).sum()))
+        nearest = np.argpartition(distances, count - 1)[:count] if count else np.array([], dtype=int)
+        nearest = nearest[np.argsort(distances[nearest], kind='stable')]
+        result = [{"admin_code": self.admin_codes[i], "distance": _round(distances[i], 4),
+                   "similarity": _round(1.0 / (1.0 + distances[i]), 4)} for i in nearest.tolist()]
+
+        self._similar[key] = result
+        if len(self._similar) > SIMILAR_CACHE_SIZE:
+            self._similar.popitem(last=False)
+        return result
+
+
+def _round(value, digits: int = 2) -> float:
+    return round(float(value), digits)
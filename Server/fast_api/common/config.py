@@ -0,0 +1,16 @@
+import json
+import os
+
+# Server/config.json，按文件位置解析，避免依赖启动时的工作目录
+CONFIG_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))), 'config.json')
+
+
+def load_config(path: str = CONFIG_PATH) -> dict:
+    """
+    读取服务端配置文件
+    """
+    with open(path, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+
+config = load_config()
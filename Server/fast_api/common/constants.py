@@ -4,5 +4,4 @@ SERVER_URL="http://127.0.0.1:8080"
 from autogen_ext.runtimes.grpc import GrpcWorkerAgentRuntime
 runtime_closure = GrpcWorkerAgentRuntime(host_address="localhost:50051")
 
-import asyncio
-result_queue = asyncio.Queue()
\ No newline at end of file
+from .channels import result_channels
\ No newline at end of file
@@ -0,0 +1,37 @@
+import json
+from typing import AsyncIterator, List, Optional, Tuple
+
+GEOJSON_MEDIA_TYPE = "application/geo+json"
+
+# (GeoJSON 几何文本, 属性)
+FeatureRow = Tuple[Optional[str], dict]
+
+
+def feature(geometry: Optional[dict], properties: dict) -> dict:
+    return {"type": "Feature", "geometry": geometry, "properties": properties}
+
+
+def feature_collection(features: List[dict]) -> dict:
+    return {"type": "FeatureCollection", "features": features}
+
+
+async def iter_feature_collection(rows: AsyncIterator[FeatureRow], chunk_size: int = 64 * 1024) -> AsyncIterator[bytes]:
+    """
+    将逐行产生的要素拼接为 FeatureCollection 字节流，几何文本原样嵌入不再解析；
+    按 chunk_size 聚合后输出，内存占用与结果总量无关
+    """
+    parts = ['{"type":"FeatureCollection","features":[']
+    size = 0
+    separator = ''
+    async for geometry, properties in rows:
+        text = (f'{separator}{{"type":"Feature","geometry":{geometry or "null"},"properties":'
+                f'{json.dumps(properties, ensure_ascii=False, default=str)}}}')
+        separator = ','
+        parts.append(text)
+        size += len(text)
+        if size >= chunk_size:
+            yield ''.join(parts).encode('utf-8')
+            parts = []
+            size = 0
+    parts.append(']}')
+    yield ''.join(parts).encode('utf-8')
@@ -0,0 +1,349 @@
+import json
+import re
+import struct
+from typing import List, Optional, Tuple
+
+# WKB 几何类型编号
+_WKB_TYPES = {
+    1: "Point",
+    2: "LineString",
+    3: "Polygon",
+    4: "MultiPoint",
+    5: "MultiLineString",
+    6: "MultiPolygon",
+    7: "GeometryCollection",
+}
+# GeoPackage 头部 envelope 指示位 -> envelope 字节数
+_ENVELOPE_SIZES = {0: 0, 1: 32, 2: 48, 3: 48, 4: 64}
+
+
+class GeometryDecodeError(ValueError):
+    pass
+
+
+def gpkg_to_wkb(blob: bytes) -> Tuple[Optional[int], bytes]:
+    """
+    解析 GeoPackage 几何 blob（"GP" 头 + 标准 WKB），返回 (srid, wkb)
+    空几何返回的 wkb 为空字节串
+    """
+    if len(blob) < 8 or blob[:2] != b"GP":
+        raise GeometryDecodeError("不是 GeoPackage 几何数据")
+    flags = blob[3]
+    byte_order = "<" if flags & 0x01 else ">"
+    envelope = (flags >> 1) & 0x07
+    if envelope not in _ENVELOPE_SIZES:
+        raise GeometryDecodeError(f"无效的 envelope 类型: {envelope}")
+    srid = struct.unpack_from(byte_order + "i", blob, 4)[0]
+    if flags & 0x10:
+        return srid, b""
+    return srid, bytes(blob[8 + _ENVELOPE_SIZES[envelope]:])
+
+
+class _WKBReader:
+    def __init__(self, data: bytes):
+        self.data = data
+        self.offset = 0
+
+    def _unpack(self, fmt: str):
+        values = struct.unpack_from(fmt, self.data, self.offset)
+        self.offset += struct.calcsize(fmt)
+        return values
+
+    def read(self) -> dict:
+        byte_order = "<" if self._unpack("B")[0] == 1 else ">"
+        code = self._unpack(byte_order + "I")[0]
+        # 兼容 EWKB（高位标志）与 ISO WKB（千位编码）的 Z/M 维度
+        has_z = bool(code & 0x80000000)
+        has_m = bool(code & 0x40000000)
+        if code & 0x20000000:
+            self._unpack(byte_order + "I")  # EWKB 内嵌 SRID
+        code &= 0x0FFFFFFF
+        if code >= 1000:
+            dims, code = divmod(code, 1000)
+            has_z = has_z or dims in (1, 3)
+            has_m = has_m or dims in (2, 3)
+        geometry_type = _WKB_TYPES.get(code)
+        if geometry_type is None:
+            raise GeometryDecodeError(f"不支持的 WKB 几何类型: {code}")
+
+        point_fmt = byte_order + "d" * (2 + has_z + has_m)
+
+        def count():
+            return self._unpack(byte_order + "I")[0]
+
+        def point():
+            # 只保留平面坐标
+            return self._unpack(point_fmt)[:2]
+
+        def points():
+            return [point() for _ in range(count())]
+
+        if geometry_type == "Point":
+            coordinates = point()
+        elif geometry_type == "LineString":
+            coordinates = points()
+        elif geometry_type == "Polygon":
+            coordinates = [points() for _ in range(count())]
+        elif geometry_type == "GeometryCollection":
+            return {"type": geometry_type, "geometries": [self.read() for _ in range(count())]}
+        else:
+            # Multi* 由若干个完整的子 WKB 组成
+            coordinates = [self.read()["coordinates"] for _ in range(count())]
+        return {"type": geometry_type, "coordinates": coordinates}
+
+
+def read_wkb(wkb: bytes) -> dict:
+    """
+    将 WKB 解析为 GeoJSON 结构的几何对象（坐标仅保留 x、y）
+    """
+    try:
+        return _WKBReader(wkb).read()
+    except struct.error as e:
+        raise GeometryDecodeError(f"WKB 数据不完整: {e}")
+
+
+def _format_number(value: float) -> str:
+    # 最短可往返的十进制表示，避免科学计数法
+    text = repr(float(value))
+    if "e" in text or "E" in text:
+        text = f"{value:.17f}".rstrip("0")
+    return text[:-2] if text.endswith(".0") else text.rstrip(".")
+
+
+def _wkt_coordinates(geometry_type: str, coordinates) -> str:
+    def point(coordinate):
+        return f"{_format_number(coordinate[0])} {_format_number(coordinate[1])}"
+
+    def ring(coordinate_list):
+        return "(" + ",".join(point(coordinate) for coordinate in coordinate_list) + ")"
+
+    def polygon(rings):
+        return "(" + ",".join(ring(coordinate_list) for coordinate_list in rings) + ")"
+
+    if geometry_type == "Point":
+        return f"({point(coordinates)})"
+    if geometry_type == "LineString":
+        return ring(coordinates)
+    if geometry_type == "Polygon":
+        return polygon(coordinates)
+    if geometry_type == "MultiPoint":
+        return "(" + ",".join(f"({point(coordinate)})" for coordinate in coordinates) + ")"
+    if geometry_type == "MultiLineString":
+        return polygon(coordinates)
+    if geometry_type == "MultiPolygon":
+        return "(" + ",".join(polygon(rings) for rings in coordinates) + ")"
+    raise GeometryDecodeError(f"不支持的几何类型: {geometry_type}")
+
+
+def to_wkt(geometry: dict) -> str:
+    """
+    GeoJSON 结构的几何对象转换为 WKT
+    """
+    geometry_type = geometry["type"]
+    if geometry_type == "GeometryCollection":
+        return "GEOMETRYCOLLECTION(" + ",".join(to_wkt(item) for item in geometry["geometries"]) + ")"
+    return geometry_type.upper() + _wkt_coordinates(geometry_type, geometry["coordinates"])
+
+
+def gpkg_to_wkt(blob: bytes) -> Optional[str]:
+    """
+    GeoPackage 几何 blob 直接转换为 WKT，空几何返回 None
+    """
+    _, wkb = gpkg_to_wkb(blob)
+    return to_wkt(read_wkb(wkb)) if wkb else None
+
+
+_WKT_TOKEN = re.compile(r"\s*([A-Za-z]+|[-+0-9.eE]+|[(),])")
+_WKT_TYPES = {name.upper(): name for name in _WKB_TYPES.values()}
+
+
+class _WKTReader:
+    def __init__(self, text: str):
+        self.tokens: List[str] = _WKT_TOKEN.findall(text)
+        self.position = 0
+
+    def peek(self) -> Optional[str]:
+        return self.tokens[self.position] if self.position < len(self.tokens) else None
+
+    def take(self, expected: Optional[str] = None) -> str:
+        token = self.peek()
+        if token is None or (expected is not None and token != expected):
+            raise GeometryDecodeError(f"WKT 格式错误，期望 {expected or '更多内容'}，实际为 {token}")
+        self.position += 1
+        return token
+
+    def point(self) -> Tuple[float, float]:
+        values = []
+        while self.peek() not in (',', ')', None):
+            values.append(float(self.take()))
+        if len(values) < 2:
+            raise GeometryDecodeError("WKT 坐标至少需要两个分量")
+        return values[0], values[1]
+
+    def sequence(self, item):
+        self.take('(')
+        items = [item()]
+        while self.peek() == ',':
+            self.take(',')
+            items.append(item())
+        self.take(')')
+        return items
+
+    def multipoint_item(self):
+        # MULTIPOINT 同时兼容 (1 2, 3 4) 与 ((1 2), (3 4)) 两种写法
+        if self.peek() == '(':
+            return self.sequence(self.point)[0]
+        return self.point()
+
+    def read(self) -> dict:
+        geometry_type = _WKT_TYPES.get(self.take().upper())
+        if geometry_type is None:
+            raise GeometryDecodeError("不支持的 WKT 几何类型")
+        while self.peek() and self.peek().upper() in ('Z', 'M', 'ZM'):
+            self.take()
+        if geometry_type == "GeometryCollection":
+            return {"type": geometry_type, "geometries": self.sequence(self.read)}
+        if geometry_type == "Point":
+            coordinates = self.sequence(self.point)[0]
+        elif geometry_type == "LineString":
+            coordinates = self.sequence(self.point)
+        elif geometry_type == "Polygon":
+            coordinates = self.sequence(lambda: self.sequence(self.point))
+        elif geometry_type == "MultiPoint":
+            coordinates = self.sequence(self.multipoint_item)
+        elif geometry_type == "MultiLineString":
+            coordinates = self.sequence(lambda: self.sequence(self.point))
+        else:
+            coordinates = self.sequence(lambda: self.sequence(lambda: self.sequence(self.point)))
+        return {"type": geometry_type, "coordinates": coordinates}
+
+
+def read_wkt(text: str) -> dict:
+    """
+    将 WKT（可带 SRID=xxxx; 前缀）解析为 GeoJSON 结构的几何对象
+    """
+    if ';' in text and text.lstrip().upper().startswith('SRID='):
+        text = text.split(';', 1)[1]
+    try:
+        return _WKTReader(text).read()
+    except ValueError as e:
+        raise GeometryDecodeError(f"WKT 格式错误: {e}")
+
+
+def to_geometry(value) -> Optional[dict]:
+    """
+    将数据库或接口中的几何值（WKB bytes、geoalchemy2 的 WKB/WKT 元素、WKT 或十六进制 WKB 字符串）
+    统一解析为 GeoJSON 结构
+    """
+    if value is None:
+        return None
+    if isinstance(value, (bytes, bytearray, memoryview)):
+        return read_wkb(bytes(value))
+    data = getattr(value, 'data', value)  # geoalchemy2 元素
+    if isinstance(data, (bytes, bytearray, memoryview)):
+        return read_wkb(bytes(data))
+    text = str(data).strip()
+    if re.fullmatch(r"[0-9A-Fa-f]+", text):
+        return read_wkb(bytes.fromhex(text))
+    return read_wkt(text)
+
+
+def geometry_column(column, dialect_name: str):
+    """
+    查询几何列时使用的表达式：MySQL 下以 经度/纬度 顺序取 WKB，与 GeoPackage、GeoJSON 一致
+    """
+    if dialect_name == 'mysql':
+        from sqlalchemy import func, LargeBinary
+        return func.ST_AsBinary(column, 'axis-order=long-lat', type_=LargeBinary)
+    return column
+
+
+_WKB_CODES = {name: code for code, name in _WKB_TYPES.items()}
+
+
+def to_wkb(geometry: dict) -> bytes:
+    """
+    GeoJSON 结构的几何对象转换为小端序二维 WKB
+    """
+    geometry_type = geometry["type"]
+    parts = [struct.pack("<BI", 1, _WKB_CODES[geometry_type])]
+
+    def points(coordinate_list):
+        parts.append(struct.pack("<I", len(coordinate_list)))
+        parts.extend(struct.pack("<dd", coordinate[0], coordinate[1]) for coordinate in coordinate_list)
+
+    coordinates = geometry.get("coordinates")
+    if geometry_type == "Point":
+        parts.append(struct.pack("<dd", coordinates[0], coordinates[1]))
+    elif geometry_type == "LineString":
+        points(coordinates)
+    elif geometry_type == "Polygon":
+        parts.append(struct.pack("<I", len(coordinates)))
+        for ring in coordinates:
+            points(ring)
+    elif geometry_type == "GeometryCollection":
+        parts.append(struct.pack("<I", len(geometry["geometries"])))
+        parts.extend(to_wkb(item) for item in geometry["geometries"])
+    else:
+        member_type = geometry_type[len("Multi"):]
+        parts.append(struct.pack("<I", len(coordinates)))
+        parts.extend(to_wkb({"type": member_type, "coordinates": item}) for item in coordinates)
+    return b"".join(parts)
+
+
+def round_geometry(geometry: dict, digits: int) -> dict:
+    """
+    坐标保留 digits 位小数（量化），并去掉因此产生的相邻重复点
+    """
+    def point(coordinate):
+        return round(coordinate[0], digits), round(coordinate[1], digits)
+
+    def line(coordinate_list, minimum):
+        result = []
+        for coordinate in coordinate_list:
+            coordinate = point(coordinate)
+            if not result or result[-1] != coordinate:
+                result.append(coordinate)
+        # 去重后退化的线、环保留原有点数
+        return result if len(result) >= minimum else [point(coordinate) for coordinate in coordinate_list]
+
+    geometry_type = geometry["type"]
+    if geometry_type == "GeometryCollection":
+        return {"type": geometry_type, "geometries": [round_geometry(item, digits) for item in geometry["geometries"]]}
+    coordinates = geometry["coordinates"]
+    if geometry_type == "Point":
+        coordinates = point(coordinates)
+    elif geometry_type in ("LineString", "MultiPoint"):
+        coordinates = line(coordinates, 2) if geometry_type == "LineString" else [point(item) for item in coordinates]
+    elif geometry_type == "MultiLineString":
+        coordinates = [line(item, 2) for item in coordinates]
+    elif geometry_type == "Polygon":
+        coordinates = [line(ring, 4) for ring in coordinates]
+    else:
+        coordinates = [[line(ring, 4) for ring in rings] for rings in coordinates]
+    return {"type": geometry_type, "coordinates": coordinates}
+
+
+def geojson_column(column, dialect_name: str, digits: int, wkb: bool = False):
+    """
+    查询几何列时直接输出 GeoJSON 的表达式：MySQL 下由数据库 ST_AsGeoJSON 转换，
+    其他数据库返回原始几何，由 geojson_text 在 Python 中转换
+    :param wkb: 列中保存的是 WKB 字节（如化简几何表）而非几何类型
+    """
+    if dialect_name != 'mysql':
+        return column
+    from sqlalchemy import func
+    if wkb:
+        column = func.ST_GeomFromWKB(column, 4326, 'axis-order=long-lat')
+    return func.ST_AsGeoJSON(column, digits)
+
+
+def geojson_text(value, digits: int) -> Optional[str]:
+    """
+    geojson_column 查询结果转换为 GeoJSON 文本
+    """
+    if value is None:
+        return None
+    if isinstance(value, str) and value.lstrip().startswith('{'):
+        return value
+    return json.dumps(round_geometry(to_geometry(value), digits), separators=(',', ':'))
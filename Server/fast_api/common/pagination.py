@@ -0,0 +1,231 @@
+import base64
+import json
+from datetime import date, datetime
+from typing import Any, Dict, List, Optional, Sequence
+
+from fastapi import Query
+from sqlalchemy import and_, or_, select
+
+MAX_PAGE_SIZE = 1000
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
+
+
+class PageSpec:
+    """
+    列表接口的分页（keyset 游标）、排序与字段投影参数
+    """
+
+    def __init__(self, limit: Optional[int] = None, after: Optional[str] = None,
+                 order_by: Optional[str] = None, fields: Optional[str] = None):
+        self.limit = limit
+        self.after = after
+        self.order_by = order_by
+        self.fields = fields
+        # 以下由 bind 根据具体资源解析
+        self.key_field: Optional[str] = None
+        self.sort_field: Optional[str] = None
+        self.descending = False
+        self.output_fields: List[str] = []
+        self.cursor: Optional[tuple] = None
+
+    @property
+    def is_default(self) -> bool:
+        """
+        未携带任何分页参数，保持原有的全量返回
+        """
+        return self.limit is None and self.after is None and self.order_by is None and self.fields is None
+
+    @property
+    def projected(self) -> bool:
+        return self.fields is not None
+
+    def bind(self, allowed_fields: Sequence[str], key_field: str,
+             sortable_fields: Optional[Sequence[str]] = None) -> "PageSpec":
+        """
+        按资源允许的字段校验参数，非法参数抛出 ValueError
+        :param allowed_fields: 允许返回的字段（即输出模型的字段）
+        :param key_field: 唯一键字段，用作排序的最后一级与游标定位
+        :param sortable_fields: 允许排序的字段，默认为除几何字段外的 allowed_fields
+        """
+        allowed_fields = list(allowed_fields)
+        sortable_fields = list(sortable_fields) if sortable_fields is not None else \
+            [field for field in allowed_fields if field != 'shape']
+
+        if self.fields is not None:
+            requested = [field.strip() for field in self.fields.split(',') if field.strip()]
+            unknown = [field for field in requested if field not in allowed_fields]
+            if unknown:
+                raise ValueError(f"不支持的字段: {', '.join(unknown)}")
+            if not requested:
+                raise ValueError("fields 不能为空")
+            self.output_fields = list(dict.fromkeys(requested))
+        else:
+            self.output_fields = allowed_fields
+
+        order_by = (self.order_by or key_field).strip()
+        self.descending = order_by.startswith('-')
+        self.sort_field = order_by.lstrip('-+')
+        if self.sort_field not in sortable_fields:
+            raise ValueError(f"不支持的排序字段: {self.sort_field}")
+        self.key_field = key_field
+
+        if self.after:
+            self.cursor = decode_cursor(self.after, order_by)
+        return self
+
+
+class Page:
+    """
+    一页结果及下一页游标（无下一页时为 None）
+    """
+
+    def __init__(self, items: List[dict], next_cursor: Optional[str]):
+        self.items = items
+        self.next_cursor = next_cursor
+
+
+def get_page_spec(
+        limit: Optional[int] = Query(None, ge=1, le=MAX_PAGE_SIZE, description="每页条数"),
+        after: Optional[str] = Query(None, description=f"分页游标，取自上一页响应头 {NEXT_CURSOR_HEADER}"),
+        order_by: Optional[str] = Query(None, description="排序字段，前缀 - 表示降序", examples=["-name"]),
+        fields: Optional[str] = Query(None, description="逗号分隔的返回字段", examples=["college_id,name"]),
+) -> PageSpec:
+    """
+    FastAPI 依赖：从查询参数构造 PageSpec
+    """
+    return PageSpec(limit=limit, after=after, order_by=order_by, fields=fields)
+
+
+def set_page_headers(response, page: Page):
+    """
+    将下一页游标写入响应头，保持响应体仍为原有的数组格式
+    """
+    if page.next_cursor:
+        response.headers[NEXT_CURSOR_HEADER] = page.next_cursor
+
+
+def encode_cursor(order_by: str, sort_value: Any, key_value: Any) -> str:
+    payload = json.dumps([order_by, sort_value, key_value], ensure_ascii=False, separators=(',', ':'))
+    return base64.urlsafe_b64encode(payload.encode('utf-8')).decode('ascii').rstrip('=')
+
+
+def decode_cursor(cursor: str, order_by: str) -> tuple:
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        cursor_order, sort_value, key_value = json.loads(base64.urlsafe_b64decode(padded).decode('utf-8'))
+    except Exception:
+        raise ValueError("无效的分页游标")
+    if cursor_order != order_by:
+        raise ValueError("分页游标与排序字段不匹配")
+    return sort_value, key_value
+
+
+def to_plain(value: Any) -> Any:
+    """
+    将数据库返回值转换为可 JSON 序列化的值（几何字段与 serialize() 一致使用 str）
+    """
+    if value is None or isinstance(value, (str, int, float, bool)):
+        return value
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    return str(value)
+
+
+def _order_key(value: Any) -> tuple:
+    # 与 MySQL 一致：升序时 NULL 在前，降序时 NULL 在后
+    return (value is not None, value)
+
+
+def _next_cursor(spec: PageSpec, last: dict) -> str:
+    order_by = ('-' if spec.descending else '') + spec.sort_field
+    return encode_cursor(order_by, last[spec.sort_field], last[spec.key_field])
+
+
+def _keyset_condition(sort_column, key_column, descending: bool, sort_value: Any, key_value: Any):
+    tie = and_(sort_column == sort_value, key_column > key_value) if sort_value is not None \
+        else and_(sort_column.is_(None), key_column > key_value)
+    if not descending:
+        if sort_value is None:
+            return or_(tie, sort_column.is_not(None))
+        return or_(sort_column > sort_value, tie)
+    if sort_value is None:
+        return tie
+    return or_(sort_column < sort_value, tie, sort_column.is_(None))
+
+
+def apply_keyset(query, sort_column, key_column, spec: PageSpec):
+    """
+    为任意 select 追加 keyset 游标条件、排序与 limit（多取一条用于判断是否有下一页）
+    """
+    if spec.cursor is not None:
+        sort_value, key_value = spec.cursor
+        # 游标中的时间为 isoformat 字符串，还原为 datetime 再与列比较
+        if sort_value is not None and _is_datetime_column(sort_column):
+            sort_value = datetime.fromisoformat(sort_value)
+        query = query.where(_keyset_condition(sort_column, key_column, spec.descending, sort_value, key_value))
+    order = [sort_column.desc() if spec.descending else sort_column.asc()]
+    if spec.sort_field != spec.key_field:
+        order.append(key_column.asc())
+    query = query.order_by(*order)
+    if spec.limit is not None:
+        query = query.limit(spec.limit + 1)
+    return query
+
+
+def _is_datetime_column(column) -> bool:
+    try:
+        return column.type.python_type in (datetime, date)
+    except NotImplementedError:
+        return False
+
+
+async def paginate_query(db_session, model, spec: PageSpec, where: Sequence = ()) -> Page:
+    """
+    以 keyset 方式分页查询，只选取投影字段（以及排序/定位所需字段）
+    :param model: ORM 模型
+    :param spec: 已 bind 的分页参数
+    :param where: 额外的过滤条件
+    """
+    select_fields = list(dict.fromkeys([*spec.output_fields, spec.sort_field, spec.key_field]))
+    query = select(*[getattr(model, field) for field in select_fields]).where(*where)
+    query = apply_keyset(query, getattr(model, spec.sort_field), getattr(model, spec.key_field), spec)
+
+    rows = [{field: to_plain(value) for field, value in row._mapping.items()}
+            for row in await db_session.execute(query)]
+    return build_page(spec, rows)
+
+
+def paginate_rows(rows: Sequence[dict], spec: PageSpec) -> Page:
+    """
+    对内存中的数据（如高校目录缓存）做与 paginate_query 相同语义的分页
+    """
+    ordered = sorted(rows, key=lambda row: row[spec.key_field])
+    ordered.sort(key=lambda row: _order_key(row[spec.sort_field]), reverse=spec.descending)
+
+    if spec.cursor is not None:
+        cursor_order = _order_key(spec.cursor[0])
+        cursor_key = spec.cursor[1]
+
+        def is_after(row: dict) -> bool:
+            row_order = _order_key(row[spec.sort_field])
+            if row_order == cursor_order:
+                return row[spec.key_field] > cursor_key
+            return row_order < cursor_order if spec.descending else row_order > cursor_order
+
+        ordered = [row for row in ordered if is_after(row)]
+    if spec.limit is not None:
+        ordered = ordered[:spec.limit + 1]
+    return build_page(spec, ordered)
+
+
+def build_page(spec: PageSpec, rows: List[dict]) -> Page:
+    """
+    截取一页并生成下一页游标；rows 需已按 spec 排序且最多多出一条
+    """
+    next_cursor = None
+    if spec.limit is not None and len(rows) > spec.limit:
+        rows = rows[:spec.limit]
+        next_cursor = _next_cursor(spec, rows[-1])
+    # 可选的嵌套字段（如审核记录中的原高校信息）缺失时不输出该键
+    items = [{field: row[field] for field in spec.output_fields if field in row} for row in rows]
+    return Page(items, next_cursor)
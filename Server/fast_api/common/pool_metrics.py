@@ -0,0 +1,112 @@
+import threading
+import time
+from collections import deque
+from typing import Dict, Type
+
+from sqlalchemy import exc
+from sqlalchemy.pool import Pool
+
+# 保留最近的取连接耗时样本，用于计算分位数
+LATENCY_SAMPLES = 1024
+
+
+class PoolMetrics:
+    """
+    连接池取连接（checkout）统计：次数、等待次数、超时次数与耗时分布
+    """
+
+    def __init__(self, name: str):
+        self.name = name
+        self._lock = threading.Lock()
+        self._samples = deque(maxlen=LATENCY_SAMPLES)
+        self.checkouts = 0
+        self.waits = 0
+        self.timeouts = 0
+        self.total_wait_ms = 0.0
+        self.max_wait_ms = 0.0
+        self.pool = None
+
+    def record(self, elapsed_ms: float, waited: bool, timed_out: bool = False):
+        with self._lock:
+            if timed_out:
+                self.timeouts += 1
+            else:
+                self.checkouts += 1
+                self._samples.append(elapsed_ms)
+            if waited:
+                self.waits += 1
+                self.total_wait_ms += elapsed_ms
+            self.max_wait_ms = max(self.max_wait_ms, elapsed_ms)
+
+    @staticmethod
+    def _percentile(samples, q: float) -> float:
+        if not samples:
+            return 0.0
+        return samples[min(len(samples) - 1, int(q * len(samples)))]
+
+    def stats(self) -> dict:
+        with self._lock:
+            samples = sorted(self._samples)
+            result = {
+                "checkouts": self.checkouts,
+                "waits": self.waits,
+                "timeouts": self.timeouts,
+                "checkout_ms": {
+                    "p50": round(self._percentile(samples, 0.50), 3),
+                    "p95": round(self._percentile(samples, 0.95), 3),
+                    "p99": round(self._percentile(samples, 0.99), 3),
+                    "max": round(self.max_wait_ms, 3),
+                    "avg_wait": round(self.total_wait_ms / self.waits, 3) if self.waits else 0.0,
+                },
+            }
+        pool = self.pool
+        if pool is not None:
+            # 当前占用情况，直接取自连接池
+            result["pool"] = {
+                "size": pool.size(),
+                "checked_out": pool.checkedout(),
+                "checked_in": pool.checkedin(),
+                "overflow": pool.overflow(),
+                "max_overflow": pool._max_overflow,
+                "timeout": pool.timeout(),
+            }
+        return result
+
+
+# 名称 -> 统计，供指标接口读取
+pool_metrics: Dict[str, PoolMetrics] = {}
+
+
+def instrumented_pool(pool_class: Type[Pool], name: str) -> Type[Pool]:
+    """
+    生成带取连接统计的连接池类，作为 create_engine 的 poolclass 使用
+    统计对象挂在类上，dispose/recreate 后的新连接池沿用同一份统计
+    """
+    metrics = pool_metrics.setdefault(name, PoolMetrics(name))
+
+    class InstrumentedPool(pool_class):
+        def __init__(self, *args, **kwargs):
+            super().__init__(*args, **kwargs)
+            metrics.pool = self
+
+        def _do_get(self):
+            # 空闲连接已用完且溢出连接已达上限时，本次取连接需要排队等待
+            waited = self.checkedin() == 0 and 0 <= self._max_overflow <= self.overflow()
+            start = time.perf_counter()
+            try:
+                connection = super()._do_get()
+            except exc.TimeoutError:
+                metrics.record((time.perf_counter() - start) * 1000, waited, timed_out=True)
+                raise
+            metrics.record((time.perf_counter() - start) * 1000, waited)
+            return connection
+
+    InstrumentedPool.__name__ = f"Instrumented{pool_class.__name__}"
+    return InstrumentedPool
+
+
+def get_pool_stats() -> dict:
+    """
+    所有已注册连接池的统计
+    """
+    return {name: metrics.stats() for name, metrics in pool_metrics.items()}
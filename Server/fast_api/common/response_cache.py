@@ -0,0 +1,152 @@
+import asyncio
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from typing import Optional
+
+from .config import config
+
+# 默认缓存文件与 config.json 同在 Server/ 目录下
+SERVER_DIR = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS {table} (
+    key TEXT PRIMARY KEY,
+    task TEXT NOT NULL,
+    response TEXT NOT NULL,
+    created REAL NOT NULL,
+    accessed REAL NOT NULL,
+    latency_ms REAL NOT NULL
+)
+"""
+
+
+def response_key(*parts: str) -> str:
+    """
+    缓存键：各组成部分（如任务、系统提示、用户输入、模型名）的 SHA-256
+    """
+    return hashlib.sha256(json.dumps(parts, ensure_ascii=False).encode('utf-8')).hexdigest()
+
+
+class ResponseCache:
+    """
+    文本结果（大模型回答、地图接口响应等）的持久化缓存（SQLite），table 区分不同用途
+    条目超过 ttl 秒视为过期；条目数超过 max_entries 时按最近访问时间淘汰（LRU）。
+    命中时累计该条目原始调用耗时，作为节省的延迟
+    """
+
+    def __init__(self, path: str, ttl: float = 86400, max_entries: int = 1000, enabled: bool = True,
+                 table: str = 'llm_response'):
+        self.path = path
+        self.table = table
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.enabled = enabled
+        self._lock = threading.Lock()
+        self._connection: Optional[sqlite3.Connection] = None
+        self.hits = 0
+        self.misses = 0
+        self.bypasses = 0
+        self.stores = 0
+        self.evictions = 0
+        self.saved_ms = 0.0
+
+    def _connect(self) -> sqlite3.Connection:
+        # 首次使用时才创建文件；WAL 模式下多个进程可共用同一个缓存文件
+        if self._connection is None:
+            connection = sqlite3.connect(self.path, check_same_thread=False, timeout=5)
+            connection.execute("PRAGMA journal_mode=WAL")
+            connection.execute(_SCHEMA.format(table=self.table))
+            connection.execute(f"CREATE INDEX IF NOT EXISTS ix_{self.table}_accessed ON {self.table} (accessed)")
+            connection.commit()
+            self._connection = connection
+        return self._connection
+
+    def get(self, key: str) -> Optional[str]:
+        with self._lock:
+            connection = self._connect()
+            row = connection.execute(f"SELECT response, created, latency_ms FROM {self.table} WHERE key = ?",
+                                     (key,)).fetchone()
+            now = time.time()
+            if row is not None and now - row[1] > self.ttl:
+                connection.execute(f"DELETE FROM {self.table} WHERE key = ?", (key,))
+                connection.commit()
+                row = None
+            if row is None:
+                self.misses += 1
+                return None
+            connection.execute(f"UPDATE {self.table} SET accessed = ? WHERE key = ?", (now, key))
+            connection.commit()
+            self.hits += 1
+            self.saved_ms += row[2]
+            return row[0]
+
+    def put(self, key: str, task: str, response: str, latency_ms: float):
+        with self._lock:
+            connection = self._connect()
+            now = time.time()
+            connection.execute(f"INSERT OR REPLACE INTO {self.table} VALUES (?, ?, ?, ?, ?, ?)",
+                               (key, task, response, now, now, latency_ms))
+            # 先清理过期条目，仍超出上限时淘汰最久未访问的
+            expired = connection.execute(f"DELETE FROM {self.table} WHERE created < ?", (now - self.ttl,)).rowcount
+            count = connection.execute(f"SELECT COUNT(*) FROM {self.table}").fetchone()[0]
+            evicted = 0
+            if count > self.max_entries:
+                evicted = connection.execute(
+                    f"DELETE FROM {self.table} WHERE key IN "
+                    f"(SELECT key FROM {self.table} ORDER BY accessed LIMIT ?)", (count - self.max_entries,)).rowcount
+            connection.commit()
+            self.stores += 1
+            self.evictions += expired + evicted
+
+    def clear(self):
+        with self._lock:
+            self._connect().execute(f"DELETE FROM {self.table}")
+            self._connection.commit()
+
+    async def get_or_create(self, task: str, key: str, create, refresh: bool = False) -> str:
+        """
+        命中则直接返回缓存的回答；未命中或 refresh 时调用 create() 并写入缓存
+        :param create: 无参协程函数，返回回答文本
+        """
+        if not self.enabled:
+            return await create()
+        if refresh:
+            self.bypasses += 1
+        else:
+            cached = await asyncio.to_thread(self.get, key)
+            if cached is not None:
+                return cached
+        start = time.perf_counter()
+        response = await create()
+        if isinstance(response, str) and response:
+            await asyncio.to_thread(self.put, key, task, response, (time.perf_counter() - start) * 1000)
+        return response
+
+    def stats(self) -> dict:
+        with self._lock:
+            entries = 0
+            if self._connection is not None:
+                entries = self._connection.execute(f"SELECT COUNT(*) FROM {self.table}").fetchone()[0]
+            lookups = self.hits + self.misses
+            return {
+                "enabled": self.enabled,
+                "entries": entries,
+                "hits": self.hits,
+                "misses": self.misses,
+                "bypasses": self.bypasses,
+                "stores": self.stores,
+                "evictions": self.evictions,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+                "saved_ms": round(self.saved_ms, 1),
+            }
+
+
+_llm_cache_config = config.get('llm_cache', {})
+llm_cache = ResponseCache(os.path.join(SERVER_DIR, _llm_cache_config.get('path', 'llm_cache.sqlite3')),
+                          ttl=_llm_cache_config.get('ttl_seconds', 86400),
+                          max_entries=_llm_cache_config.get('max_entries', 1000),
+                          enabled=_llm_cache_config.get('enabled', True))
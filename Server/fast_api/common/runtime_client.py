@@ -0,0 +1,156 @@
+import asyncio
+import time
+import uuid
+from typing import Any, Callable, List, Optional
+
+from autogen_core import (ClosureAgent,
+                          ClosureContext,
+                          MessageContext,
+                          TopicId,
+                          TypeSubscription,
+                          try_get_known_serializers_for_type)
+from autogen_ext.runtimes.grpc import GrpcWorkerAgentRuntime
+
+from Server.agents.messages import (AgentResponse,
+                                    RESPONSE_TOPIC_TYPE,
+                                    USER_TOPIC_TYPE,
+                                    UserRequest,
+                                    session_shard,
+                                    session_topic_id,
+                                    shard_topic_type)
+from .channels import deliver_response
+from .config import config
+
+RESPONSE_COLLECTOR_TYPE = "collect_result_agent"
+
+
+async def collect_result(_agent: ClosureContext, message: AgentResponse, ctx: MessageContext) -> None:
+    deliver_response(message)
+
+
+class RuntimeClient:
+    """
+    接口进程与智能体运行时之间的长连接 gRPC 客户端
+    - 首次发布消息时才建立连接（智能体运行时可能晚于接口启动），之后所有请求共用同一连接
+    - 每次发布前检查连接的读循环是否仍在运行，连接断开或发布失败时丢弃旧连接并重连一次
+    - 每个连接注册自己的响应收集智能体，订阅专属的响应主题（"Response.<连接ID>"），
+      请求带上该主题，多个接口进程时响应只回到发起请求的进程
+    - 会话按 session_shard 分配到 shards 个 Commander 工作进程之一
+    - 由 FastAPI 的 lifespan 在退出时关闭
+    """
+
+    def __init__(self, host_address: str, message_types: List[type], connect_timeout: float = 5.0,
+                 shards: int = 1, factory: Callable[..., Any] = GrpcWorkerAgentRuntime):
+        self.host_address = host_address
+        self.message_types = message_types
+        self.connect_timeout = connect_timeout
+        self.shards = max(1, shards)
+        self._factory = factory
+        self._runtime: Optional[GrpcWorkerAgentRuntime] = None
+        self.reply_topic_type: Optional[str] = None
+        self._lock = asyncio.Lock()
+        self.connects = 0
+        self.reconnects = 0
+        self.failures = 0
+        self.published = 0
+        self.publish_ms = 0.0
+
+    def healthy(self) -> bool:
+        runtime = self._runtime
+        if runtime is None or not getattr(runtime, "_running", False):
+            return False
+        # 运行时没有公开的连接状态：gRPC 流的读任务或运行时的读循环退出即说明连接已断开。
+        # 断开后 publish_message 只是写入发送队列而不会报错，因此必须在发布前检查
+        connection = getattr(runtime, "_host_connection", None)
+        tasks = [getattr(connection, "_connection_task", None), getattr(runtime, "_read_task", None)]
+        return all(task is None or not task.done() for task in tasks)
+
+    async def _connect(self) -> GrpcWorkerAgentRuntime:
+        runtime = self._factory(host_address=self.host_address)
+        for message_type in self.message_types:
+            runtime.add_message_serializer(try_get_known_serializers_for_type(message_type))
+        await asyncio.wait_for(runtime.start(), self.connect_timeout)
+        try:
+            connection_id = uuid.uuid4().hex[:12]
+            collector_type = f"{RESPONSE_COLLECTOR_TYPE}.{connection_id}"
+            reply_topic_type = f"{RESPONSE_TOPIC_TYPE}.{connection_id}"
+            await ClosureAgent.register_closure(
+                runtime, collector_type, collect_result,
+                subscriptions=lambda: [TypeSubscription(topic_type=reply_topic_type, agent_type=collector_type)])
+        except BaseException:
+            await runtime.stop()
+            raise
+        self.reply_topic_type = reply_topic_type
+        return runtime
+
+    async def _discard(self):
+        runtime, self._runtime = self._runtime, None
+        if runtime is not None:
+            try:
+                await runtime.stop()
+            except Exception:
+                pass
+
+    async def get(self) -> GrpcWorkerAgentRuntime:
+        if self.healthy():
+            return self._runtime
+        async with self._lock:
+            if not self.healthy():
+                if self._runtime is not None:
+                    self.reconnects += 1
+                await self._discard()
+                self._runtime = await self._connect()
+                self.connects += 1
+            return self._runtime
+
+    def user_topic_id(self, session_id: str) -> TopicId:
+        # 会话所在分片的 Commander 主题
+        shard = session_shard(session_id, self.shards)
+        return session_topic_id(shard_topic_type(USER_TOPIC_TYPE, shard, self.shards), session_id)
+
+    async def publish(self, message: Any, topic_id: TopicId):
+        start = time.perf_counter()
+        for attempt in range(2):
+            runtime = await self.get()
+            try:
+                if isinstance(message, UserRequest):
+                    # 响应主题随连接而定，重连后使用新连接的主题
+                    message = message.model_copy(update={"reply_topic_type": self.reply_topic_type})
+                await runtime.publish_message(message=message, topic_id=topic_id)
+                break
+            except Exception:
+                self.failures += 1
+                async with self._lock:
+                    if self._runtime is runtime:
+                        await self._discard()
+                if attempt:
+                    raise
+        self.published += 1
+        self.publish_ms += (time.perf_counter() - start) * 1000
+
+    async def close(self):
+        async with self._lock:
+            await self._discard()
+
+    def stats(self) -> dict:
+        return {
+            "host_address": self.host_address,
+            "connected": self.healthy(),
+            "reply_topic_type": self.reply_topic_type,
+            "shards": self.shards,
+            "connects": self.connects,
+            "reconnects": self.reconnects,
+            "failures": self.failures,
+            "published": self.published,
+            "avg_publish_ms": round(self.publish_ms / self.published, 3) if self.published else 0.0,
+        }
+
+
+def _build_client() -> RuntimeClient:
+    runtime_config = config.get('agent_runtime', {})
+    return RuntimeClient(runtime_config.get('host_address', 'localhost:50051'), [UserRequest, AgentResponse],
+                         connect_timeout=runtime_config.get('connect_timeout', 5.0),
+                         shards=runtime_config.get('commander_shards', 1))
+
+
+runtime_client = _build_client()
@@ -0,0 +1,143 @@
+from typing import Dict, Iterable, List, Optional
+
+
+class CollegeSearchIndex:
+    """
+    高校内存检索索引
+    - 省份/城市/类别/性质/类型/985/211/双一流 按取值建立倒排位图（Python int 作为位集合）
+    - 名称建立 n-gram 倒排位图，子串查询转为位图求交后再做一次子串校验
+    多条件查询即位图按位与，结果与 SQL 路径（等值 + LIKE '%x%'）一致
+    """
+
+    FACETS = ('province', 'city', 'category', 'nature', 'type', 'is_985', 'is_211', 'is_double_first')
+
+    def __init__(self, ngram: int = 2):
+        self.ngram = max(1, ngram)
+        self._reset()
+
+    def _reset(self):
+        self._rows: List[Optional[dict]] = []
+        self._slot_of: Dict[int, int] = {}
+        self._free_slots: List[int] = []
+        self._live = 0
+        self._facets: Dict[str, Dict[object, int]] = {facet: {} for facet in self.FACETS}
+        # gram长度 -> gram -> 位图，保存 1..ngram 的所有长度，短查询直接命中
+        self._grams: Dict[int, Dict[str, int]] = {size: {} for size in range(1, self.ngram + 1)}
+
+    def __len__(self):
+        return len(self._slot_of)
+
+    @staticmethod
+    def _normalize(text: Optional[str]) -> str:
+        return text.casefold() if text else ''
+
+    def _name_grams(self, name: str, size: int) -> Iterable[str]:
+        return {name[i:i + size] for i in range(len(name) - size + 1)}
+
+    def build(self, rows: Iterable[dict]):
+        """
+        由序列化后的高校数据全量构建索引
+        """
+        self._reset()
+        for row in rows:
+            self.put(row)
+
+    def put(self, row: dict):
+        """
+        新增或覆盖单个高校
+        """
+        college_id = row['college_id']
+        if college_id in self._slot_of:
+            self._clear(self._slot_of[college_id])
+            slot = self._slot_of[college_id]
+        elif self._free_slots:
+            slot = self._free_slots.pop()
+        else:
+            slot = len(self._rows)
+            self._rows.append(None)
+
+        bit = 1 << slot
+        self._rows[slot] = row
+        self._slot_of[college_id] = slot
+        self._live |= bit
+        for facet in self.FACETS:
+            bitmap = self._facets[facet]
+            value = row.get(facet)
+            bitmap[value] = bitmap.get(value, 0) | bit
+        name = self._normalize(row.get('name'))
+        for size, grams in self._grams.items():
+            for gram in self._name_grams(name, size):
+                grams[gram] = grams.get(gram, 0) | bit
+
+    def remove(self, college_id: int):
+        """
+        移除单个高校
+        """
+        slot = self._slot_of.pop(college_id, None)
+        if slot is None:
+            return
+        self._clear(slot)
+        self._rows[slot] = None
+        self._live &= ~(1 << slot)
+        self._free_slots.append(slot)
+
+    def _clear(self, slot: int):
+        row = self._rows[slot]
+        mask = ~(1 << slot)
+        for facet in self.FACETS:
+            bitmap = self._facets[facet]
+            value = row.get(facet)
+            remaining = bitmap.get(value, 0) & mask
+            if remaining:
+                bitmap[value] = remaining
+            else:
+                bitmap.pop(value, None)
+        name = self._normalize(row.get('name'))
+        for size, grams in self._grams.items():
+            for gram in self._name_grams(name, size):
+                remaining = grams.get(gram, 0) & mask
+                if remaining:
+                    grams[gram] = remaining
+                else:
+                    grams.pop(gram, None)
+
+    def _name_bitmap(self, keyword: str) -> int:
+        size = min(len(keyword), self.ngram)
+        grams = self._grams[size]
+        bits = self._live
+        for gram in self._name_grams(keyword, size):
+            bits &= grams.get(gram, 0)
+            if not bits:
+                break
+        return bits
+
+    def search(self, name: Optional[str] = None, **filters) -> List[dict]:
+        """
+        多条件查询，filters 的键为 FACETS 中的字段，值为 None 表示不过滤
+        返回按 college_id 排序的高校数据
+        """
+        bits = self._live
+        for facet, value in filters.items():
+            if value is None:
+                continue
+            if facet not in self._facets:
+                raise ValueError(f"不支持的检索字段: {facet}")
+            bits &= self._facets[facet].get(value, 0)
+            if not bits:
+                return []
+
+        keyword = self._normalize(name)
+        if keyword:
+            bits &= self._name_bitmap(keyword)
+
+        result = []
+        while bits:
+            low = bits & -bits
+            row = self._rows[low.bit_length() - 1]
+            bits ^= low
+            # n-gram 求交只保证包含所有片段，仍需校验连续子串
+            if keyword and keyword not in self._normalize(row.get('name')):
+                continue
+            result.append(row)
+        result.sort(key=lambda row: row['college_id'])
+        return result
@@ -0,0 +1,397 @@
+import math
+from typing import Dict, Generic, Iterable, List, Optional, Sequence, Tuple, TypeVar
+
+from Server.fast_api.common.geometry import to_geometry
+
+T = TypeVar('T')
+# (min_x, min_y, max_x, max_y)
+BBox = Tuple[float, float, float, float]
+
+
+def bbox_of(points: Iterable[Sequence[float]]) -> BBox:
+    xs, ys = zip(*((point[0], point[1]) for point in points))
+    return min(xs), min(ys), max(xs), max(ys)
+
+
+def bbox_contains(bbox: BBox, x: float, y: float) -> bool:
+    return bbox[0] <= x <= bbox[2] and bbox[1] <= y <= bbox[3]
+
+
+def bbox_intersects(a: BBox, b: BBox) -> bool:
+    return a[0] <= b[2] and b[0] <= a[2] and a[1] <= b[3] and b[1] <= a[3]
+
+
+class STRTree(Generic[T]):
+    """
+    Sort-Tile-Recursive 打包的只读 R 树
+    按外包矩形中心排序分片、自底向上逐层打包，构建后不可修改
+    """
+
+    def __init__(self, entries: Iterable[Tuple[BBox, T]], node_capacity: int = 10):
+        self.node_capacity = max(2, node_capacity)
+        entries = list(entries)
+        self._size = len(entries)
+        # 每个节点为 (bbox, children, is_leaf)；叶子节点的 children 为条目
+        level = [(bbox, item, True) for bbox, item in entries]
+        while len(level) > self.node_capacity:
+            level = self._pack(level)
+        self._root = (self._union(level), level, False) if level else None
+
+    def __len__(self):
+        return self._size
+
+    @staticmethod
+    def _union(nodes) -> BBox:
+        return (min(node[0][0] for node in nodes), min(node[0][1] for node in nodes),
+                max(node[0][2] for node in nodes), max(node[0][3] for node in nodes))
+
+    def _pack(self, nodes):
+        capacity = self.node_capacity
+        node_count = math.ceil(len(nodes) / capacity)
+        slice_count = math.ceil(math.sqrt(node_count))
+        slice_size = slice_count * capacity
+        nodes = sorted(nodes, key=lambda node: node[0][0] + node[0][2])
+        packed = []
+        for start in range(0, len(nodes), slice_size):
+            vertical = sorted(nodes[start:start + slice_size], key=lambda node: node[0][1] + node[0][3])
+            for offset in range(0, len(vertical), capacity):
+                group = vertical[offset:offset + capacity]
+                packed.append((self._union(group), group, False))
+        return packed
+
+    def query_point(self, x: float, y: float) -> List[T]:
+        """
+        外包矩形包含该点的全部条目
+        """
+        return self.query((x, y, x, y))
+
+    def query(self, bbox: BBox) -> List[T]:
+        """
+        外包矩形与 bbox 相交的全部条目
+        """
+        result = []
+        if self._root is None or not bbox_intersects(self._root[0], bbox):
+            return result
+        stack = [self._root]
+        while stack:
+            _, children, _ = stack.pop()
+            for child in children:
+                if not bbox_intersects(child[0], bbox):
+                    continue
+                if child[2]:
+                    result.append(child[1])
+                else:
+                    stack.append(child)
+        return result
+
+
+def point_in_ring(x: float, y: float, ring: Sequence[Sequence[float]]) -> bool:
+    """
+    射线法（奇偶规则）判断点是否在环内
+    """
+    inside = False
+    previous_x, previous_y = ring[-1][0], ring[-1][1]
+    for current in ring:
+        current_x, current_y = current[0], current[1]
+        if (current_y > y) != (previous_y > y):
+            cross_x = (previous_x - current_x) * (y - current_y) / (previous_y - current_y) + current_x
+            if x < cross_x:
+                inside = not inside
+        previous_x, previous_y = current_x, current_y
+    return inside
+
+
+def point_in_polygon(x: float, y: float, rings: Sequence[Sequence[Sequence[float]]]) -> bool:
+    """
+    点在外环内且不在任何内环（洞）内
+    """
+    if not point_in_ring(x, y, rings[0]):
+        return False
+    return not any(point_in_ring(x, y, hole) for hole in rings[1:])
+
+
+def polygons_of(geometry: dict) -> List[Sequence[Sequence[Sequence[float]]]]:
+    """
+    取出 Polygon / MultiPolygon（含几何集合中的）全部多边形
+    """
+    if geometry['type'] == 'Polygon':
+        return [geometry['coordinates']]
+    if geometry['type'] == 'MultiPolygon':
+        return list(geometry['coordinates'])
+    if geometry['type'] == 'GeometryCollection':
+        return [polygon for item in geometry['geometries'] for polygon in polygons_of(item)]
+    return []
+
+
+def point_of(geometry: Optional[dict]) -> Optional[Tuple[float, float]]:
+    if geometry and geometry['type'] == 'Point':
+        return geometry['coordinates'][0], geometry['coordinates'][1]
+    return None
+
+
+class AdminDivisionLocator:
+    """
+    点所在行政区划的查找器
+    每个多边形（MultiPolygon 拆分为单个多边形）以外包矩形建 STR 树，
+    查询时先以外包矩形筛出候选，再做精确的点在多边形内判断
+    """
+
+    def __init__(self, divisions: Iterable[Tuple[str, object]], node_capacity: int = 10):
+        """
+        :param divisions: (admin_code, 几何) 序列，几何可为 GeoJSON 结构、WKB 或 WKT
+        """
+        entries = []
+        for admin_code, shape in divisions:
+            geometry = shape if isinstance(shape, dict) else to_geometry(shape)
+            if geometry is None:
+                continue
+            for rings in polygons_of(geometry):
+                if rings and rings[0]:
+                    entries.append((bbox_of(rings[0]), (admin_code, rings)))
+        self.division_count = len({admin_code for _, (admin_code, _) in entries})
+        self._tree: STRTree = STRTree(entries, node_capacity)
+
+    def __len__(self):
+        return self.division_count
+
+    def locate(self, longitude: Optional[float], latitude: Optional[float]) -> Optional[str]:
+        """
+        返回点所在行政区划的 admin_code，不在任何行政区划内时返回 None
+        """
+        if longitude is None or latitude is None:
+            return None
+        for admin_code, rings in self._tree.query_point(longitude, latitude):
+            if point_in_polygon(longitude, latitude, rings):
+                return admin_code
+        return None
+
+    def locate_college(self, college: dict) -> Optional[str]:
+        """
+        优先使用经纬度字段，缺失时使用 shape 点坐标
+        """
+        longitude, latitude = college.get('longitude'), college.get('latitude')
+        if longitude is None or latitude is None:
+            try:
+                point = point_of(to_geometry(college.get('shape')))
+            except ValueError:
+                point = None
+            if point is None:
+                return None
+            longitude, latitude = point
+        return self.locate(float(longitude), float(latitude))
+
+
+EARTH_RADIUS_KM = 6371.0088
+KM_PER_DEGREE = math.pi * EARTH_RADIUS_KM / 180
+# 地球表面两点间的最大距离（半个大圆）
+MAX_DISTANCE_KM = math.pi * EARTH_RADIUS_KM
+
+
+def haversine_km(lon1: float, lat1: float, lon2: float, lat2: float) -> float:
+    """
+    两点间的大圆距离（公里）
+    """
+    phi1, phi2 = math.radians(lat1), math.radians(lat2)
+    a = (math.sin((phi2 - phi1) / 2) ** 2
+         + math.cos(phi1) * math.cos(phi2) * math.sin(math.radians(lon2 - lon1) / 2) ** 2)
+    return 2 * EARTH_RADIUS_KM * math.asin(min(1.0, math.sqrt(a)))
+
+
+class PointGridIndex(Generic[T]):
+    """
+    经纬度等间距网格上的点索引，支持单点增删
+    半径查询先按纬度与该纬度下的经度跨度取覆盖的网格，再以 haversine 精确过滤；
+    最近 k 个点通过逐步扩大半径求得，半径内已有 k 个点时结果即为精确的最近 k 个
+    """
+
+    def __init__(self, cell_degrees: float = 0.5):
+        self.cell_degrees = cell_degrees
+        self._cells: Dict[Tuple[int, int], Dict[object, Tuple[float, float, T]]] = {}
+        self._cell_of: Dict[object, Tuple[int, int]] = {}
+
+    def __len__(self):
+        return len(self._cell_of)
+
+    def _cell(self, longitude: float, latitude: float) -> Tuple[int, int]:
+        return math.floor(longitude / self.cell_degrees), math.floor(latitude / self.cell_degrees)
+
+    def build(self, entries: Iterable[Tuple[object, Optional[float], Optional[float], T]]):
+        """
+        由 (键, 经度, 纬度, 数据) 序列全量构建
+        """
+        self._cells = {}
+        self._cell_of = {}
+        for key, longitude, latitude, item in entries:
+            self.put(key, longitude, latitude, item)
+
+    def put(self, key, longitude: Optional[float], latitude: Optional[float], item: T):
+        """
+        新增或覆盖单个点，经纬度缺失时只移除旧点
+        """
+        self.remove(key)
+        if longitude is None or latitude is None:
+            return
+        cell = self._cell(longitude, latitude)
+        self._cells.setdefault(cell, {})[key] = (longitude, latitude, item)
+        self._cell_of[key] = cell
+
+    def remove(self, key):
+        cell = self._cell_of.pop(key, None)
+        if cell is None:
+            return
+        points = self._cells[cell]
+        points.pop(key, None)
+        if not points:
+            del self._cells[cell]
+
+    def _scan(self, min_x: int, min_y: int, max_x: int, max_y: int):
+        # 覆盖的网格数多于非空网格数时改为遍历非空网格，避免大范围查询逐格探测
+        if (max_x - min_x + 1) * (max_y - min_y + 1) > len(self._cells):
+            for (x, y), points in self._cells.items():
+                if min_x <= x <= max_x and min_y <= y <= max_y:
+                    yield from points.values()
+            return
+        for x in range(min_x, max_x + 1):
+            for y in range(min_y, max_y + 1):
+                points = self._cells.get((x, y))
+                if points:
+                    yield from points.values()
+
+    def within_bbox(self, bbox: BBox) -> List[T]:
+        """
+        经纬度范围 (min_lon, min_lat, max_lon, max_lat) 内的全部点
+        """
+        min_x, min_y = self._cell(bbox[0], bbox[1])
+        max_x, max_y = self._cell(bbox[2], bbox[3])
+        return [item for longitude, latitude, item in self._scan(min_x, min_y, max_x, max_y)
+                if bbox_contains(bbox, longitude, latitude)]
+
+    def within_radius(self, longitude: float, latitude: float, radius_km: float) -> List[Tuple[float, T]]:
+        """
+        半径内的全部点，返回按距离升序的 (距离公里, 数据)
+        """
+        lat_span = radius_km / KM_PER_DEGREE
+        min_lat, max_lat = latitude - lat_span, latitude + lat_span
+        if min_lat <= -90 or max_lat >= 90:
+            # 范围跨过极点，经度方向不再收窄
+            min_lon, max_lon = -180.0, 180.0
+        else:
+            widest = math.cos(math.radians(max(abs(min_lat), abs(max_lat))))
+            lon_span = min(180.0, lat_span / widest)
+            min_lon, max_lon = longitude - lon_span, longitude + lon_span
+        min_x, min_y = self._cell(min_lon, min_lat)
+        max_x, max_y = self._cell(max_lon, max_lat)
+        result = []
+        for point_longitude, point_latitude, item in self._scan(min_x, min_y, max_x, max_y):
+            distance = haversine_km(longitude, latitude, point_longitude, point_latitude)
+            if distance <= radius_km:
+                result.append((distance, item))
+        result.sort(key=lambda pair: pair[0])
+        return result
+
+    def nearest(self, longitude: float, latitude: float, k: int,
+                radius_km: Optional[float] = None) -> List[Tuple[float, T]]:
+        """
+        距离最近的 k 个点（可限定最大半径），返回按距离升序的 (距离公里, 数据)
+        """
+        if k <= 0 or not self._cell_of:
+            return []
+        limit = MAX_DISTANCE_KM if radius_km is None else min(radius_km, MAX_DISTANCE_KM)
+        radius = min(limit, self.cell_degrees * KM_PER_DEGREE)
+        while True:
+            result = self.within_radius(longitude, latitude, radius)
+            if len(result) >= k or radius >= limit:
+                return result[:k]
+            radius = min(limit, radius * 4)
+
+
+def simplify_line(points: Sequence[Sequence[float]], tolerance: float) -> List[Sequence[float]]:
+    """
+    Douglas-Peucker 折线化简（平面距离，单位与坐标一致），保留首尾点
+    """
+    count = len(points)
+    if count < 3 or tolerance <= 0:
+        return list(points)
+    keep = [False] * count
+    keep[0] = keep[-1] = True
+    limit = tolerance * tolerance
+    stack = [(0, count - 1)]
+    while stack:
+        first, last = stack.pop()
+        ax, ay = points[first][0], points[first][1]
+        dx, dy = points[last][0] - ax, points[last][1] - ay
+        segment = dx * dx + dy * dy
+        farthest, index = -1.0, 0
+        for i in range(first + 1, last):
+            px, py = points[i][0] - ax, points[i][1] - ay
+            if segment:
+                t = max(0.0, min(1.0, (px * dx + py * dy) / segment))
+                px, py = px - t * dx, py - t * dy
+            distance = px * px + py * py
+            if distance > farthest:
+                farthest, index = distance, i
+        if farthest > limit:
+            keep[index] = True
+            stack.append((first, index))
+            stack.append((index, last))
+    return [point for point, kept in zip(points, keep) if kept]
+
+
+def simplify_ring(ring: Sequence[Sequence[float]], tolerance: float) -> List[Sequence[float]]:
+    """
+    化简闭合环：以离起点最远的点将环分为两段分别化简，结果不足 4 个点（三角形）时返回空列表
+    """
+    if len(ring) < 4:
+        return []
+    start = ring[0]
+    split = max(range(1, len(ring) - 1),
+                key=lambda i: (ring[i][0] - start[0]) ** 2 + (ring[i][1] - start[1]) ** 2)
+    result = simplify_line(ring[:split + 1], tolerance)[:-1] + simplify_line(ring[split:], tolerance)
+    return result if len(result) >= 4 else []
+
+
+def _simplify_polygon(rings, tolerance: float) -> list:
+    outer = simplify_ring(rings[0], tolerance)
+    if not outer:
+        return []
+    holes = [hole for hole in (simplify_ring(ring, tolerance) for ring in rings[1:]) if hole]
+    return [outer] + holes
+
+
+def simplify_geometry(geometry: dict, tolerance: float) -> dict:
+    """
+    化简 GeoJSON 结构的几何对象；退化的环与小多边形被丢弃，
+    MultiPolygon 全部退化时保留外包矩形最大的原多边形，保证结果非空
+    """
+    geometry_type = geometry['type']
+    coordinates = geometry.get('coordinates')
+    if geometry_type == 'LineString':
+        return {'type': geometry_type, 'coordinates': simplify_line(coordinates, tolerance)}
+    if geometry_type == 'MultiLineString':
+        return {'type': geometry_type, 'coordinates': [simplify_line(line, tolerance) for line in coordinates]}
+    if geometry_type == 'Polygon':
+        return {'type': geometry_type, 'coordinates': _simplify_polygon(coordinates, tolerance) or coordinates}
+    if geometry_type == 'MultiPolygon':
+        polygons = [polygon for polygon in (_simplify_polygon(rings, tolerance) for rings in coordinates) if polygon]
+        if not polygons and coordinates:
+            def area(rings):
+                min_x, min_y, max_x, max_y = bbox_of(rings[0])
+                return (max_x - min_x) * (max_y - min_y)
+            polygons = [max(coordinates, key=area)]
+        return {'type': geometry_type, 'coordinates': polygons}
+    if geometry_type == 'GeometryCollection':
+        return {'type': geometry_type,
+                'geometries': [simplify_geometry(item, tolerance) for item in geometry['geometries']]}
+    return geometry
+
+
+def count_points(geometry: dict) -> int:
+    if geometry['type'] == 'GeometryCollection':
+        return sum(count_points(item) for item in geometry['geometries'])
+
+    def count(value) -> int:
+        if value and isinstance(value[0], (int, float)):
+            return 1
+        return sum(count(item) for item in value)
+
+    return count(geometry['coordinates'])
@@ -0,0 +1,173 @@
+import hashlib
+import json
+import math
+from collections import OrderedDict
+from typing import Dict, Iterable, List, Optional, Tuple
+
+MAX_ZOOM = 22
+# Web 墨卡托可表示的纬度范围
+MAX_LATITUDE = 85.05112878
+
+
+def mercator(longitude: float, latitude: float) -> Tuple[float, float]:
+    """
+    经纬度转换为 [0, 1) 范围内的 Web 墨卡托坐标，y 轴向南
+    """
+    latitude = max(-MAX_LATITUDE, min(MAX_LATITUDE, latitude))
+    x = (longitude + 180.0) / 360.0
+    sin_lat = math.sin(math.radians(latitude))
+    y = 0.5 - math.log((1 + sin_lat) / (1 - sin_lat)) / (4 * math.pi)
+    return min(max(x, 0.0), 1 - 1e-12), min(max(y, 0.0), 1 - 1e-12)
+
+
+def _rank(row: dict):
+    # 簇内代表高校的优先级：985 > 211 > 双一流 > college_id
+    return -(row.get('is_985') or 0), -(row.get('is_211') or 0), -(row.get('is_double_first') or 0), row['college_id']
+
+
+class _Cluster:
+    __slots__ = ('count', 'sum_lon', 'sum_lat', 'top', 'members')
+
+    def __init__(self):
+        self.count = 0
+        self.sum_lon = 0.0
+        self.sum_lat = 0.0
+        self.top: List[dict] = []
+        self.members: List[dict] = []
+
+
+class ClusterTileIndex:
+    """
+    预计算的分层网格聚合
+    每个瓦片划分为 grid_size × grid_size 个网格，同一网格内的高校聚为一簇；
+    最细层（cluster_zoom）由高校直接聚合，上一层的每个网格由下一层 2×2 个网格合并而来。
+    超过 cluster_zoom 的层级不再聚合，直接返回瓦片范围内的单个高校。
+    瓦片按 JSON 内容计算 ETag，渲染结果按 LRU 缓存
+    """
+
+    def __init__(self, rows: Iterable[dict], grid_size: int = 8, cluster_zoom: int = 16,
+                 representatives: int = 3, cache_size: int = 4096):
+        self.bits = max(0, int(grid_size).bit_length() - 1)  # 网格数取不超过 grid_size 的 2 的幂
+        self.cluster_zoom = min(cluster_zoom, MAX_ZOOM)
+        self.representatives = representatives
+        self.cache_size = cache_size
+        self._rendered: "OrderedDict[Tuple[int, int, int], Tuple[bytes, str]]" = OrderedDict()
+        # 层级 -> 瓦片 (x, y) -> 该瓦片内的簇
+        self._levels: List[Dict[Tuple[int, int], List[_Cluster]]] = []
+        self._build(rows)
+
+    def _build(self, rows: Iterable[dict]):
+        finest = self.cluster_zoom + self.bits
+        cells: Dict[Tuple[int, int], _Cluster] = {}
+        scale = 1 << finest
+        for row in rows:
+            longitude, latitude = row.get('longitude'), row.get('latitude')
+            if longitude is None or latitude is None:
+                continue
+            x, y = mercator(longitude, latitude)
+            key = (int(x * scale), int(y * scale))
+            cluster = cells.get(key)
+            if cluster is None:
+                cluster = cells[key] = _Cluster()
+            cluster.count += 1
+            cluster.sum_lon += longitude
+            cluster.sum_lat += latitude
+            cluster.members.append(row)
+        for cluster in cells.values():
+            cluster.members.sort(key=_rank)
+            cluster.top = cluster.members[:self.representatives]
+
+        levels = [None] * (self.cluster_zoom + 1)
+        for zoom in range(self.cluster_zoom, -1, -1):
+            if zoom < self.cluster_zoom:
+                cells = self._merge(cells)
+            tiles: Dict[Tuple[int, int], List[_Cluster]] = {}
+            for (cell_x, cell_y), cluster in cells.items():
+                tiles.setdefault((cell_x >> self.bits, cell_y >> self.bits), []).append(cluster)
+            levels[zoom] = tiles
+        self._levels = levels
+
+    def _merge(self, cells: Dict[Tuple[int, int], _Cluster]) -> Dict[Tuple[int, int], _Cluster]:
+        groups: Dict[Tuple[int, int], List[_Cluster]] = {}
+        for (cell_x, cell_y), child in cells.items():
+            key = (cell_x >> 1, cell_y >> 1)
+            group = groups.get(key)
+            if group is None:
+                groups[key] = [child]
+            else:
+                group.append(child)
+        parents: Dict[Tuple[int, int], _Cluster] = {}
+        for key, children in groups.items():
+            if len(children) == 1:
+                # 高缩放级别下绝大多数网格只有一个子网格，直接共用同一个簇
+                parents[key] = children[0]
+                continue
+            parent = parents[key] = _Cluster()
+            for child in children:
+                parent.count += child.count
+                parent.sum_lon += child.sum_lon
+                parent.sum_lat += child.sum_lat
+                parent.top.extend(child.top)
+            parent.top.sort(key=_rank)
+            del parent.top[self.representatives:]
+        return parents
+
+    @staticmethod
+    def _college(row: dict) -> dict:
+        return {"college_id": row['college_id'], "name": row.get('name'),
+                "longitude": row['longitude'], "latitude": row['latitude']}
+
+    def _clusters(self, zoom: int, x: int, y: int) -> List[dict]:
+        if zoom <= self.cluster_zoom:
+            clusters = self._levels[zoom].get((x, y), [])
+            return [{
+                "longitude": round(cluster.sum_lon / cluster.count, 6),
+                "latitude": round(cluster.sum_lat / cluster.count, 6),
+                "count": cluster.count,
+                "colleges": [self._college(row) for row in cluster.top],
+            } for cluster in clusters]
+
+        # 高于聚合层级：取所在的最细层瓦片，按墨卡托坐标筛出落在本瓦片内的高校
+        shift = zoom - self.cluster_zoom
+        scale = 1 << zoom
+        result = []
+        for cluster in self._levels[self.cluster_zoom].get((x >> shift, y >> shift), []):
+            for row in cluster.members:
+                point_x, point_y = mercator(row['longitude'], row['latitude'])
+                if int(point_x * scale) == x and int(point_y * scale) == y:
+                    result.append({"longitude": row['longitude'], "latitude": row['latitude'],
+                                   "count": 1, "colleges": [self._college(row)]})
+        return result
+
+    def render(self, zoom: int, x: int, y: int) -> Tuple[bytes, str]:
+        """
+        返回瓦片的 JSON 字节与 ETag，瓦片坐标非法时抛出 ValueError
+        """
+        if not 0 <= zoom <= MAX_ZOOM:
+            raise ValueError(f"缩放级别需在 0-{MAX_ZOOM} 之间")
+        if not (0 <= x < (1 << zoom) and 0 <= y < (1 << zoom)):
+            raise ValueError("瓦片坐标超出范围")
+        key = (zoom, x, y)
+        cached = self._rendered.get(key)
+        if cached is not None:
+            self._rendered.move_to_end(key)
+            return cached
+
+        clusters = self._clusters(zoom, x, y)
+        body = json.dumps({"z": zoom, "x": x, "y": y, "count": sum(cluster["count"] for cluster in clusters),
+                           "clusters": clusters}, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+        rendered = body, '"' + hashlib.sha1(body).hexdigest()[:20] + '"'
+        self._rendered[key] = rendered
+        if len(self._rendered) > self.cache_size:
+            self._rendered.popitem(last=False)
+        return rendered
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """
+    If-None-Match 是否命中（支持多个值、弱校验前缀与 *）
+    """
+    if not if_none_match:
+        return False
+    candidates = [value.strip() for value in if_none_match.split(',')]
+    return '*' in candidates or any(value.removeprefix('W/') == etag for value in candidates)
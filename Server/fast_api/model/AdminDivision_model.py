@@ -1,4 +1,5 @@
-from sqlalchemy import Integer, String, Enum
+from sqlalchemy import Integer, LargeBinary, String, Enum
+from sqlalchemy.dialects.mysql import LONGBLOB
 from sqlalchemy.orm import Mapped, mapped_column
 from geoalchemy2 import Geometry
 
@@ -26,4 +27,13 @@ class AdminDivisionModel(Base):
             'admin_code': self.admin_code,
             'shape': shape_wkt,
             'name': self.name,
-        }
\ No newline at end of file
+        }
+
+
+# 行政区划的化简几何，每个区划按 resolution（high/medium/low）各存一份 WKB
+class AdminDivisionShapeModel(Base):
+    __tablename__ = "AdminDivisionShape"
+    admin_code: Mapped[str] = mapped_column(String(9), primary_key=True)
+    resolution: Mapped[str] = mapped_column(String(10), primary_key=True)
+    shape: Mapped[bytes] = mapped_column(LargeBinary().with_variant(LONGBLOB(), 'mysql'), nullable=False)
+    point_count: Mapped[int] = mapped_column(Integer, nullable=False)
@@ -0,0 +1,12 @@
+from sqlalchemy import BigInteger, String
+from sqlalchemy.orm import Mapped, mapped_column
+
+from Server.fast_api.resources import Base
+
+
+class CacheVersionModel(Base):
+    __tablename__ = "CacheVersion"
+    # 进程内缓存名（college、climate、admin_locator）
+    name: Mapped[str] = mapped_column(String(50), primary_key=True)
+    # 数据每次变更递增，各进程据此判断本地缓存是否过期
+    version: Mapped[int] = mapped_column(BigInteger, nullable=False, default=0)
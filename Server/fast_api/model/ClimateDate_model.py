@@ -178,4 +178,13 @@ class ClimateDataModel(Base):
             'y202310_avg_precip': self.y202310_avg_precip,
             'y202311_avg_precip': self.y202311_avg_precip,
             'y202312_avg_precip': self.y202312_avg_precip,
-        }
\ No newline at end of file
+        }
+
+
+# 长表：每个区划、月份、指标一行，新增月份或指标无需修改表结构
+class ClimateValueModel(Base):
+    __tablename__ = "ClimateValue"
+    admin_code: Mapped[str] = mapped_column(String(9), primary_key=True)
+    month: Mapped[int] = mapped_column(Integer, primary_key=True)
+    metric: Mapped[str] = mapped_column(String(20), primary_key=True)
+    value: Mapped[float] = mapped_column(DOUBLE, nullable=False)
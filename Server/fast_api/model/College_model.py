@@ -1,4 +1,4 @@
-from sqlalchemy import Integer, String, Float, Enum, TIMESTAMP, TEXT
+from sqlalchemy import BigInteger, Integer, String, Float, Enum, TIMESTAMP, TEXT
 from sqlalchemy.orm import Mapped, mapped_column
 from sqlalchemy.dialects.mysql import TINYINT
 from geoalchemy2 import Geometry
@@ -10,7 +10,8 @@ from datetime import datetime
 class CollegeModel(Base):
     __tablename__ = "College"
     OBJECTID: Mapped[int] = mapped_column(Integer, unique=True, autoincrement=True,nullable=False)
-    college_id: Mapped[int] = mapped_column(Integer,primary_key=True,nullable=False)
+    # 院校代码为 10 位数字（如 4111010001），超出 INT 范围
+    college_id: Mapped[int] = mapped_column(BigInteger,primary_key=True,nullable=False)
     shape: Mapped[Geometry] = mapped_column(Geometry(srid=4326), nullable=False)
     province: Mapped[str] = mapped_column(String(254), nullable=False)
     name: Mapped[str] = mapped_column(String(254), nullable=False)
@@ -63,7 +64,7 @@ class CollegeModel(Base):
 class CollegeReviewModel(Base):
     __tablename__ = "CollegeReview"
     review_id: Mapped[int] = mapped_column(Integer, primary_key=True, autoincrement=True)
-    college_id: Mapped[int] = mapped_column(Integer, nullable=True)  # 对应的高校ID，可为空表示新添加的高校
+    college_id: Mapped[int] = mapped_column(BigInteger, nullable=True)  # 对应的高校ID，可为空表示新添加的高校
     user_id: Mapped[int] = mapped_column(Integer, nullable=False)  # 提交用户ID
     status: Mapped[str] = mapped_column(Enum('pending', 'approved', 'rejected', name='review_status_enum'), 
                                         nullable=False, default='pending')  # 审核状态
@@ -1,4 +1,4 @@
-from sqlalchemy import Integer, Text, ForeignKey,String
+from sqlalchemy import BigInteger, Integer, Text, ForeignKey,String
 from sqlalchemy.orm import Mapped, mapped_column
 
 from Server.fast_api.resources import Base
@@ -7,7 +7,8 @@ from Server.fast_api.model.College_model import CollegeModel
 
 class EvaluationModel(Base):
     __tablename__ = "Evaluation"
-    evaluation_id: Mapped[int] = mapped_column(Integer, primary_key=True)
+    # 评价ID为 院校ID + 序号（13位），超出 INT 范围
+    evaluation_id: Mapped[int] = mapped_column(BigInteger, primary_key=True)
     college_id: Mapped[str] = mapped_column(String(254), nullable=True)
     user_id: Mapped[int] = mapped_column(Integer, nullable=True)
     Dietary_evaluation: Mapped[str] = mapped_column(Text, nullable=True)
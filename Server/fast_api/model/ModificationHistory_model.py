@@ -1,4 +1,4 @@
-from sqlalchemy import Integer, String, Text, DateTime, Enum
+from sqlalchemy import BigInteger, Integer, String, Text, DateTime, Enum
 from sqlalchemy.orm import Mapped, mapped_column
 from datetime import datetime
 
@@ -12,7 +12,7 @@ class ModificationHistoryModel(Base):
     entity_type: Mapped[str] = mapped_column(
         Enum('college', 'evaluation', name='entity_type_enum'), nullable=False)
     # 被修改的实体ID
-    entity_id: Mapped[int] = mapped_column(Integer, nullable=False)
+    entity_id: Mapped[int] = mapped_column(BigInteger, nullable=False)
     # 修改前的数据（JSON格式）
     old_data: Mapped[str] = mapped_column(Text, nullable=True)
     # 修改后的数据（JSON格式）
@@ -1,4 +1,4 @@
-from sqlalchemy import Integer, String, Float, Enum, TIMESTAMP, ForeignKey
+from sqlalchemy import BigInteger, Integer, String, Float, Enum, TIMESTAMP, ForeignKey
 from sqlalchemy.orm import Mapped, mapped_column
 from sqlalchemy.dialects.mysql import TINYINT
 from geoalchemy2 import Geometry
@@ -29,7 +29,7 @@ class PendingCollegeModel(Base):
     latitude: Mapped[float] = mapped_column(Float, nullable=False)
     admin_code: Mapped[str] = mapped_column(String(9), nullable=True)
     submit_time: Mapped[datetime] = mapped_column(TIMESTAMP, default=datetime.utcnow)
-    college_id: Mapped[int] = mapped_column(Integer, nullable=False)  # 修复数据类型为Integer
+    college_id: Mapped[int] = mapped_column(BigInteger, nullable=False)  # 与 College.college_id 一致
 
     def serialize(self):
         # 处理几何字段的序列化
@@ -1,16 +1,40 @@
+from sqlalchemy.schema import CreateTable
+
+from Server.fast_api.resources import Base
 from .user_model import UserModel
-from .AdminDivision_model import AdminDivisionModel
-from .ClimateDate_model import ClimateDataModel
+from .AdminDivision_model import AdminDivisionModel, AdminDivisionShapeModel
+from .ClimateDate_model import ClimateDataModel, ClimateValueModel
 from .College_model import CollegeModel, CollegeReviewModel
 from .Evaluation_model import EvaluationModel
 from .PendingCollege_model import PendingCollegeModel
 from .ModificationHistory_model import ModificationHistoryModel
+from .CacheVersion_model import CacheVersionModel
+
+# 服务运行所需、旧数据库中可能尚不存在的表，服务启动与数据导入时自动建立
+RUNTIME_TABLES = [CacheVersionModel.__table__, ClimateValueModel.__table__, AdminDivisionShapeModel.__table__]
+
+
+def create_tables(bind, tables=None) -> None:
+    """
+    建立缺失的数据表（CREATE TABLE IF NOT EXISTS，已存在的表不做改动），
+    多个进程同时启动时不会因重复建表而失败
+    :param tables: 要建立的表，默认为全部模型对应的表
+    """
+    tables = Base.metadata.sorted_tables if tables is None else tables
+    with bind.begin() as connection:
+        for table in tables:
+            connection.execute(CreateTable(table, if_not_exists=True))
 
 __all__ = [
     'AdminDivisionModel',
+    'AdminDivisionShapeModel',
+    'CacheVersionModel',
     'ClimateDataModel',
+    'ClimateValueModel',
     'CollegeModel',
     'CollegeReviewModel',
     'EvaluationModel',
-    'UserModel'
+    'UserModel',
+    'RUNTIME_TABLES',
+    'create_tables'
 ]
\ No newline at end of file
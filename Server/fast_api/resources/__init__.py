@@ -1,14 +1,39 @@
+import asyncio
+from contextlib import asynccontextmanager
+
 from fastapi import FastAPI
 from sqlalchemy import create_engine
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
 from sqlalchemy.orm import DeclarativeBase, sessionmaker
+from sqlalchemy.pool import AsyncAdaptedQueuePool, QueuePool
+
+from Server.fast_api.common import config
+from Server.fast_api.common.pool_metrics import instrumented_pool
 
-engine = create_engine('mysql+mysqldb://')
+database_config = config.get('database', {})
+# 连接池参数：pre_ping 与 recycle 避免使用已被 MySQL wait_timeout 断开的连接
+pool_options = {
+    "pool_size": database_config.get('pool_size', 10),
+    "max_overflow": database_config.get('max_overflow', 20),
+    "pool_timeout": database_config.get('pool_timeout', 30),
+    "pool_recycle": database_config.get('pool_recycle', 3600),
+    "pool_pre_ping": database_config.get('pool_pre_ping', True),
+}
+
+# 同步引擎：建表、离线脚本（数据导入等）使用
+engine = create_engine(database_config.get('url', 'mysql+mysqldb://'),
+                       poolclass=instrumented_pool(QueuePool, 'sync'), **pool_options)
+# 异步引擎：FastAPI 接口使用，查询不阻塞事件循环
+async_engine = create_async_engine(database_config.get('async_url', 'mysql+aiomysql://'),
+                                   poolclass=instrumented_pool(AsyncAdaptedQueuePool, 'async'), **pool_options)
 
 class Base(DeclarativeBase):
     pass
 
 Base.metadata.create_all(engine)
 Session = sessionmaker(bind=engine)
+# 提交后不过期对象属性，避免在异步上下文中触发隐式的懒加载IO
+AsyncSessionLocal = async_sessionmaker(bind=async_engine, class_=AsyncSession, expire_on_commit=False)
 
 title="College_DB API"
 description="""全国高校生活评价空间信息数据库 RESTful API"""
@@ -36,7 +61,18 @@ tags_metadata=[
     }
 ]
 
+@asynccontextmanager
+async def lifespan(_app: FastAPI):
+    # 模型全部导入后才能建表（模块顶部的 create_all 执行时尚无任何模型）
+    from Server.fast_api.model import RUNTIME_TABLES, create_tables
+    await asyncio.to_thread(create_tables, engine, RUNTIME_TABLES)
+    # 智能体运行时连接在首次对话时建立，应用退出时关闭
+    from Server.fast_api.common.runtime_client import runtime_client
+    yield
+    await runtime_client.close()
+
 app=FastAPI(title=title,
+            lifespan=lifespan,
             description=description,
             version=version,
             openapi_tags=tags_metadata,
@@ -45,12 +81,9 @@ app=FastAPI(title=title,
             swagger_ui_oauth2_redirect_url="/docs/oauth2-redirect",
             openapi_security=[{"HTTPBearer": []}])
 
-def get_db_session():
-    db_session = Session()
-    try:
+async def get_db_session():
+    async with AsyncSessionLocal() as db_session:
         yield db_session
-    finally:
-        db_session.close()
 
 from Server.fast_api.resources import (
     user_resource,
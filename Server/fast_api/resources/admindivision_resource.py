@@ -1,12 +1,16 @@
-from fastapi import Body, Depends, HTTPException, Query
+from fastapi import Body, Depends, HTTPException, Query, Response
+from fastapi.responses import JSONResponse, StreamingResponse
 from pydantic import BaseModel, Field
 from typing import Optional, List, Union
-from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 
 from Server.fast_api.resources import app, get_db_session
 from Server.fast_api.services import AdminDivisionService
+from Server.fast_api.services.admindivision_service import resolution_for_zoom
 from Server.fast_api.model import CollegeModel
 from Server.fast_api.services.base import get_current_user
+from Server.fast_api.common.pagination import PageSpec, get_page_spec, set_page_headers
+from Server.fast_api.common.geojson import GEOJSON_MEDIA_TYPE, feature, feature_collection, iter_feature_collection
 
 class AdminDivisionOut(BaseModel):
     shape: str = Field(..., description="高校地理位置几何信息，格式如 'POINT(纬度 经度)'",examples=["POINT(23.145 112.564)"])
@@ -17,14 +21,69 @@ class AdminDivisionOut(BaseModel):
 
 class AdminDivisionCreate(AdminDivisionOut):
     ...
+
+class AdminDivisionShapeOut(BaseModel):
+    admin_code: int = Field(..., description="行政区划代码")
+    name: str = Field(..., description="名称")
+    resolution: str = Field(..., description="几何分辨率", examples=["full", "high", "medium", "low"])
+    shape: Union[dict, str, None] = Field(None, description="几何，按 format 编码为 WKT、GeoJSON 对象或 base64 WKB")
+
+
+def get_shape_options(
+        resolution: Optional[str] = Query(None, pattern="^(full|high|medium|low)$",
+                                          description="几何分辨率，high/medium/low 为预先化简的几何"),
+        zoom: Optional[int] = Query(None, ge=0, le=22, description="地图缩放级别，未指定 resolution 时据此选择分辨率"),
+        shape_format: Optional[str] = Query(None, alias="format", pattern="^(wkt|geojson|wkb)$",
+                                            description="几何编码，默认 wkt；geojson 时返回 GeoJSON Feature/FeatureCollection")
+) -> Optional[tuple]:
+    """
+    几何分辨率与编码参数，均未指定时返回 None（保持原有输出）
+    """
+    if resolution is None and zoom is None and shape_format is None:
+        return None
+    if resolution is None:
+        resolution = resolution_for_zoom(zoom) if zoom is not None else "full"
+    return resolution, shape_format or "wkt"
+
 @app.get("/admin/",
          tags=["AdminDivision"],
          summary="获取所有行政区划数据",
-         description="获取所有行政区划数据")
-async def get_all_admin(db_session: Session = Depends(get_db_session)):
+         description="获取所有行政区划数据，支持 limit/after 游标分页、order_by 排序与 fields 字段投影；"
+                     "指定 resolution/zoom/format 时返回化简后按指定编码输出的几何")
+async def get_all_admin(
+        response: Response,
+        page: PageSpec = Depends(get_page_spec),
+        shape_options: Optional[tuple] = Depends(get_shape_options),
+        db_session: AsyncSession = Depends(get_db_session)
+):
     try:
-        admin = AdminDivisionService().get_all_admin(db_session)
-        return [AdminDivisionOut(**admin.serialize()) for admin in admin]
+        if shape_options is not None:
+            resolution, shape_format = shape_options
+            if shape_format == "geojson" and page.is_default:
+                features = AdminDivisionService().stream_admin_features(resolution)
+                return StreamingResponse(iter_feature_collection(features), media_type=GEOJSON_MEDIA_TYPE)
+            if page.is_default:
+                admin = await AdminDivisionService().list_admin_shapes(resolution, shape_format, db_session)
+                return [AdminDivisionShapeOut(**row) for row in admin]
+            page.bind(AdminDivisionShapeOut.model_fields, key_field="admin_code",
+                      sortable_fields=("admin_code", "name"))
+            result = await AdminDivisionService().list_admin_shapes(resolution, shape_format, db_session, page)
+            if shape_format == "geojson":
+                collection = JSONResponse(feature_collection([feature(row.pop("shape", None), row)
+                                                              for row in result.items]), media_type=GEOJSON_MEDIA_TYPE)
+                set_page_headers(collection, result)
+                return collection
+            set_page_headers(response, result)
+            return result.items if page.projected else [AdminDivisionShapeOut(**row) for row in result.items]
+        if page.is_default:
+            admin = await AdminDivisionService().get_all_admin(db_session)
+            return [AdminDivisionOut(**admin.serialize()) for admin in admin]
+        page.bind(AdminDivisionOut.model_fields, key_field="admin_code")
+        result = await AdminDivisionService().list_admin(page, db_session)
+        set_page_headers(response, result)
+        return result.items if page.projected else [AdminDivisionOut(**admin) for admin in result.items]
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     except Exception as error:
         raise HTTPException(status_code=500, detail=str(error))
 
@@ -32,15 +91,31 @@ async def get_all_admin(db_session: Session = Depends(get_db_session)):
 @app.get("/admin/{admin_code}",
          tags=["AdminDivision"],
          summary="获取特定行政区划详细信息",
-         description="根据行政区划编码获取特定区域详细信息")
-async def get_admin_info(admin_code: int, db_session: Session = Depends(get_db_session)):
+         description="根据行政区划编码获取特定区域详细信息，可用 resolution/zoom/format 选择化简几何与编码")
+async def get_admin_info(
+        admin_code: int,
+        shape_options: Optional[tuple] = Depends(get_shape_options),
+        db_session: AsyncSession = Depends(get_db_session)
+):
     try:
-        result = AdminDivisionService().get_admin_by_id(admin_code, db_session)
+        if shape_options is not None:
+            resolution, shape_format = shape_options
+            row = await AdminDivisionService().get_admin_shape(str(admin_code), resolution, shape_format, db_session)
+            if row is None:
+                raise HTTPException(status_code=404, detail=f"Admin with ID {admin_code} does not exist")
+            if shape_format == "geojson":
+                return JSONResponse(feature(row.pop("shape"), row), media_type=GEOJSON_MEDIA_TYPE)
+            return AdminDivisionShapeOut(**row)
+        result = await AdminDivisionService().get_admin_by_id(admin_code, db_session)
         if result:
             admin_data = AdminDivisionOut(**result.serialize())
             return admin_data
         else:
             raise HTTPException(status_code=404, detail=f"Admin with ID {admin_code} does not exist")
+    except HTTPException:
+        raise
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     except Exception as error:
         raise HTTPException(status_code=500, detail=str(error))
 
@@ -52,12 +127,12 @@ async def get_admin_info(admin_code: int, db_session: Session = Depends(get_db_s
 async def add_admin(
         admin_data: AdminDivisionCreate,
         user_id: int = Depends(get_current_user),
-        db_session: Session = Depends(get_db_session)
+        db_session: AsyncSession = Depends(get_db_session)
 ):
     try:
         admin_dict = admin_data.model_dump()
 
-        result = AdminDivisionService().add_admin(admin_dict, user_id, db_session)
+        result = await AdminDivisionService().add_admin(admin_dict, user_id, db_session)
 
         return AdminDivisionOut(**result.serialize())
     except ValueError as e:
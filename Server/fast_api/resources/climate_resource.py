@@ -1,12 +1,13 @@
-from fastapi import Body, Depends, HTTPException, Query
+from fastapi import Body, Depends, HTTPException, Query, Response
 from pydantic import BaseModel, Field
 from typing import Optional, List, Union
-from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 
 from Server.fast_api.resources import app, get_db_session
 from Server.fast_api.services import ClimateService
 from Server.fast_api.model import CollegeModel
 from Server.fast_api.services.base import get_current_user
+from Server.fast_api.common.pagination import PageSpec, get_page_spec, set_page_headers
 
 class ClimateOut(BaseModel):
     admin_code: str = Field(..., description="行政区划代码")
@@ -101,14 +102,113 @@ class ClimateOut(BaseModel):
 class ClimateCreate(ClimateOut):
     ...
 
+
+class ClimateValueIn(BaseModel):
+    admin_code: str = Field(..., description="行政区划代码")
+    month: int = Field(..., ge=100001, le=999912, description="月份，格式 YYYYMM")
+    metric: str = Field(..., min_length=1, max_length=20, description="气候指标，如 avg_temp")
+    value: float = Field(..., description="数值")
+
+
+class ClimateSeriesOut(BaseModel):
+    admin_code: str = Field(..., description="行政区划代码")
+    months: List[int] = Field(..., description="月份序列")
+    series: dict = Field(..., description="指标 -> 与 months 对齐的数值，缺失为 null")
+
+
+class ClimateSimilarOut(BaseModel):
+    admin_code: str = Field(..., description="行政区划代码")
+    distance: float = Field(..., description="与目标区划气候态的标准化均方根差，越小越相似")
+    similarity: float = Field(..., description="相似度 1 / (1 + distance)")
+
+
+class ClimateCatalogOut(BaseModel):
+    metrics: List[str] = Field(..., description="已有的气候指标")
+    months: List[int] = Field(..., description="已有的月份")
+    regions: int = Field(..., description="区划数量")
+
 @app.get("/climate/",
          tags=["ClimateData"],
          summary="获取所有气候数据",
-         description="获取所有气候数据")
-async def get_all_climate(db_session: Session = Depends(get_db_session)):
+         description="获取所有气候数据，支持 limit/after 游标分页、order_by 排序与 fields 字段投影")
+async def get_all_climate(
+        response: Response,
+        page: PageSpec = Depends(get_page_spec),
+        db_session: AsyncSession = Depends(get_db_session)
+):
     try:
-        climate = ClimateService().get_all_climate(db_session)
-        return [ClimateOut(**college.serialize()) for college in climate]
+        if page.is_default:
+            climate = await ClimateService().get_all_climate(db_session)
+            return [ClimateOut(**row) for row in climate]
+        page.bind(ClimateOut.model_fields, key_field="admin_code")
+        result = await ClimateService().list_climate(page, db_session)
+        set_page_headers(response, result)
+        return result.items if page.projected else [ClimateOut(**climate) for climate in result.items]
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as error:
+        raise HTTPException(status_code=500, detail=str(error))
+
+
+@app.get("/climate/metrics",
+         tags=["ClimateData"],
+         summary="获取气候指标与月份",
+         description="返回已有的气候指标、月份范围与区划数量",
+         response_model=ClimateCatalogOut)
+async def get_climate_catalog(db_session: AsyncSession = Depends(get_db_session)):
+    try:
+        return await ClimateService().get_climate_catalog(db_session)
+    except Exception as error:
+        raise HTTPException(status_code=500, detail=str(error))
+
+
+@app.get("/climate/series/{admin_code}",
+         tags=["ClimateData"],
+         summary="获取区域气候时间序列",
+         description="按指标与月份范围（YYYYMM，含两端）返回列式时间序列，metrics 以逗号分隔，缺省为全部指标",
+         response_model=ClimateSeriesOut)
+async def get_climate_series(
+        admin_code: str,
+        metrics: Optional[str] = Query(None, description="指标，逗号分隔，如 avg_temp,avg_precip"),
+        start: Optional[int] = Query(None, description="起始月份 YYYYMM"),
+        end: Optional[int] = Query(None, description="结束月份 YYYYMM"),
+        db_session: AsyncSession = Depends(get_db_session)
+):
+    try:
+        metric_list = [metric.strip() for metric in metrics.split(',') if metric.strip()] if metrics else None
+        result = await ClimateService().get_climate_series(admin_code, metric_list, start, end, db_session)
+        if result is None:
+            raise HTTPException(status_code=404, detail=f"Climate with ID {admin_code} does not exist")
+        return result
+    except HTTPException:
+        raise
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as error:
+        raise HTTPException(status_code=500, detail=str(error))
+
+
+@app.get("/climate/similar/{admin_code}",
+         tags=["ClimateData"],
+         summary="获取气候相似的区域",
+         description="按各月多年平均气候与所有区域比较，返回最相似的 k 个区域，metrics 以逗号分隔，缺省为全部指标",
+         response_model=List[ClimateSimilarOut])
+async def get_similar_climate(
+        admin_code: str,
+        k: int = Query(10, ge=1, le=100, description="返回数量"),
+        metrics: Optional[str] = Query(None, description="参与比较的指标，逗号分隔"),
+        db_session: AsyncSession = Depends(get_db_session)
+):
+    try:
+        metric_list = [metric.strip() for metric in metrics.split(',') if metric.strip()] if metrics else None
+        result = await ClimateService().get_similar_climate(admin_code, k, metric_list, db_session)
+        if result is None:
+            raise HTTPException(status_code=404, detail=f"Climate with ID {admin_code} does not exist")
+        return result
+    except HTTPException:
+        raise
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     except Exception as error:
         raise HTTPException(status_code=500, detail=str(error))
 
@@ -117,13 +217,11 @@ async def get_all_climate(db_session: Session = Depends(get_db_session)):
          tags=["ClimateData"],
          summary="获取特定区域气候详细信息",
          description="根据气候ID获取特定区域详细气候信息")
-async def get_climate_info(admin_code: str, db_session: Session = Depends(get_db_session)):
+async def get_climate_info(admin_code: str, db_session: AsyncSession = Depends(get_db_session)):
     try:
-        result = ClimateService().get_climate_by_id(admin_code, db_session)
+        result = await ClimateService().get_climate_by_id(admin_code, db_session)
         if result:
-            # 处理college对象的序列化
-            college_data = ClimateOut(**result.serialize())
-            return college_data
+            return ClimateOut(**result)
         else:
             raise HTTPException(status_code=404, detail=f"Climate with ID {admin_code} does not exist")
     except Exception as error:
@@ -137,14 +235,31 @@ async def get_climate_info(admin_code: str, db_session: Session = Depends(get_db
 async def add_climate(
         climate_data: ClimateCreate,
         user_id: int = Depends(get_current_user),
-        db_session: Session = Depends(get_db_session)
+        db_session: AsyncSession = Depends(get_db_session)
 ):
     try:
         climate_dict = climate_data.model_dump()
 
-        result = ClimateService().add_climate(climate_dict, user_id, db_session)
+        result = await ClimateService().add_climate(climate_dict, user_id, db_session)
+
+        return ClimateOut(**result)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
 
-        return ClimateOut(**result.serialize())
+@app.put("/climate/values",
+         tags=["ClimateData"],
+         summary="写入气候数值",
+         description="按 (行政区划, 月份, 指标) 写入或覆盖气候数值，新增月份或指标无需修改表结构，仅管理员可用")
+async def put_climate_values(
+        values: List[ClimateValueIn],
+        user_id: int = Depends(get_current_user),
+        db_session: AsyncSession = Depends(get_db_session)
+):
+    try:
+        return await ClimateService().put_climate_values([value.model_dump() for value in values], user_id, db_session)
     except ValueError as e:
         raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
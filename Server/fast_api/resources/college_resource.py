@@ -1,12 +1,19 @@
-from fastapi import Body, Depends, HTTPException, Query
-from pydantic import BaseModel, Field
+from fastapi import Body, Depends, Header, HTTPException, Query, Request, Response
+from fastapi.responses import JSONResponse, StreamingResponse
+from pydantic import BaseModel, Field, ValidationError
 from typing import Optional, List, Union
-from sqlalchemy.orm import Session
+from datetime import datetime
+from sqlalchemy.ext.asyncio import AsyncSession
 
 from Server.fast_api.resources import app, get_db_session
 from Server.fast_api.services import CollegeService
+from Server.fast_api.services.college_service import PENDING_REVIEW_FIELDS, PENDING_REVIEW_SORT_FIELDS
 from Server.fast_api.model import CollegeModel
 from Server.fast_api.services.base import get_current_user
+from Server.fast_api.common.pagination import PageSpec, get_page_spec, set_page_headers
+from Server.fast_api.common.bulk_io import detect_format, iter_records
+from Server.fast_api.common.tiles import etag_matches
+from Server.fast_api.common.geojson import GEOJSON_MEDIA_TYPE, feature, feature_collection, iter_feature_collection
 
 
 class CollegeOut(BaseModel):
@@ -31,6 +38,10 @@ class CollegeOut(BaseModel):
         from_attributes = True
 
 
+class CollegeNearbyOut(CollegeOut):
+    distance_km: float
+
+
 class CollegeSearchSchema(BaseModel):
     name: Optional[str] = Field(None, description="高校名称",examples=["中南大学"])
     province: Optional[str] = Field(None, description="省份",examples=["湖南"])
@@ -85,20 +96,130 @@ class EvaluationCreateSchema(BaseModel):
 class EvaluationUpdateSchema(EvaluationCreateSchema):
     ...
 
+class BulkReviewSchema(BaseModel):
+    review_ids: List[int] = Field(..., min_length=1, description="审核记录ID列表", examples=[[1, 2, 3]])
+    status: str = Field(..., pattern="^(approved|rejected)$", description="审核结果", examples=["approved"])
+    comment: Optional[str] = Field(None, description="审核意见")
+
 class CollegeOutWithId(CollegeOut):
 
     class Config:
         from_attributes = True
 
 
+# 瓦片可被浏览器缓存一分钟，之后凭 ETag 重新验证
+TILE_CACHE_CONTROL = "public, max-age=60"
+
+def college_feature(college: dict) -> dict:
+    # 分页时的几何取自经纬度字段，投影中不含经纬度时几何为 null
+    longitude, latitude = college.get("longitude"), college.get("latitude")
+    geometry = {"type": "Point", "coordinates": [longitude, latitude]} \
+        if longitude is not None and latitude is not None else None
+    return feature(geometry, {key: value for key, value in college.items() if key != "shape"})
+
+
+EVALUATION_FIELDS = ('evaluation_id', 'college_id', 'user_id', 'Dietary_evaluation', 'Traffic_evaluation', 'Evaluation')
+
+
 @app.get("/colleges/",
          tags=["College"],
          summary="获取所有高校数据",
-         description="获取所有高校基本信息")
-async def get_all_colleges(db_session: Session = Depends(get_db_session)):
+         description="获取所有高校基本信息，支持 limit/after 游标分页、order_by 排序与 fields 字段投影；"
+                     "format=geojson 时返回 GeoJSON FeatureCollection，不分页时流式输出")
+async def get_all_colleges(
+        response: Response,
+        page: PageSpec = Depends(get_page_spec),
+        data_format: Optional[str] = Query(None, alias="format", pattern="^(json|geojson)$",
+                                           description="输出格式，默认 json"),
+        db_session: AsyncSession = Depends(get_db_session)
+):
+    try:
+        if data_format == "geojson":
+            properties = [field for field in CollegeOut.model_fields if field != "shape"]
+            if page.is_default:
+                features = CollegeService().stream_college_features(properties)
+                return StreamingResponse(iter_feature_collection(features), media_type=GEOJSON_MEDIA_TYPE)
+            page.bind(CollegeOut.model_fields, key_field="college_id")
+            result = await CollegeService().list_colleges(page, db_session)
+            collection = JSONResponse(feature_collection([college_feature(college) for college in result.items]),
+                                      media_type=GEOJSON_MEDIA_TYPE)
+            set_page_headers(collection, result)
+            return collection
+        if page.is_default:
+            colleges = await CollegeService().get_all_colleges(db_session)
+            return [CollegeOut(**college) for college in colleges]
+        page.bind(CollegeOut.model_fields, key_field="college_id")
+        result = await CollegeService().list_colleges(page, db_session)
+        set_page_headers(response, result)
+        return result.items if page.projected else [CollegeOut(**college) for college in result.items]
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as error:
+        raise HTTPException(status_code=500, detail=str(error))
+
+
+# 以下两个单段路径需声明在 /colleges/{college_id} 之前
+@app.get("/colleges/nearby",
+         tags=["College"],
+         summary="周边高校",
+         description="按距离升序返回坐标周边的高校：给出 radius_km 返回半径内全部高校，给出 k 返回最近的 k 所（可同时限定半径）")
+async def get_nearby_colleges(
+        lon: float = Query(..., ge=-180, le=180, description="经度"),
+        lat: float = Query(..., ge=-90, le=90, description="纬度"),
+        radius_km: Optional[float] = Query(None, gt=0, description="搜索半径（公里）"),
+        k: Optional[int] = Query(None, ge=1, le=1000, description="返回最近的高校数量"),
+        db_session: AsyncSession = Depends(get_db_session)
+):
+    try:
+        colleges = await CollegeService().get_nearby_colleges(lon, lat, k, radius_km, db_session)
+        return [CollegeNearbyOut(**college) for college in colleges]
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as error:
+        raise HTTPException(status_code=500, detail=str(error))
+
+
+@app.get("/colleges/bbox",
+         tags=["College"],
+         summary="范围内高校",
+         description="返回经纬度范围内的高校，bbox 格式为 min_lon,min_lat,max_lon,max_lat")
+async def get_colleges_in_bbox(
+        bbox: str = Query(..., description="经纬度范围", examples=["112.8,28.1,113.1,28.3"]),
+        db_session: AsyncSession = Depends(get_db_session)
+):
+    try:
+        try:
+            values = tuple(float(value) for value in bbox.split(','))
+        except ValueError:
+            raise ValueError("bbox 必须为 4 个数字")
+        if len(values) != 4:
+            raise ValueError("bbox 必须为 4 个数字")
+        colleges = await CollegeService().get_colleges_in_bbox(values, db_session)
+        return [CollegeOut(**college) for college in colleges]
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as error:
+        raise HTTPException(status_code=500, detail=str(error))
+
+
+@app.get("/colleges/tiles/{z}/{x}/{y}",
+         tags=["College"],
+         summary="地图瓦片高校聚合",
+         description="按 XYZ 瓦片返回聚合后的高校点（簇中心、数量与代表高校），高缩放级别返回单个高校；"
+                     "响应带 ETag，携带 If-None-Match 且未变化时返回 304")
+async def get_college_tile(
+        z: int, x: int, y: int,
+        if_none_match: Optional[str] = Header(None),
+        db_session: AsyncSession = Depends(get_db_session)
+):
     try:
-        colleges = CollegeService().get_all_colleges(db_session)
-        return [CollegeOut(**college.serialize()) for college in colleges]
+        body, etag = await CollegeService().get_college_tile(z, x, y, db_session)
+        headers = {"ETag": etag, "Cache-Control": TILE_CACHE_CONTROL}
+        if etag_matches(if_none_match, etag):
+            return Response(status_code=304, headers=headers)
+        return Response(content=body, media_type="application/json", headers=headers)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     except Exception as error:
         raise HTTPException(status_code=500, detail=str(error))
 
@@ -107,9 +228,9 @@ async def get_all_colleges(db_session: Session = Depends(get_db_session)):
          tags=["College"],
          summary="获取特定高校详细信息",
          description="根据高校ID获取特定高校详细信息及评价")
-async def get_college_info(college_id: int, db_session: Session = Depends(get_db_session)):
+async def get_college_info(college_id: int, db_session: AsyncSession = Depends(get_db_session)):
     try:
-        result = CollegeService().get_college_with_evaluation(college_id, db_session)
+        result = await CollegeService().get_college_with_evaluation(college_id, db_session)
         if result:
             # 处理college对象的序列化
             college_data = CollegeOut(**result["college"].serialize())
@@ -137,20 +258,28 @@ async def search_colleges(
         is_985: Optional[bool] = Query(None, description="是否985高校"),
         is_211: Optional[bool] = Query(None, description="是否211高校"),
         is_double_first: Optional[bool] = Query(None, description="是否双一流高校"),
-        db_session: Session = Depends(get_db_session)
+        db_session: AsyncSession = Depends(get_db_session)
 ):
     try:
-        colleges = CollegeService().search_colleges(
+        colleges = await CollegeService().search_colleges(
             name=name, province=province, city=city, category=category,
             nature=nature, type=type, is_985=is_985, is_211=is_211,
             is_double_first=is_double_first, db_session=db_session
         )
-        colleges = [CollegeOut(**college.serialize()) for college in colleges]
+        colleges = [CollegeOut(**college) for college in colleges]
         return colleges
     except Exception as error:
         raise HTTPException(status_code=500, detail=str(error))
 
 
+@app.get("/colleges/cache/stats",
+         tags=["College"],
+         summary="高校目录缓存统计",
+         description="获取高校目录缓存的命中/未命中次数，用于确认读取是否已不再访问数据库")
+async def get_college_cache_stats():
+    return await CollegeService().get_cache_stats()
+
+
 @app.post("/colleges/",
           tags=["College"],
           summary="添加新高校",
@@ -158,14 +287,14 @@ async def search_colleges(
 async def add_college(
         college_data: CollegeCreateSchema,
         user_id: int = Depends(get_current_user),
-        db_session: Session = Depends(get_db_session)
+        db_session: AsyncSession = Depends(get_db_session)
 ):
     try:
         # 将Pydantic模型转换为字典
         college_dict = college_data.model_dump()
         
         # 调用服务添加高校，传递用户ID
-        result = CollegeService().add_college(college_dict, user_id, db_session)
+        result = await CollegeService().add_college(college_dict, user_id, db_session)
         
         # 根据返回结果类型进行处理
         if isinstance(result, dict) and "message" in result:
@@ -181,6 +310,50 @@ async def add_college(
         raise HTTPException(status_code=500, detail=str(e))
 
 
+@app.post("/colleges/bulk",
+          tags=["College"],
+          summary="批量导入高校",
+          description="以 NDJSON（每行一个高校 JSON）或带表头的 CSV 批量导入高校，仅管理员。"
+                      "请求体边读边校验、分批插入；atomic=true 时任一行失败全部回滚，否则跳过失败行并逐行报告。"
+                      "未提供 shape 时按经纬度生成 POINT(经度 纬度)",
+          openapi_extra={"requestBody": {"required": True, "content": {
+              "application/x-ndjson": {"schema": {"type": "string"}},
+              "text/csv": {"schema": {"type": "string"}},
+          }}})
+async def bulk_add_colleges(
+        request: Request,
+        data_format: Optional[str] = Query(None, alias="format", pattern="^(ndjson|csv)$",
+                                           description="请求体格式，默认按 Content-Type 判断"),
+        atomic: bool = Query(True, description="是否全有或全无"),
+        user_id: int = Depends(get_current_user),
+        db_session: AsyncSession = Depends(get_db_session)
+):
+    try:
+        data_format = detect_format(request.headers.get('content-type'), data_format)
+        records = _validate_colleges(iter_records(request.stream(), data_format))
+        return await CollegeService().bulk_add_colleges(records, atomic, user_id, db_session)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+async def _validate_colleges(records):
+    """
+    按 CollegeCreateSchema 逐条校验导入记录
+    """
+    async for line_no, college_data, error in records:
+        if error is None:
+            if college_data.get('shape') is None and college_data.get('longitude') is not None \
+                    and college_data.get('latitude') is not None:
+                college_data['shape'] = f"POINT({college_data['longitude']} {college_data['latitude']})"
+            try:
+                college_data = CollegeCreateSchema.model_validate(college_data).model_dump()
+            except ValidationError as e:
+                error = "; ".join(f"{'.'.join(str(loc) for loc in item['loc'])}: {item['msg']}" for item in e.errors())
+        yield line_no, college_data, error
+
+
 @app.post("/colleges/{college_id}/evaluations/",
           tags=["College"],
           summary="添加高校评价",
@@ -189,7 +362,7 @@ async def add_evaluation(
         college_id: int,
         evaluation_data: EvaluationCreateSchema,
         user_id: int = Depends(get_current_user),
-        db_session: Session = Depends(get_db_session)
+        db_session: AsyncSession = Depends(get_db_session)
 ):
     try:
         # 将Pydantic模型转换为字典
@@ -197,7 +370,7 @@ async def add_evaluation(
         evaluation_dict['college_id'] = college_id
         
         # 调用服务添加评价，传递用户ID
-        new_evaluation = CollegeService().add_evaluation(evaluation_dict, user_id, db_session)
+        new_evaluation = await CollegeService().add_evaluation(evaluation_dict, user_id, db_session)
         
         return new_evaluation.serialize()
     except ValueError as e:
@@ -213,14 +386,14 @@ async def update_evaluation(
         evaluation_id: int,
         evaluation_data: EvaluationUpdateSchema,
         user_id: int = Depends(get_current_user),
-        db_session: Session = Depends(get_db_session)
+        db_session: AsyncSession = Depends(get_db_session)
 ):
     try:
         # 将Pydantic模型转换为字典
         evaluation_dict = evaluation_data.model_dump()
 
         # 调用服务更新评价，传递用户ID
-        updated_evaluation = CollegeService().update_evaluation(evaluation_id, evaluation_dict, user_id, db_session)
+        updated_evaluation = await CollegeService().update_evaluation(evaluation_id, evaluation_dict, user_id, db_session)
 
         return updated_evaluation.serialize()
     except ValueError as e:
@@ -236,11 +409,11 @@ async def update_evaluation(
 async def delete_evaluation(
         evaluation_id: int,
         user_id: int = Depends(get_current_user),
-        db_session: Session = Depends(get_db_session)
+        db_session: AsyncSession = Depends(get_db_session)
 ):
     try:
         # 调用服务删除评价，传递用户ID
-        result = CollegeService().delete_evaluation(evaluation_id, user_id, db_session)
+        result = await CollegeService().delete_evaluation(evaluation_id, user_id, db_session)
         return result
     except ValueError as e:
         raise HTTPException(status_code=400, detail=str(e))
@@ -250,14 +423,21 @@ async def delete_evaluation(
 @app.get("/colleges/evaluations/",
             tags=["College"],
             summary="查看用户所有评价",
-            description="查看用户对高校的所有评价")
+            description="查看用户对高校的所有评价，支持 limit/after 游标分页、order_by 排序与 fields 字段投影")
 async def get_all_evaluations(
+        response: Response,
+        page: PageSpec = Depends(get_page_spec),
         user_id: int = Depends(get_current_user),
-        db_session: Session = Depends(get_db_session)
+        db_session: AsyncSession = Depends(get_db_session)
 ):
     try:
-        result = CollegeService().get_all_evaluations(user_id, db_session)
-        return result
+        if page.is_default:
+            result = await CollegeService().get_all_evaluations(user_id, db_session)
+            return result
+        page.bind(EVALUATION_FIELDS, key_field="evaluation_id")
+        result = await CollegeService().list_evaluations(user_id, page, db_session)
+        set_page_headers(response, result)
+        return result.items
     except ValueError as e:
         raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
@@ -270,11 +450,11 @@ async def get_all_evaluations(
 async def delete_college(
         college_id: int,
         user_id: int = Depends(get_current_user),
-        db_session: Session = Depends(get_db_session)
+        db_session: AsyncSession = Depends(get_db_session)
 ):
     try:
         # 调用服务删除高校，传递用户ID
-        result = CollegeService().delete_college(college_id, user_id, db_session)
+        result = await CollegeService().delete_college(college_id, user_id, db_session)
         return result
     except ValueError as e:
         raise HTTPException(status_code=400, detail=str(e))
@@ -282,20 +462,40 @@ async def delete_college(
         raise HTTPException(status_code=500, detail=str(e))
 
 
+# 需在 /colleges/review/{review_id} 之前注册，否则 bulk 会被当作 review_id 匹配
+@app.put("/colleges/review/bulk",
+         tags=["College"],
+         summary="批量审核高校信息",
+         description="一次审核多条待审核的高校信息，仅管理员。在同一事务中批量写入，逐条返回处理结果"
+                     "（approved/rejected/skipped/failed）")
+async def bulk_review_pending_colleges(
+        review_data: BulkReviewSchema = Body(...),
+        user_id: int = Depends(get_current_user),
+        db_session: AsyncSession = Depends(get_db_session)
+):
+    try:
+        result = await CollegeService().bulk_review_pending_colleges(
+            review_data.review_ids, review_data.status, review_data.comment, user_id, db_session)
+        return result
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
 @app.put("/colleges/review/{review_id}",
          tags=["College"],
          summary="审核高校信息",
-         description="审核待审核的高校信息，仅管理员")
+         description="审核待审核的高校信息，仅管理员；已审核的记录返回 400")
 async def review_pending_college(
         review_id: int,
         status: str,
         comment: Optional[str] = None,
         user_id: int = Depends(get_current_user),
-        db_session: Session = Depends(get_db_session)
+        db_session: AsyncSession = Depends(get_db_session)
 ):
     try:
         # 调用服务审核高校，传递用户ID
-        result = CollegeService().review_pending_college(review_id, status, comment, user_id, db_session)
+        result = await CollegeService().review_pending_college(review_id, status, comment, user_id, db_session)
         return result
     except ValueError as e:
         raise HTTPException(status_code=400, detail=str(e))
@@ -306,16 +506,26 @@ async def review_pending_college(
 @app.get("/colleges/review/pending",
          tags=["College"],
          summary="获取所有待审核信息",
-         description="获取所有待审核的高校信息和高校信息更新请求，仅管理员"
+         description="获取所有待审核的高校信息和高校信息更新请求，仅管理员。"
+                     "支持按审核类型、提交时间过滤，limit/after 游标分页、order_by（review_id/submit_time）排序与 fields 字段投影"
          )
 async def get_pending_reviews(
+        response: Response,
+        page: PageSpec = Depends(get_page_spec),
+        review_type: Optional[str] = Query(None, pattern="^(new|update)$", description="审核类型"),
+        submitted_after: Optional[datetime] = Query(None, description="提交时间下限（含）"),
+        submitted_before: Optional[datetime] = Query(None, description="提交时间上限（不含）"),
         user_id: int = Depends(get_current_user),
-        db_session: Session = Depends(get_db_session)
+        db_session: AsyncSession = Depends(get_db_session)
 ):
     try:
-        # 调用服务获取所有待审核信息，传递用户ID
-        result = CollegeService().get_pending_reviews(user_id, db_session)
-        return result
+        page.bind(PENDING_REVIEW_FIELDS, key_field="review_id", sortable_fields=PENDING_REVIEW_SORT_FIELDS)
+        # 调用服务获取待审核信息，传递用户ID
+        result = await CollegeService().get_pending_reviews(user_id, db_session, page, review_type=review_type,
+                                                            submitted_after=submitted_after,
+                                                            submitted_before=submitted_before)
+        set_page_headers(response, result)
+        return result.items
     except ValueError as e:
         raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
@@ -329,10 +539,10 @@ async def get_pending_reviews(
 async def get_pendingdetail_reviews(
         review_id:int,
         user_id: int = Depends(get_current_user),
-        db_session: Session = Depends(get_db_session)
+        db_session: AsyncSession = Depends(get_db_session)
 ):
     try:
-        result = CollegeService().get_pendingdetail_reviews(user_id,review_id, db_session)
+        result = await CollegeService().get_pendingdetail_reviews(user_id,review_id, db_session)
         return result.serialize()
     except ValueError as e:
         raise HTTPException(status_code=400, detail=str(e))
@@ -349,14 +559,14 @@ async def update_college(
         college_id: int,
         college_data: CollegeUpdateSchema,
         user_id: int = Depends(get_current_user),
-        db_session: Session = Depends(get_db_session)
+        db_session: AsyncSession = Depends(get_db_session)
 ):
     try:
         # 将Pydantic模型转换为字典
         college_dict = college_data.model_dump(exclude_unset=True)
 
         # 调用服务更新高校信息，传递用户ID
-        result = CollegeService().update_college(college_id, college_dict, user_id, db_session)
+        result = await CollegeService().update_college(college_id, college_dict, user_id, db_session)
 
         # 根据返回结果类型进行处理
         if isinstance(result, dict) and "message" in result:
@@ -2,73 +2,121 @@ import asyncio
 import os
 import json
 
+from typing import Literal, Optional
+
 from pydantic import BaseModel, Field
-from fastapi import Body, Depends,BackgroundTasks,HTTPException, Response,Path
+from fastapi import Body, Depends,BackgroundTasks,HTTPException, Response,Path,Query
 from fastapi.responses import StreamingResponse
 from Server.fast_api.resources import app,get_db_session
 from autogen_core.models import (UserMessage)
 from Server.fast_api.services import ServerService
-from Server.fast_api.common import result_queue
-from sqlalchemy.orm import Session
-from Server.fast_api.services.base import get_current_user
+from Server.fast_api.common import result_channels, config
+from Server.fast_api.common.channels import END_OF_TURN, drain
+from sqlalchemy.ext.asyncio import AsyncSession
+from Server.fast_api.services.base import get_current_user, get_optional_user
+
+
+_stream_config = config.get('chat_stream', {})
+HEARTBEAT_SECONDS = _stream_config.get('heartbeat_seconds', 15)
+# 兜底超时：超过该时间没有任何响应（也没有收到结束标记）即结束
+IDLE_TIMEOUT = _stream_config.get('idle_timeout', 180)
+
+
+def _frame(stream_format: str, event: str, payload=None) -> str:
+    """
+    ndjson：每行一个 JSON，心跳为空行；sse：标准 Server-Sent Events 帧，心跳为注释行
+    """
+    if event == "heartbeat":
+        return "\n" if stream_format == "ndjson" else ": ping\n\n"
+    if stream_format == "ndjson":
+        key = {"message": "data", "end": "end", "error": "error"}[event]
+        return json.dumps({key: payload}, ensure_ascii=False) + "\n"
+    return f"event: {event}\ndata: {json.dumps(payload, ensure_ascii=False)}\n\n"
 
 
 class InputModel(BaseModel):
     Content:str=Field(...,description="用户输入")
+    SessionId:Optional[str]=Field(None,description="会话ID，不填时登录用户使用默认会话，匿名用户的请求不保留历史",
+                                  pattern=r"^[A-Za-z0-9_-]{1,64}$")
     
 @app.post("/server",
           tags=["Server"],
           summary="对话助手",
-          description="与数据库助手进行对话交互",
+          description="与数据库助手进行对话交互。每个会话由独立的智能体实例处理，响应头 X-Session-Id 返回会话ID；"
+                      "匿名用户需自行生成 SessionId 并在每次请求中带上才能延续对话，否则每次请求互不相关。默认以 NDJSON 流式返回（每行 {\"data\": ...}，"
+                      "文本片段带 Chunk 标记，结束时返回 {\"end\": ...}），format=sse 时以 Server-Sent Events 返回",
           response_class=StreamingResponse
           )
-async def handle_user_input(*,input_model:InputModel=Body(...)):
-    # 1. 发布消息
-    await ServerService().publish_message(input_model.Content)
-    # 2. 流式生成响应
+async def handle_user_input(*,input_model:InputModel=Body(...),
+                            stream_format:Literal["ndjson","sse"]=Query("ndjson",alias="format",description="流式格式"),
+                            user_id:Optional[int]=Depends(get_optional_user)):
+    session_id = ServerService.session_id(user_id, input_model.SessionId)
+    # 1. 为本次请求打开独立的响应通道，再发布消息
+    correlation_id, queue = result_channels.open()
+    try:
+        await ServerService().publish_message(input_model.Content, session_id, correlation_id)
+    except Exception:
+        result_channels.close(correlation_id)
+        raise
+    # 2. 流式生成响应：收到结束标记立即结束，空闲期间定时发送心跳
     async def generate_stream():
+        idle = 0.0
         try:
-            timeout = 30.0  # 设置超时时间(秒)
-            start_time = asyncio.get_event_loop().time()
-
-            while (asyncio.get_event_loop().time() - start_time) < timeout:
+            while True:
                 try:
-                    # 使用异步等待获取结果
-                    result = await asyncio.wait_for(
-                        result_queue.get(),
-                        timeout=0.1
-                    )
-                    yield json.dumps({"data": result},ensure_ascii=False) + "\n"
-                    start_time = asyncio.get_event_loop().time()
+                    first = await asyncio.wait_for(queue.get(), timeout=HEARTBEAT_SECONDS)
                 except asyncio.TimeoutError:
-                     continue
+                    idle += HEARTBEAT_SECONDS
+                    if idle >= IDLE_TIMEOUT:
+                        yield _frame(stream_format, "end", {"reason": "timeout"})
+                        break
+                    yield _frame(stream_format, "heartbeat")
+                    continue
+                idle = 0.0
+                for result in drain(queue, first):
+                    if result is END_OF_TURN:
+                        yield _frame(stream_format, "end", {"reason": "end_of_turn"})
+                        return
+                    yield _frame(stream_format, "message", result)
 
         except Exception as e:
-            yield json.dumps({"error": str(e)}) + "\n"
+            yield _frame(stream_format, "error", str(e))
+        finally:
+            result_channels.close(correlation_id)
 
     return StreamingResponse(
         generate_stream(),
-        media_type="text/event-stream",
+        media_type="text/event-stream" if stream_format == "sse" else "application/x-ndjson",
         headers={
             "Cache-Control": "no-cache",
-            "X-Accel-Buffering": "no"
+            "X-Accel-Buffering": "no",
+            "X-Session-Id": session_id,
+            "X-Correlation-Id": correlation_id,
         }
     )
 
+@app.get("/server/metrics",
+         tags=["Server"],
+         summary="运行指标",
+         description="数据库连接池取连接耗时、等待次数、当前占用，高校目录缓存、大模型回答缓存与高德接口缓存的命中情况，对话响应通道数")
+async def get_metrics():
+    return await ServerService.get_metrics()
+
 @app.post("/server/traffic/{college_id}",
           tags=["Server"],
           summary="交通分析",
-          description="生源地与目标院校之间的交通分析",
+          description="生源地与目标院校之间的交通分析，相同输入的分析结果会被缓存，refresh=true 强制重新生成",
           )
 async def traffic_analysis(
         college_id: int = Path(..., description="目标院校id"),
+        refresh: bool = Query(False, description="跳过缓存，重新生成分析"),
         user_id: int = Depends(get_current_user),
-        db_session: Session = Depends(get_db_session)
+        db_session: AsyncSession = Depends(get_db_session)
 ):
     try:
         result = await ServerService().traffic_analysis(college_id, user_id, db_session)
         from Server.agents.toolbox import ai_response
-        response = await ai_response(result,task="traffic")
+        response = await ai_response(result,task="traffic",refresh=refresh)
         return response
     except Exception as e:
         raise HTTPException(
@@ -79,17 +127,18 @@ async def traffic_analysis(
 @app.post("/server/climate/{college_id}",
           tags=["Server"],
           summary="气候分析",
-          description="生源地与目标院校之间的气候差异分析",
+          description="生源地与目标院校之间的气候差异分析，相同输入的分析结果会被缓存，refresh=true 强制重新生成",
           )
 async def climate_analysis(
         college_id: int = Path(..., description="目标院校id"),
+        refresh: bool = Query(False, description="跳过缓存，重新生成分析"),
         user_id: int = Depends(get_current_user),
-        db_session: Session = Depends(get_db_session)
+        db_session: AsyncSession = Depends(get_db_session)
 ):
     try:
         result = await ServerService().climate_analysis(college_id, user_id, db_session)
         from Server.agents.toolbox import ai_response
-        response = await ai_response(result,task = "climate")
+        response = await ai_response(result,task = "climate",refresh=refresh)
         return response
     except Exception as e:
         raise HTTPException(
@@ -1,15 +1,16 @@
 import jwt
-from fastapi import Body, Depends, HTTPException, status
+from fastapi import Body, Depends, HTTPException, Response, status
 from future.utils import raise_
 from pydantic import BaseModel, Field
 from typing import Optional
-from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 import hashlib
 
 from Server.fast_api.common import LOGIN_SECRET
-from Server.fast_api.resources import app, Session, get_db_session
+from Server.fast_api.resources import app, get_db_session
 from Server.fast_api.services import UserService
 from Server.fast_api.model import UserModel
+from Server.fast_api.common.pagination import PageSpec, get_page_spec, set_page_headers
 
 
 class LoginRequestSchema(BaseModel):
@@ -42,10 +43,10 @@ class UserOut(BaseModel):
 @app.post("/register", tags=["User"], summary="用户注册", description="注册新用户")
 async def register_user(
     register_data: RegisterRequestSchema = Body(...), 
-    db_session: Session = Depends(get_db_session)
+    db_session: AsyncSession = Depends(get_db_session)
 ):
     try:
-        user = UserService().register(
+        user = await UserService().register(
             username=register_data.username,
             password=register_data.password,
             province=register_data.province,
@@ -63,13 +64,13 @@ async def register_user(
 @app.post("/login", tags=["User"], summary="用户登录", description="用户登录")
 async def login(
     login_data: LoginRequestSchema = Body(...), 
-    db_session: Session = Depends(get_db_session)
+    db_session: AsyncSession = Depends(get_db_session)
 ):
     try:
         username = login_data.username
         password = login_data.password
         if username and password:
-            user_model = UserService().login(
+            user_model = await UserService().login(
                 username=username, 
                 password=password, 
                 db_session=db_session
@@ -92,9 +93,9 @@ async def login(
         raise HTTPException(status_code=500, detail=str(error))
 
 @app.get("/user/{user_id}",tags=["User"],summary="获取用户信息",description="获取用户信息")
-async def get_user_by_id(user_id: int,db_session: Session = Depends(get_db_session)):
+async def get_user_by_id(user_id: int,db_session: AsyncSession = Depends(get_db_session)):
     try:
-        result = UserService().get_user_by_id(user_id, db_session)
+        result = await UserService().get_user_by_id(user_id, db_session)
         if result:
             user_data = UserOut(**result.serialize())
             return user_data
@@ -103,14 +104,26 @@ async def get_user_by_id(user_id: int,db_session: Session = Depends(get_db_sessi
     except Exception as error:
         raise HTTPException(status_code=500, detail=str(error))
 
-@app.get("/user",tags=["User"],summary="获取所有用户列表",description="获取所有用户列表")
-async def get_all_users(db_session: Session = Depends(get_db_session)):
+@app.get("/user",tags=["User"],summary="获取所有用户列表",
+         description="获取所有用户列表，支持 limit/after 游标分页、order_by 排序与 fields 字段投影")
+async def get_all_users(
+    response: Response,
+    page: PageSpec = Depends(get_page_spec),
+    db_session: AsyncSession = Depends(get_db_session)
+):
     try:
-        result = UserService().get_all_users(db_session)
+        if not page.is_default:
+            page.bind(UserOut.model_fields, key_field="user_id")
+            users_page = await UserService().list_users(page, db_session)
+            set_page_headers(response, users_page)
+            return users_page.items if page.projected else [UserOut(**user) for user in users_page.items]
+        result = await UserService().get_all_users(db_session)
         if result:
             users_data = [UserOut(**user.serialize()) for user in result]
             return users_data
         else:
             raise HTTPException(status_code=404, detail="用户列表为空")
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     except Exception as error:
         raise HTTPException(status_code=500, detail=str(error))
\ No newline at end of file
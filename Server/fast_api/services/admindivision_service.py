@@ -1,38 +1,276 @@
 from Server.fast_api.services import BaseService
-from Server.fast_api.resources import Session, get_db_session
-from Server.fast_api.model import AdminDivisionModel,UserModel
-from sqlalchemy import Select
+from sqlalchemy.ext.asyncio import AsyncSession
+from Server.fast_api.resources import AsyncSessionLocal, get_db_session
+from Server.fast_api.model import AdminDivisionModel, AdminDivisionShapeModel, UserModel
+from Server.fast_api.common.pagination import PageSpec, Page, apply_keyset, build_page, paginate_query
+from Server.fast_api.common.geojson import FeatureRow
+from Server.fast_api.common.geometry import (geojson_column, geojson_text, geometry_column, round_geometry,
+                                             to_geometry, to_wkb, to_wkt)
+from Server.fast_api.common.spatial import AdminDivisionLocator, count_points, simplify_geometry
+from Server.fast_api.services.cache_version import shared_version
+from sqlalchemy import Select, and_, case, null, select
+from typing import AsyncIterator, Dict, List, Optional, Union
+import asyncio
+import base64
+import json
+
+# 化简容差（度），由细到粗；full 为原始几何
+SHAPE_TOLERANCES = {"high": 0.005, "medium": 0.02, "low": 0.05}
+SHAPE_RESOLUTIONS = ("full",) + tuple(SHAPE_TOLERANCES)
+# 各分辨率输出时保留的小数位数
+SHAPE_DIGITS = {"full": 6, "high": 4, "medium": 3, "low": 2}
+SHAPE_FORMATS = ("wkt", "geojson", "wkb")
+
+
+def resolution_for_zoom(zoom: int) -> str:
+    """
+    按地图缩放级别选择分辨率：容差不超过该级别下 2 个像素（256 像素瓦片）的最粗一级
+    """
+    pixel_degrees = 360 / (256 * 2 ** zoom)
+    for resolution in reversed(SHAPE_TOLERANCES):
+        if SHAPE_TOLERANCES[resolution] <= 2 * pixel_degrees:
+            return resolution
+    return "full"
+
+
+def simplified_shapes(geometry: dict) -> Dict[str, dict]:
+    """
+    逐级化简：每一级在上一级结果上继续化简，误差不超过两级容差之和
+    """
+    shapes = {}
+    for resolution, tolerance in SHAPE_TOLERANCES.items():
+        geometry = simplify_geometry(geometry, tolerance)
+        shapes[resolution] = geometry
+    return shapes
+
+
+def shape_rows(admin_code: str, geometry: dict) -> List[dict]:
+    """
+    AdminDivisionShapeModel 的各分辨率行
+    """
+    return [{"admin_code": admin_code, "resolution": resolution, "shape": to_wkb(shape),
+             "point_count": count_points(shape)}
+            for resolution, shape in simplified_shapes(geometry).items()]
+
+
+def encode_shape(geometry: Optional[dict], resolution: str, shape_format: str) -> Union[str, dict, None]:
+    """
+    按分辨率量化坐标后编码为 WKT、GeoJSON 或 base64 WKB
+    """
+    if geometry is None:
+        return None
+    geometry = round_geometry(geometry, SHAPE_DIGITS[resolution])
+    if shape_format == "geojson":
+        return geometry
+    if shape_format == "wkb":
+        return base64.b64encode(to_wkb(geometry)).decode("ascii")
+    return to_wkt(geometry)
+
+
+class AdminLocatorCache:
+    """
+    行政区划多边形的进程内空间索引，首次使用时从数据库加载，行政区划变更后失效；
+    其他进程的变更通过 CacheVersion 版本号发现
+    """
+
+    def __init__(self):
+        self._locator: Optional[AdminDivisionLocator] = None
+        self._load_lock = asyncio.Lock()
+        self.version = shared_version("admin_locator")
+        self._loaded_version: Optional[int] = None
+
+    async def get(self, db_session: AsyncSession) -> AdminDivisionLocator:
+        locator = self._locator
+        if locator is not None and await self.version.stale(db_session, self._loaded_version):
+            self.invalidate()
+            locator = None
+        if locator is not None:
+            return locator
+        async with self._load_lock:
+            if self._locator is None:
+                # 先读版本再读数据，加载期间的写入会在下次检查时发现
+                version = await self.version.current(db_session)
+                shape = geometry_column(AdminDivisionModel.shape, db_session.bind.dialect.name)
+                rows = (await db_session.execute(select(AdminDivisionModel.admin_code, shape))).all()
+                # 多边形解析与建树为纯 CPU 计算，放到线程中避免阻塞事件循环
+                self._locator = await asyncio.to_thread(AdminDivisionLocator, rows)
+                self._loaded_version = version
+            return self._locator
+
+    def invalidate(self):
+        self._locator = None
+        self._loaded_version = None
+
+
+admin_locator = AdminLocatorCache()
+
+
+async def resolve_admin_code(college: dict, db_session: AsyncSession) -> Optional[str]:
+    """
+    按高校经纬度（或 shape 点）确定所在行政区划，落在任何行政区划外时保留原有的 admin_code
+    """
+    locator = await admin_locator.get(db_session)
+    return locator.locate_college(college) or college.get('admin_code') or None
 
 
 class AdminDivisionService(BaseService):
-    def get_admin_by_id(self, admin_id: int, db_session: Session):
+    async def get_admin_by_id(self, admin_id: int, db_session: AsyncSession):
         """
         根据ID获取特定行政区划信息
         """
-        return db_session.get(AdminDivisionModel, admin_id)
+        return await db_session.get(AdminDivisionModel, admin_id)
 
-    def get_all_admin(self, db_session: Session):
+    async def get_all_admin(self, db_session: AsyncSession):
         """
         获取所有行政区划数据
         """
         query = Select(AdminDivisionModel)
-        result = db_session.execute(query).scalars().all()
+        result = (await db_session.execute(query)).scalars().all()
+        return result
+
+    async def list_admin(self, page: PageSpec, db_session: AsyncSession) -> Page:
+        """
+        分页、排序、字段投影获取行政区划数据，未请求 shape 时不读取几何字段
+        """
+        return await paginate_query(db_session, AdminDivisionModel, page)
+
+    async def _shape_rows(self, resolution: str, db_session: AsyncSession, admin_code: Optional[str] = None,
+                          page: Optional[PageSpec] = None) -> Union[List[dict], Page]:
+        """
+        读取指定分辨率的几何（尚未化简的区划由原始几何即时化简），shape 为 GeoJSON 结构
+        """
+        if resolution not in SHAPE_RESOLUTIONS:
+            raise ValueError(f"不支持的分辨率: {resolution}")
+        original = geometry_column(AdminDivisionModel.shape, db_session.bind.dialect.name)
+        need_shape = page is None or "shape" in page.output_fields
+        if not need_shape:
+            # 未请求 shape 时不读取几何数据
+            query = select(AdminDivisionModel.admin_code, AdminDivisionModel.name, null().label("shape"))
+        elif resolution == "full":
+            query = select(AdminDivisionModel.admin_code, AdminDivisionModel.name, original.label("shape"))
+        else:
+            query = select(AdminDivisionModel.admin_code, AdminDivisionModel.name,
+                           AdminDivisionShapeModel.shape.label("shape")).outerjoin(
+                AdminDivisionShapeModel, and_(AdminDivisionShapeModel.admin_code == AdminDivisionModel.admin_code,
+                                              AdminDivisionShapeModel.resolution == resolution))
+        if admin_code is not None:
+            query = query.where(AdminDivisionModel.admin_code == admin_code)
+        if page is not None:
+            query = apply_keyset(query, getattr(AdminDivisionModel, page.sort_field),
+                                 AdminDivisionModel.admin_code, page)
+        else:
+            query = query.order_by(AdminDivisionModel.admin_code)
+        rows = [dict(row._mapping, resolution=resolution) for row in await db_session.execute(query)]
+        # 只解析本页且请求了 shape 的行
+        page_rows = rows[:page.limit] if page is not None and page.limit is not None else rows
+        if not need_shape:
+            page_rows = []
+
+        missing = [row["admin_code"] for row in page_rows if row["shape"] is None]
+        originals = {}
+        if missing and resolution != "full":
+            result = await db_session.execute(select(AdminDivisionModel.admin_code, original)
+                                              .where(AdminDivisionModel.admin_code.in_(missing)))
+            originals = dict(result.all())
+
+        def decode():
+            # WKB 解析、化简为纯 CPU 计算，放到线程中执行
+            for row in page_rows:
+                if row["shape"] is not None:
+                    row["shape"] = to_geometry(row["shape"])
+                elif row["admin_code"] in originals:
+                    geometry = to_geometry(originals[row["admin_code"]])
+                    row["shape"] = simplify_geometry(geometry, SHAPE_TOLERANCES[resolution])
+
+        await asyncio.to_thread(decode)
+        return rows if page is None else build_page(page, rows)
+
+    async def get_admin_shape(self, admin_code: str, resolution: str, shape_format: str,
+                              db_session: AsyncSession) -> Optional[dict]:
+        """
+        获取单个行政区划指定分辨率、编码的几何
+        """
+        rows = await self._shape_rows(resolution, db_session, admin_code=admin_code)
+        if not rows:
+            return None
+        row = rows[0]
+        row["shape"] = encode_shape(row["shape"], resolution, shape_format)
+        return row
+
+    async def list_admin_shapes(self, resolution: str, shape_format: str, db_session: AsyncSession,
+                                page: Optional[PageSpec] = None) -> Union[List[dict], Page]:
+        """
+        获取全部行政区划指定分辨率、编码的几何；给出 page 时按 keyset 分页
+        """
+        result = await self._shape_rows(resolution, db_session, page=page)
+        items = result if page is None else result.items
+
+        def encode():
+            for row in items:
+                if "shape" in row:
+                    row["shape"] = encode_shape(row["shape"], resolution, shape_format)
+
+        await asyncio.to_thread(encode)
         return result
 
-    def add_admin(self, admin_data: dict, user_id:int ,db_session: Session):
+    def stream_admin_features(self, resolution: str, batch_size: int = 100) -> AsyncIterator[FeatureRow]:
+        """
+        以服务端游标逐行读取行政区划，返回 (GeoJSON 几何文本, 属性) 的异步迭代器
+        MySQL 下几何由 ST_AsGeoJSON 在数据库中转换；流式输出期间使用独立的会话
+        """
+        if resolution not in SHAPE_RESOLUTIONS:
+            raise ValueError(f"不支持的分辨率: {resolution}")
+        return self._iter_admin_features(resolution, batch_size)
+
+    async def _iter_admin_features(self, resolution: str, batch_size: int) -> AsyncIterator[FeatureRow]:
+        digits = SHAPE_DIGITS[resolution]
+        async with AsyncSessionLocal() as db_session:
+            dialect = db_session.bind.dialect.name
+            if resolution == "full":
+                geometry = geojson_column(AdminDivisionModel.shape, dialect, digits)
+                query = select(AdminDivisionModel.admin_code, AdminDivisionModel.name,
+                               geometry.label("geometry"), null().label("original"))
+            else:
+                geometry = geojson_column(AdminDivisionShapeModel.shape, dialect, digits, wkb=True)
+                # 尚未化简的区划读取原始几何，在 Python 中即时化简
+                original = case((AdminDivisionShapeModel.shape.is_(None),
+                                 geometry_column(AdminDivisionModel.shape, dialect)))
+                query = select(AdminDivisionModel.admin_code, AdminDivisionModel.name,
+                               geometry.label("geometry"), original.label("original")).outerjoin(
+                    AdminDivisionShapeModel, and_(AdminDivisionShapeModel.admin_code == AdminDivisionModel.admin_code,
+                                                  AdminDivisionShapeModel.resolution == resolution))
+            query = query.order_by(AdminDivisionModel.admin_code).execution_options(yield_per=batch_size)
+            result = await db_session.stream(query)
+            async for admin_code, name, geometry, original in result:
+                if geometry is not None:
+                    text = geojson_text(geometry, digits)
+                elif original is not None:
+                    simplified = simplify_geometry(to_geometry(original), SHAPE_TOLERANCES[resolution])
+                    text = json.dumps(round_geometry(simplified, digits), separators=(",", ":"))
+                else:
+                    text = None
+                yield text, {"admin_code": admin_code, "name": name, "resolution": resolution}
+
+    async def add_admin(self, admin_data: dict, user_id:int ,db_session: AsyncSession):
         """
         添加新行政区划数据
         """
         # 获取用户信息以检查权限
-        user = db_session.get(UserModel, user_id)
+        user = await db_session.get(UserModel, user_id)
         if not user:
             raise ValueError("用户不存在")
 
         if user.role == 'admin':
+            # 几何无法解析时抛出 ValueError，不写入任何数据
+            geometry = to_geometry(admin_data['shape'])
             new_admin = AdminDivisionModel(**admin_data)
             db_session.add(new_admin)
-            db_session.commit()
-            db_session.refresh(new_admin)
+            db_session.add_all(AdminDivisionShapeModel(**row)
+                               for row in shape_rows(str(admin_data['admin_code']), geometry))
+            await admin_locator.version.bump(db_session)
+            await db_session.commit()
+            await db_session.refresh(new_admin)
+            admin_locator.invalidate()
             return new_admin
 
         else:
@@ -3,6 +3,7 @@ import jwt
 from fastapi import Header, HTTPException, Depends
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 import logging
+from typing import Optional
 
 # 配置日志
 logger = logging.getLogger(__name__)
@@ -105,4 +106,15 @@ def get_current_user(credentials: HTTPAuthorizationCredentials = Depends(HTTPBea
         raise HTTPException(
             status_code=401,
             detail=f"令牌解析错误: {str(e)}"
-        )
\ No newline at end of file
+        )
+
+def get_optional_user(credentials: Optional[HTTPAuthorizationCredentials] = Depends(HTTPBearer(auto_error=False))):
+    """
+    可选登录：携带有效令牌时返回用户ID，未携带或令牌无效时返回 None（按匿名处理）
+    """
+    if not credentials or not credentials.credentials:
+        return None
+    try:
+        return get_current_user(credentials)
+    except HTTPException:
+        return None
@@ -0,0 +1,70 @@
+from sqlalchemy import insert, select, update
+from sqlalchemy.exc import DBAPIError, IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
+from Server.fast_api.common import config
+from Server.fast_api.model import CacheVersionModel
+from typing import Optional
+import time
+
+
+class SharedVersion:
+    """
+    进程内缓存的跨进程失效：多个接口 worker、独立的智能体进程各自持有一份缓存，
+    只有执行写入的进程能直接失效自己的缓存。
+    数据库 CacheVersion 表中每个缓存一行版本号，写入方在写事务内调用 bump 递增（随事务一起提交或回滚）；
+    读取方最多每 check_interval 秒查询一次版本，与缓存加载时的版本不同即丢弃缓存重新加载，
+    因此其他进程最多读到 check_interval 秒前的数据
+    """
+
+    def __init__(self, name: str, check_interval: float = 1.0):
+        self.name = name
+        self.check_interval = check_interval
+        self._checked_at = 0.0
+        self.checks = 0
+        self.bumps = 0
+
+    async def current(self, db_session: AsyncSession) -> int:
+        """
+        当前版本号，表或行不存在时视为 0（服务启动时才建表，离线脚本等场景下可能尚未建立）
+        """
+        try:
+            version = await db_session.scalar(
+                select(CacheVersionModel.version).where(CacheVersionModel.name == self.name))
+        except DBAPIError:
+            return 0
+        return version or 0
+
+    async def bump(self, db_session: AsyncSession) -> int:
+        """
+        递增版本号（加行锁，并发写入依次递增），返回本次写入后的版本
+        """
+        increment = (update(CacheVersionModel).where(CacheVersionModel.name == self.name)
+                     .values(version=CacheVersionModel.version + 1))
+        if (await db_session.execute(increment)).rowcount == 0:
+            try:
+                async with db_session.begin_nested():
+                    await db_session.execute(insert(CacheVersionModel).values(name=self.name, version=1))
+            except IntegrityError:
+                # 并发的首次写入已插入该行
+                await db_session.execute(increment)
+        self.bumps += 1
+        return await self.current(db_session)
+
+    async def stale(self, db_session: AsyncSession, known: Optional[int]) -> bool:
+        """
+        缓存加载时的版本 known 是否已过期；距上次检查不足 check_interval 秒时直接返回 False
+        """
+        now = time.monotonic()
+        if known is None or now - self._checked_at < self.check_interval:
+            return False
+        self._checked_at = now
+        self.checks += 1
+        return await self.current(db_session) != known
+
+    def stats(self) -> dict:
+        return {"name": self.name, "check_interval": self.check_interval, "checks": self.checks,
+                "bumps": self.bumps}
+
+
+def shared_version(name: str) -> SharedVersion:
+    return SharedVersion(name, config.get('cache_sync', {}).get('check_interval', 1.0))
@@ -1,44 +1,233 @@
 from Server.fast_api.services import BaseService
-from Server.fast_api.resources import Session, get_db_session
-from Server.fast_api.model import ClimateDataModel,UserModel
-from sqlalchemy import Select
+from sqlalchemy.ext.asyncio import AsyncSession
+from Server.fast_api.resources import get_db_session
+from Server.fast_api.model import ClimateDataModel, ClimateValueModel, UserModel
+from Server.fast_api.common.climate import ClimateMatrix, parse_column, wide_to_long
+from Server.fast_api.common.pagination import PageSpec, Page, paginate_rows
+from Server.fast_api.services.cache_version import shared_version
+from sqlalchemy import Select, and_, delete, insert, or_, select
+from sqlalchemy.exc import DBAPIError
+from typing import List, Optional
+import asyncio
+
+# 单次写入的气候数值上限
+MAX_CLIMATE_VALUES = 100000
+IN_CHUNK_SIZE = 500
+
+
+def to_climate_code(admin_code) -> str:
+    """
+    气候数据以 6 位行政区划代码为键；行政区划表（高校 admin_code）使用带 156 国家前缀的 9 位代码
+    """
+    admin_code = str(admin_code).strip()
+    if len(admin_code) == 9 and admin_code.startswith('156'):
+        return admin_code[3:]
+    return admin_code
+
+
+def _covered_code(matrix: ClimateMatrix, admin_code) -> str:
+    # 直辖市等地区的气候数据只有省级代码（如 110000），市级代码无数据时退回省级
+    code = to_climate_code(admin_code)
+    if code not in matrix and len(code) == 6:
+        province = code[:2] + '0000'
+        if province in matrix:
+            return province
+    return code
+
+
+class ClimateStoreCache:
+    """
+    气候数据的进程内矩阵，首次使用时从长表 ClimateValue 加载；
+    尚未迁移到长表的区划从原宽表 ClimateData 读取，写入后失效；其他进程的写入通过 CacheVersion 版本号发现
+    """
+
+    def __init__(self):
+        self._matrix: Optional[ClimateMatrix] = None
+        self._load_lock = asyncio.Lock()
+        self.version = shared_version("climate")
+        self._loaded_version: Optional[int] = None
+
+    async def get(self, db_session: AsyncSession) -> ClimateMatrix:
+        matrix = self._matrix
+        if matrix is not None and await self.version.stale(db_session, self._loaded_version):
+            self.invalidate()
+            matrix = None
+        if matrix is not None:
+            return matrix
+        async with self._load_lock:
+            if self._matrix is None:
+                # 先读版本再读数据，加载期间的写入会在下次检查时发现
+                version = await self.version.current(db_session)
+                try:
+                    values = (await db_session.execute(select(
+                        ClimateValueModel.admin_code, ClimateValueModel.month,
+                        ClimateValueModel.metric, ClimateValueModel.value))).all()
+                except DBAPIError:
+                    # 长表尚未建立（服务启动时才建表）：只读原宽表
+                    values = []
+                migrated = {value[0] for value in values}
+                legacy = [climate.serialize() for climate in
+                          (await db_session.execute(Select(ClimateDataModel))).scalars().all()
+                          if climate.admin_code not in migrated]
+
+                def build():
+                    rows = list(values)
+                    for record in legacy:
+                        rows.extend(wide_to_long(record, record['admin_code']))
+                    matrix = ClimateMatrix(rows)
+                    # 气候态在线程中预先计算，之后的摘要、相似度查询只做矩阵运算
+                    matrix.climatology()
+                    return matrix
+
+                self._matrix = await asyncio.to_thread(build)
+                self._loaded_version = version
+            return self._matrix
+
+    def invalidate(self):
+        self._matrix = None
+        self._loaded_version = None
+
+
+climate_store = ClimateStoreCache()
+
+
+async def migrate_legacy_regions(codes, db_session: AsyncSession) -> int:
+    """
+    首次向长表写入某个区划前，把它在原宽表中的整行数据复制到长表（与写入同一事务）。
+    读取时长表中已有数据的区划不再回退到宽表，不复制的话该区划其余月份、指标会被当作缺失
+    :return: 复制的数值条数
+    """
+    codes = list(codes)
+    copied = 0
+    for start in range(0, len(codes), IN_CHUNK_SIZE):
+        chunk = codes[start:start + IN_CHUNK_SIZE]
+        # 先锁住宽表行再检查长表（均为加锁读），并发写入同一区划时只复制一次
+        legacy = (await db_session.execute(
+            Select(ClimateDataModel).where(ClimateDataModel.admin_code.in_(chunk)).with_for_update())).scalars().all()
+        if not legacy:
+            continue
+        migrated = set((await db_session.execute(
+            select(ClimateValueModel.admin_code).where(ClimateValueModel.admin_code.in_(
+                [climate.admin_code for climate in legacy])).with_for_update())).scalars().all())
+        rows = [{"admin_code": code, "month": month, "metric": metric, "value": value}
+                for climate in legacy if climate.admin_code not in migrated
+                for code, month, metric, value in wide_to_long(climate.serialize(), climate.admin_code)]
+        if rows:
+            await db_session.execute(insert(ClimateValueModel), rows)
+            copied += len(rows)
+    return copied
 
 
 class ClimateService(BaseService):
-    def get_climate_by_id(self, admin_code: str, db_session: Session):
+    async def get_climate_by_id(self, admin_code: str, db_session: AsyncSession) -> Optional[dict]:
         """
-        根据ID获取特定区域气候信息
+        根据ID获取特定区域气候信息（兼容原宽表格式的字典）
         """
         # 检查admin_code是否为有效值
         if not admin_code:
             return None
-            
-        return db_session.get(ClimateDataModel, admin_code)
 
-    def get_all_climate(self, db_session: Session):
+        matrix = await climate_store.get(db_session)
+        return matrix.wide(to_climate_code(admin_code))
+
+    async def get_all_climate(self, db_session: AsyncSession) -> List[dict]:
+        """
+        获取所有气候数据（兼容原宽表格式）
+        """
+        return (await climate_store.get(db_session)).all_wide()
+
+    async def list_climate(self, page: PageSpec, db_session: AsyncSession) -> Page:
+        """
+        分页、排序、字段投影获取气候数据
+        """
+        return paginate_rows(await self.get_all_climate(db_session), page)
+
+    async def get_climate_catalog(self, db_session: AsyncSession) -> dict:
+        """
+        已有的气候指标、月份与区划数量
+        """
+        matrix = await climate_store.get(db_session)
+        return {"metrics": matrix.metrics, "months": matrix.months, "regions": len(matrix)}
+
+    async def get_climate_series(self, admin_code: str, metrics: Optional[List[str]], start: Optional[int],
+                                 end: Optional[int], db_session: AsyncSession) -> Optional[dict]:
+        """
+        单个区划在 [start, end] 月份范围内指定指标的时间序列
+        """
+        if start is not None and end is not None and start > end:
+            raise ValueError("起始月份不能晚于结束月份")
+        matrix = await climate_store.get(db_session)
+        return matrix.series(to_climate_code(admin_code), metrics, start, end)
+
+    async def get_climate_summary(self, admin_code, other, db_session: AsyncSession) -> Optional[dict]:
+        """
+        两地气候摘要与差值（other 相对 admin_code），任一地区缺少数据时返回 None
+        """
+        matrix = await climate_store.get(db_session)
+        return matrix.compare(_covered_code(matrix, admin_code), _covered_code(matrix, other))
+
+    async def get_similar_climate(self, admin_code: str, k: int, metrics: Optional[List[str]],
+                                  db_session: AsyncSession) -> Optional[List[dict]]:
         """
-        获取所有气候数据
+        与指定区划气候最相似的 k 个区划
         """
-        query = Select(ClimateDataModel)
-        result = db_session.execute(query).scalars().all()
-        return result
+        matrix = await climate_store.get(db_session)
+        return matrix.similar(to_climate_code(admin_code), k, metrics)
 
-    def add_climate(self, climate_data: dict, user_id:int ,db_session: Session):
+    async def add_climate(self, climate_data: dict, user_id:int ,db_session: AsyncSession):
         """
-        添加新气候数据
+        添加新气候数据（宽表格式的输入，按月份、指标拆分写入长表）
         """
         # 获取用户信息以检查权限
-        user = db_session.get(UserModel, user_id)
+        user = await db_session.get(UserModel, user_id)
         if not user:
             raise ValueError("用户不存在")
 
         if user.role == 'admin':
-            new_climate = ClimateDataModel(**climate_data)
-            db_session.add(new_climate)
-            db_session.commit()
-            db_session.refresh(new_climate)
-            return new_climate
+            admin_code = to_climate_code(climate_data['admin_code'])
+            if admin_code in await climate_store.get(db_session):
+                raise ValueError("该区划的气候数据已存在")
+            values = wide_to_long(climate_data, admin_code)
+            if values:
+                await db_session.execute(insert(ClimateValueModel), [
+                    {"admin_code": code, "month": month, "metric": metric, "value": value}
+                    for code, month, metric, value in values])
+            await climate_store.version.bump(db_session)
+            await db_session.commit()
+            climate_store.invalidate()
+            return (await climate_store.get(db_session)).wide(admin_code) or {"admin_code": admin_code}
 
         else:
             # 普通用户无权创建
-            raise ValueError("无权限")
\ No newline at end of file
+            raise ValueError("无权限")
+
+    async def put_climate_values(self, values: List[dict], user_id: int, db_session: AsyncSession) -> dict:
+        """
+        按 (admin_code, month, metric) 写入或覆盖气候数值（仅管理员），新增月份、指标无需修改表结构
+        """
+        user = await db_session.get(UserModel, user_id)
+        if not user or user.role != 'admin':
+            raise ValueError("无权限")
+        if len(values) > MAX_CLIMATE_VALUES:
+            raise ValueError(f"单次最多写入 {MAX_CLIMATE_VALUES} 条")
+
+        rows = {}
+        for value in values:
+            if parse_column(f"{value['month']}_{value['metric']}") is None:
+                raise ValueError(f"无效的月份或指标: {value['month']} {value['metric']}")
+            key = (to_climate_code(value['admin_code']), int(value['month']), value['metric'])
+            # 同一键重复出现时以最后一条为准
+            rows[key] = {"admin_code": key[0], "month": key[1], "metric": key[2], "value": float(value['value'])}
+        keys = list(rows)
+        await migrate_legacy_regions({key[0] for key in keys}, db_session)
+        for start in range(0, len(keys), IN_CHUNK_SIZE):
+            chunk = keys[start:start + IN_CHUNK_SIZE]
+            await db_session.execute(delete(ClimateValueModel).where(or_(*[
+                and_(ClimateValueModel.admin_code == code, ClimateValueModel.month == month,
+                     ClimateValueModel.metric == metric) for code, month, metric in chunk])))
+        if rows:
+            await db_session.execute(insert(ClimateValueModel), list(rows.values()))
+        await climate_store.version.bump(db_session)
+        await db_session.commit()
+        climate_store.invalidate()
+        return {"written": len(rows)}
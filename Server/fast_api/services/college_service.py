@@ -1,36 +1,325 @@
 from Server.fast_api.services import BaseService
-from sqlalchemy import select, desc
+from sqlalchemy import Enum, and_, insert, select, update, desc
 from fastapi import FastAPI, Path, Query, Body, Cookie, Header, Request, Response, HTTPException, status, Depends
-from Server.fast_api.resources import Session, get_db_session
+from sqlalchemy.ext.asyncio import AsyncSession
+from Server.fast_api.resources import AsyncSessionLocal, get_db_session
+from Server.fast_api.common import config
+from Server.fast_api.common.search_index import CollegeSearchIndex
+from Server.fast_api.common.spatial import BBox, PointGridIndex
+from Server.fast_api.common.tiles import ClusterTileIndex
+from Server.fast_api.common.bulk_io import Record
+from Server.fast_api.common.geojson import FeatureRow
+from Server.fast_api.common.geometry import geojson_column, geojson_text
+from Server.fast_api.services.admindivision_service import admin_locator, resolve_admin_code
+from Server.fast_api.services.cache_version import shared_version
+from Server.fast_api.common.pagination import PageSpec, Page, apply_keyset, build_page, paginate_query, paginate_rows
 from Server.fast_api.model import CollegeModel, EvaluationModel, UserModel, CollegeReviewModel, PendingCollegeModel,ModificationHistoryModel
-from typing import List, Optional
+from typing import AsyncIterator, Dict, List, Optional, Sequence
 from geoalchemy2 import WKTElement
 from sqlalchemy import Select
 from datetime import datetime
+import asyncio
+import threading
 import json
 
 
+# 待审核列表可返回/排序的字段
+PENDING_REVIEW_FIELDS = ("review_id", "user_id", "status", "submit_time", "review_comment", "review_type",
+                         "pending_college", "original_college")
+PENDING_REVIEW_SORT_FIELDS = ("review_id", "submit_time")
+# 审核通过时从待审核高校复制到高校表的字段
+REVIEW_COPY_FIELDS = ("shape", "province", "name", "category", "nature", "type", "is_985", "is_211",
+                      "is_double_first", "city", "affiliation", "address", "longitude", "latitude", "admin_code")
+# 批量审核单次上限，以及 IN 查询的分批大小
+MAX_BULK_REVIEW = 10000
+IN_CHUNK_SIZE = 1000
+# 批量导入高校时每批插入的行数与写入的字段
+BULK_INSERT_BATCH = 500
+BULK_COLLEGE_FIELDS = ("college_id", "province", "name", "category", "nature", "type", "is_985", "is_211",
+                       "is_double_first", "city", "affiliation", "address", "longitude", "latitude")
+
+
+def _chunks(items: List, size: int):
+    for start in range(0, len(items), size):
+        yield items[start:start + size]
+
+
+class CollegeCatalogCache:
+    """
+    高校目录的进程内读穿透缓存
+    缓存的是序列化后的高校数据（college_id -> dict），写路径在提交成功后精确修补或失效
+    同时维护一份内存检索索引（供 search_colleges 使用）与经纬度网格索引（供周边、范围查询使用）；
+    地图瓦片聚合在首次请求时由快照构建，任何写入后丢弃重建；
+    其他进程的写入通过 CacheVersion 版本号发现，版本变化时整体重新加载
+    """
+
+    def __init__(self, ngram: int = 2, grid_degrees: float = 0.5, tile_options: Optional[dict] = None):
+        self._lock = threading.RLock()
+        self._load_lock = asyncio.Lock()
+        self._rows: Optional[Dict[int, dict]] = None
+        self._snapshot: Optional[List[dict]] = None
+        self._index = CollegeSearchIndex(ngram)
+        self._geo: PointGridIndex[dict] = PointGridIndex(grid_degrees)
+        self._tile_options = tile_options or {}
+        self._tiles: Optional[ClusterTileIndex] = None
+        # 每次写入递增，用于丢弃与写入并发的过期加载结果
+        self._version = 0
+        # 跨进程的数据库版本号，以及缓存内容对应的版本
+        self.shared_version = shared_version("college")
+        self._loaded_version: Optional[int] = None
+        self.hits = 0
+        self.misses = 0
+        self.patches = 0
+        self.invalidations = 0
+
+    @property
+    def loaded(self) -> bool:
+        return self._rows is not None
+
+    async def get_all(self, db_session: AsyncSession) -> List[dict]:
+        """
+        获取按college_id排序的全部高校数据，未命中时从数据库加载
+        返回的列表在缓存间共享，调用方只读不写
+        """
+        if self._rows is not None and await self.shared_version.stale(db_session, self._loaded_version):
+            self.invalidate()
+        with self._lock:
+            snapshot = self._cached_snapshot()
+            if snapshot is not None:
+                self.hits += 1
+                return snapshot
+
+        # 冷缓存时并发请求只由一个请求加载，其余等待后直接命中
+        async with self._load_lock:
+            with self._lock:
+                snapshot = self._cached_snapshot()
+                if snapshot is not None:
+                    self.hits += 1
+                    return snapshot
+                self.misses += 1
+                version = self._version
+            return await self._load(version, db_session)
+
+    def _cached_snapshot(self) -> Optional[List[dict]]:
+        # 调用方需持有 self._lock
+        if self._rows is None:
+            return None
+        if self._snapshot is None:
+            self._snapshot = [self._rows[key] for key in sorted(self._rows)]
+        return self._snapshot
+
+    async def _load(self, version: int, db_session: AsyncSession) -> List[dict]:
+        # 先读版本再读数据，加载期间其他进程的写入会在下次检查时发现
+        loaded_version = await self.shared_version.current(db_session)
+        colleges = (await db_session.execute(Select(CollegeModel))).scalars().all()
+        rows = {college.college_id: college.serialize() for college in colleges}
+        snapshot = [rows[key] for key in sorted(rows)]
+
+        with self._lock:
+            # 加载期间发生过写入则不安装，下一次读取重新加载
+            if version == self._version:
+                self._rows = rows
+                self._loaded_version = loaded_version
+                self._snapshot = snapshot
+                self._tiles = None
+                self._index.build(snapshot)
+                self._geo.build(self._geo_entries(snapshot))
+        return snapshot
+
+    @staticmethod
+    def _geo_entries(rows: List[dict]):
+        return ((row['college_id'], row.get('longitude'), row.get('latitude'), row) for row in rows)
+
+    async def _query(self, db_session: AsyncSession, query):
+        # query(检索索引, 网格索引) 在持锁状态下执行
+        rows = await self.get_all(db_session)
+        with self._lock:
+            if self._rows is not None:
+                return query(self._index, self._geo)
+        # 加载结果因并发写入未能安装，退化为对本次加载结果建临时索引
+        index = CollegeSearchIndex(self._index.ngram)
+        index.build(rows)
+        geo = PointGridIndex(self._geo.cell_degrees)
+        geo.build(self._geo_entries(rows))
+        return query(index, geo)
+
+    async def search(self, db_session: AsyncSession, name: Optional[str] = None, **filters) -> List[dict]:
+        """
+        在内存索引上做多条件查询
+        """
+        return await self._query(db_session, lambda index, geo: index.search(name=name, **filters))
+
+    async def nearby(self, db_session: AsyncSession, longitude: float, latitude: float,
+                     k: Optional[int] = None, radius_km: Optional[float] = None) -> List[tuple]:
+        """
+        周边高校，返回按距离升序的 (距离公里, 高校数据)
+        只给 radius_km 时返回半径内全部高校，给出 k 时返回（半径内）最近的 k 所
+        """
+        if k is None:
+            return await self._query(db_session, lambda index, geo: geo.within_radius(longitude, latitude, radius_km))
+        return await self._query(db_session, lambda index, geo: geo.nearest(longitude, latitude, k, radius_km))
+
+    async def tile(self, db_session: AsyncSession, zoom: int, x: int, y: int) -> tuple:
+        """
+        地图瓦片的聚合结果，返回 (JSON 字节, ETag)
+        """
+        rows = await self.get_all(db_session)
+        with self._lock:
+            if self._rows is not None:
+                if self._tiles is None:
+                    self._tiles = ClusterTileIndex(self._cached_snapshot(), **self._tile_options)
+                return self._tiles.render(zoom, x, y)
+        return ClusterTileIndex(rows, **self._tile_options).render(zoom, x, y)
+
+    async def within_bbox(self, db_session: AsyncSession, bbox: BBox) -> List[dict]:
+        """
+        经纬度范围内的高校，按 college_id 排序
+        """
+        rows = await self._query(db_session, lambda index, geo: geo.within_bbox(bbox))
+        return sorted(rows, key=lambda row: row['college_id'])
+
+    def _advance(self, version: Optional[int]):
+        # 调用方需持有 self._lock。本进程写入后的版本紧接在缓存版本之后（或就是缓存版本）时，
+        # 说明期间没有其他进程写入，修补后的缓存仍是最新的；否则保持旧版本，下次检查时重新加载
+        if version is not None and self._loaded_version is not None and version - self._loaded_version in (0, 1):
+            self._loaded_version = version
+
+    def put(self, college: CollegeModel, version: Optional[int] = None):
+        """
+        写入或覆盖单个高校（新建、更新后调用）
+        :param version: 本次写入事务中 shared_version.bump 返回的版本
+        """
+        row = college.serialize()
+        with self._lock:
+            self._version += 1
+            if self._rows is not None:
+                self._advance(version)
+                self._rows[row['college_id']] = row
+                self._snapshot = None
+                self._tiles = None
+                self._index.put(row)
+                self._geo.put(row['college_id'], row.get('longitude'), row.get('latitude'), row)
+                self.patches += 1
+
+    def remove(self, college_id: int, version: Optional[int] = None):
+        """
+        移除单个高校（删除后调用）
+        """
+        with self._lock:
+            self._version += 1
+            if self._rows is not None:
+                self._advance(version)
+                self._rows.pop(college_id, None)
+                self._snapshot = None
+                self._tiles = None
+                self._index.remove(college_id)
+                self._geo.remove(college_id)
+                self.patches += 1
+
+    def invalidate(self):
+        """
+        丢弃整个缓存，下一次读取时重新加载
+        """
+        with self._lock:
+            self._version += 1
+            self._rows = None
+            self._loaded_version = None
+            self._snapshot = None
+            self._tiles = None
+            self._index.build([])
+            self._geo.build([])
+            self.invalidations += 1
+
+    def stats(self) -> dict:
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                "loaded": self._rows is not None,
+                "size": len(self._rows) if self._rows is not None else 0,
+                "indexed": len(self._index),
+                "geo_indexed": len(self._geo),
+                "tiles_built": self._tiles is not None,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / total if total else 0.0,
+                "patches": self.patches,
+                "invalidations": self.invalidations,
+                "loaded_version": self._loaded_version,
+                "shared_version": self.shared_version.stats(),
+            }
+
+
+# 进程级单例，CollegeService 每个请求新建实例，缓存需跨请求共享
+college_search_config = config.get('college_search', {})
+college_cache = CollegeCatalogCache(ngram=college_search_config.get('ngram', 2),
+                                    grid_degrees=college_search_config.get('grid_degrees', 0.5),
+                                    tile_options=config.get('college_tiles', {}))
+
+
 class CollegeService(BaseService):
-    def get_college_by_id(self, college_id: int, db_session: Session):
+    async def get_college_by_id(self, college_id: int, db_session: AsyncSession):
         """
         根据ID获取特定高校信息
         """
-        return db_session.get(CollegeModel, college_id)
+        return await db_session.get(CollegeModel, college_id)
 
-    def get_all_colleges(self, db_session: Session):
+    async def get_all_colleges(self, db_session: AsyncSession):
         """
-        获取所有高校数据
+        获取所有高校数据（序列化后的字典，读取走高校目录缓存）
         """
-        query = Select(CollegeModel)
-        result = db_session.execute(query).scalars().all()
-        return result
+        return await college_cache.get_all(db_session)
 
-    def search_colleges(self, name: Optional[str], province: Optional[str], city: Optional[str],
+    async def stream_college_features(self, properties: Sequence[str], batch_size: int = 500) \
+            -> AsyncIterator[FeatureRow]:
+        """
+        以服务端游标逐行读取高校，产生 (GeoJSON 几何文本, 属性)
+        MySQL 下几何由 ST_AsGeoJSON 在数据库中转换；流式输出期间使用独立的会话
+        """
+        async with AsyncSessionLocal() as db_session:
+            geometry = geojson_column(CollegeModel.shape, db_session.bind.dialect.name, 6)
+            query = (select(geometry.label("geometry"), *[getattr(CollegeModel, field) for field in properties])
+                     .order_by(CollegeModel.college_id).execution_options(yield_per=batch_size))
+            result = await db_session.stream(query)
+            async for row in result:
+                yield geojson_text(row[0], 6), dict(zip(properties, row[1:]))
+
+    async def list_colleges(self, page: PageSpec, db_session: AsyncSession) -> Page:
+        """
+        分页、排序、字段投影获取高校数据（在高校目录缓存上完成，不访问数据库）
+        """
+        return paginate_rows(await college_cache.get_all(db_session), page)
+
+    async def search_colleges(self, name: Optional[str], province: Optional[str], city: Optional[str],
                         category: Optional[str], nature: Optional[str], type: Optional[str],
                         is_985: Optional[bool] = None, is_211: Optional[bool] = None,
-                        is_double_first: Optional[bool] = None, db_session: Session = None):
+                        is_double_first: Optional[bool] = None, db_session: AsyncSession = None):
         """
-        多条件组合筛选高校
+        多条件组合筛选高校（返回序列化后的字典）
+        默认走内存检索索引，配置 college_search.use_index 为 false 时回退到 SQL 查询
+        """
+        if not college_search_config.get('use_index', True):
+            return await self._search_colleges_sql(name, province, city, category, nature, type,
+                                             is_985, is_211, is_double_first, db_session)
+
+        return await college_cache.search(
+            db_session,
+            name=name or None,
+            province=province or None,
+            city=city or None,
+            category=category or None,
+            nature=nature or None,
+            type=type or None,
+            is_985=None if is_985 is None else (1 if is_985 else 0),
+            is_211=None if is_211 is None else (1 if is_211 else 0),
+            is_double_first=None if is_double_first is None else (1 if is_double_first else 0),
+        )
+
+    async def _search_colleges_sql(self, name: Optional[str], province: Optional[str], city: Optional[str],
+                             category: Optional[str], nature: Optional[str], type: Optional[str],
+                             is_985: Optional[bool], is_211: Optional[bool],
+                             is_double_first: Optional[bool], db_session: AsyncSession):
+        """
+        多条件组合筛选高校（SQL 路径）
         """
         query = select(CollegeModel)
 
@@ -53,50 +342,83 @@ class CollegeService(BaseService):
         if is_double_first is not None:
             query = query.where(CollegeModel.is_double_first == (1 if is_double_first else 0))
 
-        items = db_session.scalars(query).all()
-        return items
+        items = (await db_session.scalars(query.order_by(CollegeModel.college_id))).all()
+        return [college.serialize() for college in items]
+
+    async def get_nearby_colleges(self, longitude: float, latitude: float, k: Optional[int],
+                                  radius_km: Optional[float], db_session: AsyncSession) -> List[dict]:
+        """
+        周边高校（走高校目录缓存的网格索引），每项附带 distance_km
+        """
+        if not -180 <= longitude <= 180 or not -90 <= latitude <= 90:
+            raise ValueError("经纬度超出范围")
+        if k is None and radius_km is None:
+            raise ValueError("k 与 radius_km 至少指定一个")
+        pairs = await college_cache.nearby(db_session, longitude, latitude, k=k, radius_km=radius_km)
+        return [dict(row, distance_km=round(distance, 3)) for distance, row in pairs]
+
+    async def get_college_tile(self, zoom: int, x: int, y: int, db_session: AsyncSession) -> tuple:
+        """
+        地图瓦片（z/x/y）内的高校聚合，返回 (JSON 字节, ETag)
+        """
+        return await college_cache.tile(db_session, zoom, x, y)
+
+    async def get_colleges_in_bbox(self, bbox: BBox, db_session: AsyncSession) -> List[dict]:
+        """
+        经纬度范围内的高校（走高校目录缓存的网格索引）
+        """
+        min_lon, min_lat, max_lon, max_lat = bbox
+        if min_lon > max_lon or min_lat > max_lat:
+            raise ValueError("bbox 的最小值不能大于最大值")
+        return await college_cache.within_bbox(db_session, bbox)
 
-    def get_college_with_evaluation(self, college_id: int, db_session: Session):
+    async def get_cache_stats(self):
+        """
+        获取高校目录缓存命中统计
+        """
+        return college_cache.stats()
+
+    async def get_college_with_evaluation(self, college_id: int, db_session: AsyncSession):
         """
         获取特定高校详细信息及评价信息
         """
-        college = db_session.get(CollegeModel, college_id)
+        college = await db_session.get(CollegeModel, college_id)
         if not college:
             return None
 
         # 获取该高校的所有评价
         evaluations_query = select(EvaluationModel).where(EvaluationModel.college_id == college_id)
-        evaluations = db_session.scalars(evaluations_query).all()
+        evaluations = (await db_session.scalars(evaluations_query)).all()
 
         return {
             "college": college,
             "evaluations": evaluations
         }
 
-    def add_college(self, college_data: dict, user_id: int, db_session: Session):
+    async def add_college(self, college_data: dict, user_id: int, db_session: AsyncSession):
         """
         添加新高校
         """
         # 获取用户信息以检查权限
-        user = db_session.get(UserModel, user_id)
+        user = await db_session.get(UserModel, user_id)
         if not user:
             raise ValueError("用户不存在")
 
         # 检查高校名称是否已存在
         query = select(CollegeModel).where(CollegeModel.name == college_data['name'])
-        existing_college = db_session.execute(query).scalars().first()
+        existing_college = (await db_session.execute(query)).scalars().first()
         if existing_college:
             raise ValueError("高校名称已存在")
 
         # 管理员可以直接添加高校，普通用户需要审核
         if user.role == 'admin':
             # 管理员直接创建高校
-            return self._create_college_directly(college_data, db_session)
+            return await self._create_college_directly(college_data, db_session)
         else:
             # 普通用户提交高校信息等待审核
-            return self._submit_college_for_review(college_data, user_id, db_session)
+            return await self._submit_college_for_review(college_data, user_id, db_session)
 
-    def _create_college_directly(self, college_data: dict, db_session: Session):
+    async def _create_college_directly(self, college_data: dict, db_session: AsyncSession):
         """
         管理员直接创建高校
         """
@@ -123,28 +445,135 @@ class CollegeService(BaseService):
             address=college_data.get('address'),
             longitude=college_data['longitude'],
             latitude=college_data['latitude'],
-            admin_code=college_data.get('admin_code')
+            admin_code=await resolve_admin_code(college_data, db_session)
         )
 
         # 保存到数据库
         db_session.add(new_college)
-        db_session.commit()
-        db_session.refresh(new_college)
+        version = await college_cache.shared_version.bump(db_session)
+        await db_session.commit()
+        await db_session.refresh(new_college)
+        college_cache.put(new_college, version)
         return new_college
 
-    def _submit_college_for_review(self, college_data: dict, user_id: int, db_session: Session):
+    async def bulk_add_colleges(self, records: AsyncIterator[Record], atomic: bool, user_id: int,
+                                db_session: AsyncSession):
+        """
+        批量导入高校（仅管理员）
+        记录边读边校验：名称与ID对照一次预取的集合去重，合法记录攒满一批后以 executemany 插入
+        :param records: (行号, 已通过字段校验的高校数据, 错误信息) 的异步迭代器
+        :param atomic: True 时任一行失败则全部回滚；False 时跳过失败行并逐行报告
+        """
+        user = await db_session.get(UserModel, user_id)
+        if not user or user.role != 'admin':
+            raise ValueError("非管理员权限！")
+
+        known = (await db_session.execute(select(CollegeModel.college_id, CollegeModel.name))).all()
+        existing_ids = {college_id for college_id, _ in known}
+        existing_names = {name for _, name in known}
+        # 枚举列预先校验，避免整批插入因个别取值失败
+        enums = {column.name: set(column.type.enums) for column in CollegeModel.__table__.columns
+                 if isinstance(column.type, Enum)}
+
+        locator = await admin_locator.get(db_session)
+        errors = []
+        inserted_ids = []
+        batch = []
+        total = 0
+
+        async def flush():
+            if not batch:
+                return
+            try:
+                async with db_session.begin_nested():
+                    await db_session.execute(insert(CollegeModel), [row for _, row in batch])
+                inserted_ids.extend(row['college_id'] for _, row in batch)
+            except Exception as e:
+                if atomic:
+                    errors.append({"line": batch[0][0], "detail": f"批量写入失败: {e}"})
+                else:
+                    # 整批失败时逐行重试，定位具体出错的行
+                    for line_no, row in batch:
+                        try:
+                            async with db_session.begin_nested():
+                                await db_session.execute(insert(CollegeModel), [row])
+                            inserted_ids.append(row['college_id'])
+                        except Exception as row_error:
+                            errors.append({"line": line_no, "name": row['name'], "detail": str(row_error)})
+            batch.clear()
+
+        async for line_no, college_data, error in records:
+            total += 1
+            if error is None:
+                error = self._check_bulk_college(college_data, existing_ids, existing_names, enums)
+            if error is not None:
+                errors.append({"line": line_no, "name": (college_data or {}).get('name'), "detail": error})
+                continue
+            existing_ids.add(college_data['college_id'])
+            existing_names.add(college_data['name'])
+            # 全有或全无模式下出现错误后只继续校验，不再写入
+            if atomic and errors:
+                continue
+            batch.append((line_no, {
+                **{field: college_data.get(field) for field in BULK_COLLEGE_FIELDS},
+                'shape': WKTElement(college_data['shape']),
+                'admin_code': locator.locate_college(college_data) or college_data.get('admin_code') or None,
+            }))
+            if len(batch) >= BULK_INSERT_BATCH:
+                await flush()
+        if not (atomic and errors):
+            await flush()
+
+        version = None
+        if atomic and errors:
+            await db_session.rollback()
+            inserted_ids = []
+        else:
+            if inserted_ids:
+                version = await college_cache.shared_version.bump(db_session)
+            await db_session.commit()
+
+        # 少量新增直接修补缓存，大批量导入则整体失效，下次读取时重新加载
+        if len(inserted_ids) > IN_CHUNK_SIZE:
+            college_cache.invalidate()
+        elif inserted_ids:
+            for college in (await db_session.scalars(
+                    select(CollegeModel).where(CollegeModel.college_id.in_(inserted_ids)))).all():
+                college_cache.put(college, version)
+
+        return {
+            "message": "批量导入完成" if not (atomic and errors) else "存在错误，已全部回滚",
+            "atomic": atomic,
+            "total": total,
+            "inserted": len(inserted_ids),
+            "failed": len(errors),
+            "errors": errors
+        }
+
+    @staticmethod
+    def _check_bulk_college(college_data: dict, existing_ids: set, existing_names: set, enums: Dict[str, set]) -> Optional[str]:
+        if college_data['college_id'] in existing_ids:
+            return f"高校ID {college_data['college_id']} 已存在"
+        if college_data['name'] in existing_names:
+            return "高校名称已存在"
+        for field, allowed in enums.items():
+            if college_data.get(field) is not None and college_data[field] not in allowed:
+                return f"{field} 取值无效: {college_data.get(field)}"
+        return None
+
+    async def _submit_college_for_review(self, college_data: dict, user_id: int, db_session: AsyncSession):
         """
         普通用户提交高校信息等待审核
         """
         # 检查高校名称是否已存在
         query = select(CollegeModel).where(CollegeModel.name == college_data['name'])
-        existing_college = db_session.execute(query).scalars().first()
+        existing_college = (await db_session.execute(query)).scalars().first()
         if existing_college:
             raise ValueError("高校名称已存在")
 
         # 检查用户角色
         from Server.fast_api.services import UserService
-        user = UserService().get_user_by_id(user_id, db_session)
+        user = await UserService().get_user_by_id(user_id, db_session)
 
         if not user:
             raise ValueError("用户不存在")
@@ -160,7 +589,7 @@ class CollegeService(BaseService):
 
         # 保存审核记录
         db_session.add(review_record)
-        db_session.flush()  # 获取review_id
+        await db_session.flush()  # 获取review_id
 
         try:
             # 如果提供了shape则使用新值，否则使用原始值
@@ -193,8 +622,8 @@ class CollegeService(BaseService):
 
         # 保存到待审核表
         db_session.add(pending_college)
-        db_session.commit()
-        db_session.refresh(review_record)
+        await db_session.commit()
+        await db_session.refresh(review_record)
 
         # 返回审核信息
         return {
@@ -202,12 +631,12 @@ class CollegeService(BaseService):
             "review_id": review_record.review_id
         }
 
-    def add_evaluation(self, evaluation_data: dict, user_id: int, db_session: Session):
+    async def add_evaluation(self, evaluation_data: dict, user_id: int, db_session: AsyncSession):
         """
         添加评价
         """
         # 检查高校是否存在
-        college = db_session.get(CollegeModel, evaluation_data['college_id'])
+        college = await db_session.get(CollegeModel, evaluation_data['college_id'])
         if not college:
             raise ValueError("高校不存在")
 
@@ -222,29 +651,36 @@ class CollegeService(BaseService):
 
         # 保存到数据库
         db_session.add(new_evaluation)
-        db_session.commit()
-        db_session.refresh(new_evaluation)
+        await db_session.commit()
+        await db_session.refresh(new_evaluation)
         return new_evaluation
 
-    def get_all_evaluations(self,user_id:int, db_session: Session):
+    async def get_all_evaluations(self,user_id:int, db_session: AsyncSession):
         """
         获取用户发布的所有评价信息
         """
-        return db_session.query(EvaluationModel).filter(EvaluationModel.user_id == user_id).all()
+        query = select(EvaluationModel).where(EvaluationModel.user_id == user_id)
+        return (await db_session.scalars(query)).all()
+
+    async def list_evaluations(self, user_id: int, page: PageSpec, db_session: AsyncSession) -> Page:
+        """
+        分页、排序、字段投影获取用户发布的评价信息
+        """
+        return await paginate_query(db_session, EvaluationModel, page, where=[EvaluationModel.user_id == user_id])
 
 
-    def update_evaluation(self, evaluation_id: int, college_data: dict, user_id: int, db_session: Session):
+    async def update_evaluation(self, evaluation_id: int, college_data: dict, user_id: int, db_session: AsyncSession):
         """
         更新评价信息
         """
         # 获取现有评价信息
-        evaluation = db_session.get(EvaluationModel, evaluation_id)
+        evaluation = await db_session.get(EvaluationModel, evaluation_id)
 
         if not evaluation:
             raise ValueError("评价不存在")
         
         # 检查权限：只有评价发布者或管理员可以修改评价
-        user = db_session.get(UserModel, user_id)
+        user = await db_session.get(UserModel, user_id)
         if not user:
             raise ValueError("用户不存在")
             
@@ -259,7 +695,7 @@ class CollegeService(BaseService):
             if hasattr(evaluation, key) and value is not None:
                 setattr(evaluation, key, value)
 
-        db_session.commit()
+        await db_session.commit()
 
         # 记录修改历史
         new_data = json.dumps(evaluation.serialize(), ensure_ascii=False)
@@ -272,22 +708,22 @@ class CollegeService(BaseService):
             modification_type='update'
         )
         db_session.add(history)
-        db_session.commit()
+        await db_session.commit()
 
         return evaluation
 
-    def delete_evaluation(self, evaluation_id: int, user_id: int, db_session: Session):
+    async def delete_evaluation(self, evaluation_id: int, user_id: int, db_session: AsyncSession):
         """
         删除评价信息
         """
         # 获取现有评价信息
-        evaluation = db_session.get(EvaluationModel, evaluation_id)
+        evaluation = await db_session.get(EvaluationModel, evaluation_id)
 
         if not evaluation:
             raise ValueError("评价不存在")
         
         # 检查权限：只有评价发布者或管理员可以删除评价
-        user = db_session.get(UserModel, user_id)
+        user = await db_session.get(UserModel, user_id)
         if not user:
             raise ValueError("用户不存在")
             
@@ -298,8 +734,8 @@ class CollegeService(BaseService):
         old_data = json.dumps(evaluation.serialize(), ensure_ascii=False)
         
         # 删除评价
-        db_session.delete(evaluation)
-        db_session.commit()
+        await db_session.delete(evaluation)
+        await db_session.commit()
 
         # 记录删除历史
         history = ModificationHistoryModel(
@@ -311,23 +747,23 @@ class CollegeService(BaseService):
             modification_type='delete'
         )
         db_session.add(history)
-        db_session.commit()
+        await db_session.commit()
 
         return {"message": "评价删除成功"}
 
-    def delete_college(self, college_id: int, user_id: int, db_session: Session):
+    async def delete_college(self, college_id: int, user_id: int, db_session: AsyncSession):
         """
         删除高校信息（仅管理员）
         """
         # 检查用户角色
         from Server.fast_api.services import UserService
-        user = UserService().get_user_by_id(user_id, db_session)
+        user = await UserService().get_user_by_id(user_id, db_session)
 
         if not user or user.role != 'admin':
             raise ValueError("非管理员权限！")
 
         # 获取高校信息
-        college = db_session.get(CollegeModel, college_id)
+        college = await db_session.get(CollegeModel, college_id)
 
         if not college:
             raise ValueError(f"高校ID {college_id} 不存在")
@@ -337,7 +773,7 @@ class CollegeService(BaseService):
         
         # 删除相关评价
         evaluations_query = select(EvaluationModel).where(EvaluationModel.college_id == college_id)
-        evaluations = db_session.scalars(evaluations_query).all()
+        evaluations = (await db_session.scalars(evaluations_query)).all()
         
         # 记录评价的删除历史
         for evaluation in evaluations:
@@ -355,12 +791,12 @@ class CollegeService(BaseService):
         
         # 先删除所有相关的评价
         for evaluation in evaluations:
-            db_session.delete(evaluation)
+            await db_session.delete(evaluation)
         
-        db_session.flush()  # 确保评价已删除
+        await db_session.flush()  # 确保评价已删除
         
         # 删除高校
-        db_session.delete(college)
+        await db_session.delete(college)
         
         # 记录高校删除历史
         history = ModificationHistoryModel(
@@ -372,17 +808,19 @@ class CollegeService(BaseService):
             modification_type='delete'
         )
         db_session.add(history)
-        db_session.commit()
+        version = await college_cache.shared_version.bump(db_session)
+        await db_session.commit()
+        college_cache.remove(college_id, version)
 
         return {"message": "高校删除成功"}
 
-    def review_pending_college(self, review_id: int, status: str, comment: Optional[str], user_id: int, db_session: Session):
+    async def review_pending_college(self, review_id: int, status: str, comment: Optional[str], user_id: int, db_session: AsyncSession):
         """
         审核待处理的高校信息（仅管理员）
         """
         # 检查用户角色
         from Server.fast_api.services import UserService
-        user = UserService().get_user_by_id(user_id, db_session)
+        user = await UserService().get_user_by_id(user_id, db_session)
 
         if not user or user.role != 'admin':
             raise ValueError("非管理员权限！")
@@ -390,10 +828,12 @@ class CollegeService(BaseService):
         if status not in ['approved', 'rejected']:
             raise ValueError("审核状态必须为 'approved' 或 'rejected'")
 
-        # 获取审核记录
-        review = db_session.get(CollegeReviewModel, review_id)
+        # 获取审核记录（加锁，与并发的单条、批量审核串行执行）
+        review = await db_session.get(CollegeReviewModel, review_id, with_for_update=True)
         if not review:
             raise ValueError("审核记录不存在")
+        if review.status != 'pending':
+            raise ValueError(f"该记录已审核（{review.status}）")
 
         # 更新审核状态
         review.status = status
@@ -401,10 +841,13 @@ class CollegeService(BaseService):
         review.reviewer_id = user_id
         review.review_comment = comment
 
+        # 审核通过后新增或更新的高校，提交成功后同步到缓存
+        changed_colleges = []
+
         # 处理审核结果
         if status == 'approved':
             # 获取待审核的高校信息
-            pending_college = db_session.get(PendingCollegeModel, review_id)
+            pending_college = await db_session.get(PendingCollegeModel, review_id)
             if pending_college:
                 # 根据审核类型处理
                 if review.review_type == 'new':
@@ -425,24 +868,25 @@ class CollegeService(BaseService):
                         address=pending_college.address,
                         longitude=pending_college.longitude,
                         latitude=pending_college.latitude,
-                        admin_code=pending_college.admin_code if pending_college.admin_code else None  # 处理空字符串
+                        admin_code=await resolve_admin_code(pending_college.serialize(), db_session)
                     )
                     
                     db_session.add(college)
-                    db_session.flush()  # 获取college_id
+                    await db_session.flush()  # 获取college_id
                     
                     # 更新审核记录中的college_id
                     review.college_id = college.college_id
+                    changed_colleges.append(college)
                     
                 elif review.review_type == 'update' and review.college_id is not None:
                     # 更新高校信息
-                    college = db_session.get(CollegeModel, review.college_id)
+                    college = await db_session.get(CollegeModel, review.college_id)
                     if college:
                         # 记录修改前的数据
                         old_data = json.dumps(college.serialize(), ensure_ascii=False)
                         
                         # 获取待审核的高校信息
-                        pending_college = db_session.get(PendingCollegeModel, review.review_id)
+                        pending_college = await db_session.get(PendingCollegeModel, review.review_id)
                         if pending_college:
                             college.shape = pending_college.shape
                             college.province = pending_college.province
@@ -458,9 +902,9 @@ class CollegeService(BaseService):
                             college.address = pending_college.address
                             college.longitude = pending_college.longitude
                             college.latitude = pending_college.latitude
-                            college.admin_code = pending_college.admin_code if pending_college.admin_code else None  # 处理空字符串
+                            college.admin_code = await resolve_admin_code(pending_college.serialize(), db_session)
                         
-                        db_session.flush()
+                        await db_session.flush()
                         
                         # 记录修改历史
                         new_data = json.dumps(college.serialize(), ensure_ascii=False)
@@ -473,9 +917,13 @@ class CollegeService(BaseService):
                             modification_type='update'
                         )
                         db_session.add(history)
+                        changed_colleges.append(college)
 
-        db_session.commit()
-        db_session.refresh(review)
+        version = await college_cache.shared_version.bump(db_session) if changed_colleges else None
+        await db_session.commit()
+        await db_session.refresh(review)
+        for college in changed_colleges:
+            college_cache.put(college, version)
 
         return {
             "message": f"高校审核{ '通过' if status == 'approved' else '拒绝' }",
@@ -483,19 +931,162 @@ class CollegeService(BaseService):
             "status": status
         }
 
-    def update_college(self, college_id: int, college_data: dict, user_id: int, db_session: Session):
+    @staticmethod
+    def _review_detail_query() -> Select:
+        """
+        审核记录 ⟕ 待审核高校 ⟕ 原高校（仅更新类审核），一次取回审核所需的全部数据
+        """
+        return (
+            select(CollegeReviewModel, PendingCollegeModel, CollegeModel)
+            .outerjoin(PendingCollegeModel, PendingCollegeModel.review_id == CollegeReviewModel.review_id)
+            .outerjoin(CollegeModel, and_(CollegeReviewModel.review_type == 'update',
+                                          CollegeModel.college_id == CollegeReviewModel.college_id))
+        )
+
+    async def bulk_review_pending_colleges(self, review_ids: List[int], status: str, comment: Optional[str],
+                                           user_id: int, db_session: AsyncSession):
+        """
+        批量审核待处理的高校信息（仅管理员）
+        审核记录按 IN 分批读取，新建高校、更新高校、审核状态与修改历史各用一条批量语句写入，
+        全部在同一事务中提交；逐条返回处理结果
+        """
+        # 检查用户角色
+        from Server.fast_api.services import UserService
+        user = await UserService().get_user_by_id(user_id, db_session)
+
+        if not user or user.role != 'admin':
+            raise ValueError("非管理员权限！")
+
+        if status not in ['approved', 'rejected']:
+            raise ValueError("审核状态必须为 'approved' 或 'rejected'")
+
+        review_ids = list(dict.fromkeys(review_ids))
+        if not review_ids:
+            raise ValueError("review_ids 不能为空")
+        if len(review_ids) > MAX_BULK_REVIEW:
+            raise ValueError(f"单次最多审核 {MAX_BULK_REVIEW} 条")
+
+        # 加锁读取（连同待审核高校与原高校行）：并发审核同一记录时后者等待前者提交，
+        # 再读到已变更的状态而跳过，不会重复新建高校或重复合并更新
+        found = {}
+        for chunk in _chunks(sorted(review_ids), IN_CHUNK_SIZE):
+            rows = await db_session.execute(self._review_detail_query()
+                                            .where(CollegeReviewModel.review_id.in_(chunk)).with_for_update())
+            for review, pending_college, college in rows:
+                found[review.review_id] = (review, pending_college, college)
+
+        # 新建类审核需要确认高校ID未被占用
+        new_college_ids = [pending_college.college_id for review, pending_college, _ in found.values()
+                           if status == 'approved' and review.status == 'pending'
+                           and review.review_type == 'new' and pending_college is not None]
+        existing_ids = set()
+        for chunk in _chunks(list(set(new_college_ids)), IN_CHUNK_SIZE):
+            existing_ids.update((await db_session.scalars(
+                select(CollegeModel.college_id).where(CollegeModel.college_id.in_(chunk)))).all())
+
+        locator = await admin_locator.get(db_session)
+        review_time = datetime.now()
+        results = []
+        review_rows = []
+        insert_rows = []
+        update_rows = []
+        history_rows = []
+        college_states = {}
+        for review_id in review_ids:
+            if review_id not in found:
+                results.append({"review_id": review_id, "outcome": "failed", "detail": "审核记录不存在"})
+                continue
+            review, pending_college, college = found[review_id]
+            if review.status != 'pending':
+                results.append({"review_id": review_id, "outcome": "skipped", "detail": f"该记录已审核（{review.status}）"})
+                continue
+
+            college_id = review.college_id
+            if status == 'approved' and pending_college is not None:
+                values = {field: getattr(pending_college, field) for field in REVIEW_COPY_FIELDS}
+                values['admin_code'] = locator.locate_college(values) or values['admin_code'] or None
+                if review.review_type == 'new':
+                    college_id = pending_college.college_id
+                    if college_id in existing_ids:
+                        results.append({"review_id": review_id, "outcome": "failed", "detail": f"高校ID {college_id} 已存在"})
+                        continue
+                    existing_ids.add(college_id)
+                    insert_rows.append({"college_id": college_id, **values})
+                elif review.review_type == 'update' and college_id is not None:
+                    if college is None:
+                        results.append({"review_id": review_id, "outcome": "failed", "detail": "高校不存在"})
+                        continue
+                    # 同一高校的多条更新审核按 review_ids 顺序依次合并
+                    old_data = college_states.get(college_id) or college.serialize()
+                    new_data = {**old_data, **values, 'shape': str(values['shape']) if values['shape'] is not None else None}
+                    college_states[college_id] = new_data
+                    update_rows.append({"college_id": college_id, **values})
+                    history_rows.append({
+                        "entity_type": 'college',
+                        "entity_id": college_id,
+                        "old_data": json.dumps(old_data, ensure_ascii=False),
+                        "new_data": json.dumps(new_data, ensure_ascii=False),
+                        "user_id": user_id,
+                        "modification_type": 'update',
+                    })
+
+            review_rows.append({
+                "review_id": review_id,
+                "college_id": college_id,
+                "status": status,
+                "review_time": review_time,
+                "reviewer_id": user_id,
+                "review_comment": comment,
+            })
+            results.append({"review_id": review_id, "outcome": status, "college_id": college_id})
+
+        # 已加载到会话中的对象不参与 flush，全部改由下面的批量语句写入
+        db_session.expunge_all()
+        try:
+            if insert_rows:
+                await db_session.execute(insert(CollegeModel), insert_rows)
+            if update_rows:
+                await db_session.execute(update(CollegeModel), update_rows)
+            if review_rows:
+                await db_session.execute(update(CollegeReviewModel), review_rows)
+            if history_rows:
+                await db_session.execute(insert(ModificationHistoryModel), history_rows)
+            version = await college_cache.shared_version.bump(db_session) if insert_rows or update_rows else None
+            await db_session.commit()
+        except Exception:
+            await db_session.rollback()
+            raise
+
+        # 提交成功后按最终数据修补缓存
+        changed_ids = list({row["college_id"] for row in insert_rows + update_rows})
+        for chunk in _chunks(changed_ids, IN_CHUNK_SIZE):
+            for college in (await db_session.scalars(
+                    select(CollegeModel).where(CollegeModel.college_id.in_(chunk)))).all():
+                college_cache.put(college, version)
+
+        summary = {"approved": 0, "rejected": 0, "skipped": 0, "failed": 0}
+        for item in results:
+            summary[item["outcome"]] += 1
+        return {
+            "message": f"批量审核完成，共 {len(review_ids)} 条",
+            "status": status,
+            "summary": summary,
+            "results": results
+        }
+
+    async def update_college(self, college_id: int, college_data: dict, user_id: int, db_session: AsyncSession):
         """
         更新高校信息（管理员直接更新，普通用户提交审核）
         """
         # 检查用户角色
         from Server.fast_api.services import UserService
-        user = UserService().get_user_by_id(user_id, db_session)
+        user = await UserService().get_user_by_id(user_id, db_session)
 
         if not user:
             raise ValueError("用户不存在")
 
         # 获取现有高校信息
-        college = db_session.get(CollegeModel, college_id)
+        college = await db_session.get(CollegeModel, college_id)
 
         if not college:
             raise ValueError("高校不存在")
@@ -518,7 +1109,21 @@ class CollegeService(BaseService):
                 except Exception as e:
                     raise ValueError(f"几何数据格式错误: {str(e)}")
 
-            db_session.commit()
+            # 位置变化或缺少行政区划时重新做空间归属
+            if any(college_data.get(key) is not None for key in ('shape', 'longitude', 'latitude')) \
+                    or not college.admin_code:
+                college.admin_code = await resolve_admin_code({
+                    'longitude': college.longitude,
+                    'latitude': college.latitude,
+                    'shape': college_data.get('shape'),
+                    'admin_code': college.admin_code,
+                }, db_session)
+
+            version = await college_cache.shared_version.bump(db_session)
+            await db_session.commit()
+            # 重新读取，使几何字段与缓存中其他数据一样为数据库返回的格式
+            await db_session.refresh(college)
+            college_cache.put(college, version)
 
             # 记录修改历史
             new_data = json.dumps(college.serialize(), ensure_ascii=False)
@@ -531,19 +1136,19 @@ class CollegeService(BaseService):
                 modification_type='update'
             )
             db_session.add(history)
-            db_session.commit()
+            await db_session.commit()
 
             return college
         else:
             # 普通用户需要提交审核，采用与新建高校类似的逻辑
-            return self._submit_college_update_for_review(college_id, college_data, user_id, db_session)
+            return await self._submit_college_update_for_review(college_id, college_data, user_id, db_session)
 
-    def _submit_college_update_for_review(self, college_id: int, college_data: dict, user_id: int, db_session: Session):
+    async def _submit_college_update_for_review(self, college_id: int, college_data: dict, user_id: int, db_session: AsyncSession):
         """
         普通用户提交高校信息更新等待审核（与新建高校类似的逻辑）
         """
         # 获取现有高校信息
-        college = db_session.get(CollegeModel, college_id)
+        college = await db_session.get(CollegeModel, college_id)
         if not college:
             raise ValueError("高校不存在")
 
@@ -559,7 +1164,7 @@ class CollegeService(BaseService):
 
         # 保存审核记录
         db_session.add(review_record)
-        db_session.flush()  # 获取review_id
+        await db_session.flush()  # 获取review_id
 
         # 创建待审核的高校更新信息
         # 使用与PendingCollegeModel相同的字段结构，但存储的是更新信息
@@ -597,8 +1202,8 @@ class CollegeService(BaseService):
 
         # 保存到待审核表
         db_session.add(pending_college_data)
-        db_session.commit()
-        db_session.refresh(review_record)
+        await db_session.commit()
+        await db_session.refresh(review_record)
 
         # 返回审核信息
         return {
@@ -606,23 +1211,39 @@ class CollegeService(BaseService):
             "review_id": review_record.review_id
         }
 
-    def get_pending_reviews(self, user_id: int, db_session: Session):
+    async def get_pending_reviews(self, user_id: int, db_session: AsyncSession, page: Optional[PageSpec] = None,
+                                  review_type: Optional[str] = None, submitted_after: Optional[datetime] = None,
+                                  submitted_before: Optional[datetime] = None) -> Page:
         """
-        获取所有待审核信息（仅管理员）
+        获取待审核信息（仅管理员）
+        审核记录、待审核高校与（更新类审核的）原高校通过一次外连接查询取回，往返次数与记录数无关
+        :param page: 已 bind 的分页参数，为空时按 review_id 返回全部
+        :param review_type: 审核类型过滤，new 或 update
+        :param submitted_after: 提交时间下限（含）
+        :param submitted_before: 提交时间上限（不含）
         """
         # 检查用户角色
         from Server.fast_api.services import UserService
-        user = UserService().get_user_by_id(user_id, db_session)
+        user = await UserService().get_user_by_id(user_id, db_session)
 
         if not user or user.role != 'admin':
             raise ValueError("非管理员权限！")
 
-        # 查询所有待审核记录
-        query = select(CollegeReviewModel).where(CollegeReviewModel.status == 'pending')
-        pending_reviews = db_session.scalars(query).all()
+        if page is None:
+            page = PageSpec().bind(PENDING_REVIEW_FIELDS, key_field="review_id",
+                                   sortable_fields=PENDING_REVIEW_SORT_FIELDS)
+
+        query = self._review_detail_query().where(CollegeReviewModel.status == 'pending')
+        if review_type is not None:
+            query = query.where(CollegeReviewModel.review_type == review_type)
+        if submitted_after is not None:
+            query = query.where(CollegeReviewModel.submit_time >= submitted_after)
+        if submitted_before is not None:
+            query = query.where(CollegeReviewModel.submit_time < submitted_before)
+        query = apply_keyset(query, getattr(CollegeReviewModel, page.sort_field), CollegeReviewModel.review_id, page)
 
         result = []
-        for review in pending_reviews:
+        for review, pending_college, college in await db_session.execute(query):
             review_info = {
                 "review_id": review.review_id,
                 "user_id": review.user_id,
@@ -631,34 +1252,27 @@ class CollegeService(BaseService):
                 "review_comment": review.review_comment,
                 "review_type": review.review_type
             }
-
-            # 获取待审核的高校信息
-            pending_college = db_session.get(PendingCollegeModel, review.review_id)
-            if pending_college:
+            if pending_college is not None:
                 review_info["pending_college"] = pending_college.serialize()
-                
-            # 如果是更新高校，也获取原始高校信息
-            if review.college_id is not None and review.review_type == 'update':
-                college = db_session.get(CollegeModel, review.college_id)
-                if college:
-                    review_info["original_college"] = college.serialize()
-                        
+            # 更新类审核附带原始高校信息
+            if college is not None:
+                review_info["original_college"] = college.serialize()
             result.append(review_info)
 
-        return result
+        return build_page(page, result)
 
-    def get_pendingdetail_reviews(self,user_id:int,review_id:int,db_session:Session):
+    async def get_pendingdetail_reviews(self,user_id:int,review_id:int,db_session: AsyncSession):
         """
         获取待审核表单详细信息
         """
         # 检查用户角色
         from Server.fast_api.services import UserService
-        user = UserService().get_user_by_id(user_id, db_session)
+        user = await UserService().get_user_by_id(user_id, db_session)
 
         if not user or user.role != 'admin':
             raise ValueError("非管理员权限！")
 
-        return db_session.get(PendingCollegeModel, review_id)
+        return await db_session.get(PendingCollegeModel, review_id)
 
 
 
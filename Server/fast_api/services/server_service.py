@@ -1,28 +1,41 @@
+import asyncio
 import json
+from typing import Optional
 
 import requests
-from autogen_core import try_get_known_serializers_for_type
 from autogen_core.models import (UserMessage)
-from autogen_ext.runtimes.grpc import GrpcWorkerAgentRuntime
 from fastapi import HTTPException
 
 from Server.agents.messages import (
-    UserRequest,
-    user_topic_id)
-from Server.fast_api.common import SERVER_URL
+    UserRequest)
+from Server.fast_api.common import SERVER_URL, result_channels
 from Server.fast_api.services import BaseService
-from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 from Server.fast_api.model import CollegeModel,AdminDivisionModel
+from Server.fast_api.common.pool_metrics import get_pool_stats
+from Server.fast_api.common.response_cache import llm_cache
+from Server.fast_api.common.amap import amap_client
+from Server.fast_api.common.runtime_client import runtime_client
+from Server.fast_api.services.college_service import college_cache
+
+
+# 未指定会话的匿名请求共用的会话：请求之间互不相关，不保留历史，也不会为每个请求新建智能体实例
+ANONYMOUS_SESSION = "anon"
 
 
 class ServerService(BaseService):
-    def __init__(self):
-        self.runtime = GrpcWorkerAgentRuntime(host_address="localhost:50051")
+    @staticmethod
+    def session_id(user_id: Optional[int], session: Optional[str] = None) -> str:
+        """
+        会话 ID：登录用户以用户ID为命名空间，匿名会话单独命名空间，未指定会话的匿名请求为 ANONYMOUS_SESSION
+        """
+        if user_id is not None:
+            return f"user-{user_id}:{session}" if session else f"user-{user_id}"
+        return f"anon-{session}" if session else ANONYMOUS_SESSION
 
-    async def publish_message(self,content: str):
+    async def publish_message(self,content: str,session_id: str = "default",correlation_id: Optional[str] = None):
+        # 复用进程内共享的运行时长连接，不再每个请求建立、关闭一次 gRPC 连接
         try:
-            self.runtime.add_message_serializer(try_get_known_serializers_for_type(UserRequest))
-            await self.runtime.start()
             if content.startswith("@"):
                 parts = content.split(maxsplit=1)
                 if len(parts) > 1:
@@ -30,40 +43,42 @@ class ServerService(BaseService):
                     message_content = parts[1]
                     if agent_name in ['GeoAnalyst', 'UAVController']:
                         topic_id = gis_topic_id if agent_name == 'GeoAnalyst' else uav_topic_id
-                        await self.runtime.publish_message(
-                            message=UserRequest(context=[UserMessage(content=message_content, source="User")]),
+                        await runtime_client.publish(
+                            message=UserRequest(context=[UserMessage(content=message_content, source="User")],
+                                                correlation_id=correlation_id),
                             topic_id=topic_id,
                         )
                     else:
                         print(f"@对象名无效，请检查输入")
                         raise HTTPException(status_code=400, detail="Invalid agent name")
             else:
-                await self.runtime.publish_message(
-                    message=UserRequest(context=[UserMessage(content=content, source="User")]),
-                    topic_id=user_topic_id,
+                await runtime_client.publish(
+                    message=UserRequest(context=[UserMessage(content=content, source="User")],
+                                        correlation_id=correlation_id,
+                                        remember=session_id != ANONYMOUS_SESSION),
+                    topic_id=runtime_client.user_topic_id(session_id),
                 )
         except Exception as e:
             print(f"处理消息时出错: {e}")
             raise HTTPException(status_code=500, detail=f"{e}")
-        finally:
-            await self.runtime.stop()
 
-    async def traffic_analysis(self,college_id:int,user_id:int,db_session:Session)->str:
-        college = db_session.get(CollegeModel, college_id)
+    async def traffic_analysis(self,college_id:int,user_id:int,db_session: AsyncSession)->str:
+        college = await db_session.get(CollegeModel, college_id)
         try:
             if not college:
                 raise HTTPException(status_code=404, detail="College not found")
             college_location = f"{college.longitude},{college.latitude}"
 
             from Server.fast_api.services import UserService
-            user = UserService().get_user_by_id(user_id, db_session)
+            user = await UserService().get_user_by_id(user_id, db_session)
             user_location = user.location
 
             from Server.agents.toolbox import plan_transit_route
-            route_data = plan_transit_route(origin=user_location,
-                                            destination=college_location,
-                                            city=user.city,
-                                            cityd=str(college.city))
+            route_data = await asyncio.to_thread(plan_transit_route,
+                                                 origin=user_location,
+                                                 destination=college_location,
+                                                 city=user.city,
+                                                 cityd=str(college.city))
             
             # 删除返回数据中的segments字段
             # if "route" in route_data and "transits" in route_data["route"]:
@@ -77,8 +92,8 @@ class ServerService(BaseService):
         except Exception as e:
             raise ValueError(f"Failed to plan transit route: {e}")
 
-    async def climate_analysis(self,college_id:int,user_id:int,db_session:Session)->str:
-        college = db_session.get(CollegeModel, college_id)
+    async def climate_analysis(self,college_id:int,user_id:int,db_session: AsyncSession)->str:
+        college = await db_session.get(CollegeModel, college_id)
         try:
             if not college:
                 raise HTTPException(status_code=404, detail="College not found")
@@ -88,15 +103,8 @@ class ServerService(BaseService):
             if hasattr(college_city_admin_code, '__get__'):
                 college_city_admin_code = college_city_admin_code.__get__(college, type(college))
             
-            from Server.fast_api.services import ClimateService
-            college_climate = ClimateService().get_climate_by_id(college_city_admin_code, db_session)
-            # 添加对college_climate为None的检查
-            if college_climate :
-                college_climate = json.dumps(college_climate.serialize(),ensure_ascii=False)
-                print(college_climate)
-
             from Server.fast_api.services import UserService
-            user = UserService().get_user_by_id(user_id, db_session)
+            user = await UserService().get_user_by_id(user_id, db_session)
             user_province = user.province
             user_city = user.city
             user_adcode = user.adcode
@@ -104,21 +112,32 @@ class ServerService(BaseService):
                 user_adcode = user_adcode.__get__(user, type(user))
 
             user_adcode = user_adcode // 10 *10
-            user_climate = ClimateService().get_climate_by_id(user_adcode, db_session)
-            # 添加对user_climate为None的检查
-            if user_climate:
-                user_climate = json.dumps(user_climate.serialize(),ensure_ascii=False)
-                print(user_climate)
-
+            # 只提供两地的气候摘要与差值，而不是逐月原始数据
+            from Server.fast_api.services import ClimateService
+            climate_summary = await ClimateService().get_climate_summary(user_adcode, college_city_admin_code, db_session)
+            climate_summary = json.dumps(climate_summary, ensure_ascii=False) if climate_summary else "暂无两地的气候数据"
 
             prompt=f"""
             我是{user_province}省{user_city}的高考生，我想去{college_province}省{college_city}的{college.name}大学，请帮我比较两地的气候差异，并给出比较结果。
-            以下是两地的气候信息，包括三年的逐月平均气温与降水量：
-            # {college_city}的气候信息：
-            {college_climate}
-            # {user_city}的气候信息：
-            {user_climate}
+            以下是两地气候的统计摘要（按日历月份多年平均）：summary 为{user_city}，other_summary 为{college_city}，
+            delta 为{college_city}减去{user_city}的差值（monthly 为 1-12 月逐月差值）；
+            mean 为年平均，min/max 为最低/最高月均值，amplitude 为季节振幅，total 为年降水总量：
+            {climate_summary}
             """
             return prompt
         except Exception as e:
-            raise ValueError(f"Failed to analyze climate data: {e}")
\ No newline at end of file
+            raise ValueError(f"Failed to analyze climate data: {e}")
+
+    @staticmethod
+    async def get_metrics():
+        """
+        连接池、高校目录缓存、大模型回答缓存、高德接口、智能体运行时连接与对话响应通道的运行指标
+        """
+        return {
+            "database": get_pool_stats(),
+            "college_cache": college_cache.stats(),
+            "llm_cache": llm_cache.stats(),
+            "amap": amap_client.stats(),
+            "agent_runtime": runtime_client.stats(),
+            "result_channels": result_channels.stats(),
+        }
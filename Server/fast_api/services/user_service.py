@@ -1,33 +1,37 @@
 from Server.fast_api.services import BaseService
 from sqlalchemy import Select
 from Server.fast_api.model import UserModel
-from Server.fast_api.resources import Session, get_db_session
+from sqlalchemy.ext.asyncio import AsyncSession
+from Server.fast_api.resources import get_db_session
+from Server.fast_api.common.pagination import PageSpec, Page, paginate_query
+import asyncio
 import hashlib
 from Server.agents.toolbox import get_geo_info
 
 
 class UserService(BaseService):
-    def login(self, username: str, password: str, db_session: Session):
+    async def login(self, username: str, password: str, db_session: AsyncSession):
         # 对密码进行哈希处理后再比较
         hashed_password = hashlib.sha256(password.encode('utf-8')).hexdigest()
         query = Select(UserModel).where(UserModel.username == username)
-        user_model = db_session.execute(query).scalars().first()
+        user_model = (await db_session.execute(query)).scalars().first()
         if user_model and user_model.password == hashed_password:
             return user_model
         else:
             return None
 
-    def register(self, username: str, password: str, province: str, city: str, address: str, db_session: Session):
+    async def register(self, username: str, password: str, province: str, city: str, address: str, db_session: AsyncSession):
         # 检查用户名是否已存在
         query = Select(UserModel).where(UserModel.username == username)
-        existing_user = db_session.execute(query).scalars().first()
+        existing_user = (await db_session.execute(query)).scalars().first()
         if existing_user:
             raise ValueError("Username already exists")
 
         # 对密码进行哈希处理
         hashed_password = hashlib.sha256(password.encode('utf-8')).hexdigest()
         try:
-            result = get_geo_info(address, city)
+            # 高德接口为同步请求，放到线程中执行避免阻塞事件循环
+            result = await asyncio.to_thread(get_geo_info, address, city)
             geo_info = result.get("geocodes")
             location = geo_info[0].get("location")
             adcode = int(geo_info[0].get("adcode"))
@@ -50,22 +54,28 @@ class UserService(BaseService):
         )
 
         db_session.add(new_user)
-        db_session.commit()
-        db_session.refresh(new_user)
+        await db_session.commit()
+        await db_session.refresh(new_user)
         return new_user
 
-    def get_user_by_id(self, user_id: int, db_session: Session):
+    async def get_user_by_id(self, user_id: int, db_session: AsyncSession):
         """
         根据用户ID获取用户信息
         """
         query = Select(UserModel).where(UserModel.user_id == user_id)
-        user_model = db_session.execute(query).scalars().first()
+        user_model = (await db_session.execute(query)).scalars().first()
         return user_model
 
-    def get_all_users(self, db_session: Session):
+    async def get_all_users(self, db_session: AsyncSession):
         """
         获取所有用户信息
         """
         query = Select(UserModel)
-        users = db_session.execute(query).scalars().all()
-        return users
\ No newline at end of file
+        users = (await db_session.execute(query)).scalars().all()
+        return users
+
+    async def list_users(self, page: PageSpec, db_session: AsyncSession) -> Page:
+        """
+        分页、排序、字段投影获取用户信息
+        """
+        return await paginate_query(db_session, UserModel, page)
\ No newline at end of file
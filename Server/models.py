@@ -1,8 +1,7 @@
 from autogen_ext.models.openai import OpenAIChatCompletionClient
 import os
 import json
-with open('config.json','r',encoding='utf-8') as f:
-    config=json.load(f)
+from Server.fast_api.common.config import config
 def get_model_client() -> OpenAIChatCompletionClient:  # type: ignore
     return OpenAIChatCompletionClient(
         model=config['model']['name'],
@@ -1,6 +1,8 @@
 import os
+import argparse
 import asyncio
 import json
+import multiprocessing
 from typing import List
 from colorama import Fore, init
 init(autoreset=True)
@@ -11,6 +13,7 @@ from agents import Commander
 from agents.messages import *
 from prompts import *
 from agents.toolbox import tool_box_for_agent
+from agents.memory import ConversationMemory, default_memory
 from autogen_core.models import (UserMessage)
 from autogen_core import (
     MessageContext,
@@ -19,34 +22,50 @@ from autogen_core import (
     ClosureAgent,
     ClosureContext,
 )
-from Server.fast_api.common import SERVER_URL,result_queue
+from Server.fast_api.common import SERVER_URL
+from Server.fast_api.common.channels import deliver_response
 
-runtime_closure = GrpcWorkerAgentRuntime(host_address="localhost:50051")
 CLOSURE_AGENT_TYPE = "collect_result_agent"
 
 with open('config.json','r',encoding='utf-8') as f:
     config=json.load(f)
 
+runtime_config = config.get('agent_runtime', {})
+HOST_ADDRESS = runtime_config.get('host_address', 'localhost:50051')
+# Commander 工作进程数（分片数），接口进程按会话 ID 的哈希选择分片，两边必须使用同一配置
+COMMANDER_SHARDS = max(1, runtime_config.get('commander_shards', 1))
+API_WORKERS = runtime_config.get('api_workers', 1)
+API_PORT = 8080
+
+runtime_closure = GrpcWorkerAgentRuntime(host_address=HOST_ADDRESS)
+
 async def collect_result(_agent: ClosureContext, message: AgentResponse, ctx: MessageContext)->None:
-    context=message.context
-    for msg in context:
-        if msg.type=="UserMessage":
-            print(f"{str(msg.source).center(60, '=')}\n{msg.content}\n")
-            await result_queue.put({"Sender": msg.source,"Content": msg.content})
-        elif msg.type == 'AssistantMessage':
-            # 如果 content 是 FunctionCall 列表，进一步解析
-            if isinstance(msg.content, list):
-                for func_call in msg.content:
-                    print(f"{Fore.BLUE}{str(msg.source).center(60, '=')}\n工具ID：{func_call.id}\n工具名称：{func_call.name}\n工具参数：{func_call.arguments}\n")
-                    response=f"工具ID：{func_call.id}\n工具名称：{func_call.name}\n工具参数：{func_call.arguments}"
-                    await result_queue.put({"Sender": msg.source,"Content": response }  )
-            elif isinstance(msg.content, str):
-                print(f"{str(msg.source).center(60, '=')}\n {msg.content}\n")
-                await result_queue.put({"Sender": msg.source, "Content": msg.content})
-        elif msg.type == 'FunctionExecutionResultMessage':
-            pass
-        else:
-            raise Exception(f"未知消息类型:{msg.type}")
+    # 打印未指定响应主题的消息；接口发起的请求由各接口进程自己的响应收集智能体接收
+    for msg in message.context:
+        if msg.type == 'AssistantMessage' and isinstance(msg.content, list):
+            for func_call in msg.content:
+                print(f"{Fore.BLUE}{str(msg.source).center(60, '=')}\n工具ID：{func_call.id}\n工具名称：{func_call.name}\n工具参数：{func_call.arguments}\n")
+        elif isinstance(msg.content, str) and not message.chunk:
+            print(f"{str(msg.source).center(60, '=')}\n {msg.content}\n")
+    deliver_response(message)
+
+# 空闲智能体实例的检查间隔（秒）
+AGENT_EVICT_INTERVAL = 60
+_background_tasks = set()
+
+async def evict_idle_agents(runtime: GrpcWorkerAgentRuntime, agent_name: str, memory: ConversationMemory) -> None:
+    """
+    运行时按会话创建智能体实例且从不释放：会话记忆因空闲或数量上限被淘汰后，同时释放该会话的实例。
+    运行时没有公开的释放接口，只能从其实例表中移除，下次收到该会话的消息时会重新创建
+    """
+    while True:
+        await asyncio.sleep(AGENT_EVICT_INTERVAL)
+        instances = getattr(runtime, "_instantiated_agents", None)
+        if instances is None:
+            return
+        for agent_id in [agent_id for agent_id in instances
+                         if agent_id.type == agent_name and agent_id.key not in memory]:
+            instances.pop(agent_id, None)
 
 def create_subscriptions(subs: List[dict]) -> List[TypeSubscription]:
     return [TypeSubscription(topic_type=sub["topic_type"], agent_type=sub["agent_type"]) for sub in subs]
@@ -60,50 +79,71 @@ async def worker_runtime(
     subscriptions: List[dict],
     message_serializer_types: list,
 ) -> GrpcWorkerAgentRuntime:
-    runtime = GrpcWorkerAgentRuntime(host_address="localhost:50051")
+    runtime = GrpcWorkerAgentRuntime(host_address=HOST_ADDRESS)
     for msg in message_serializer_types:
         runtime.add_message_serializer(try_get_known_serializers_for_type(msg))
     await runtime.start()
 
+    # 同类型的所有会话实例共用一份会话记忆，按会话 ID 区分，空闲淘汰与数量上限才能生效
+    memory = default_memory()
     agent_instance = lambda: globals()[agent_type](
         description=agent_name,
         model_client=model_client,
         tools=tools,
         delegate_tools=delegate_tools,
-        system_message=system_message
+        system_message=system_message,
+        memory=memory,
     )
 
     await globals()[agent_type].register(runtime, agent_name, agent_instance)
+    task = asyncio.create_task(evict_idle_agents(runtime, agent_name, memory))
+    _background_tasks.add(task)
+    task.add_done_callback(_background_tasks.discard)
 
     for sub in create_subscriptions(subscriptions):
         await runtime.add_subscription(sub)
 
     return runtime
 
-async def mas_main() -> None:
-    service = GrpcWorkerAgentRuntimeHost(address="localhost:50051")
-    service.start()
-    model_client = models.model
-    tool_list=tool_box_for_agent
-    agent_type={
-        "Commander":"Commander",
-    }
-    runtime_commander = await worker_runtime(
-        agent_type=agent_type["Commander"],
-        agent_name=agent_type["Commander"],
-        model_client=model_client,
-        tools=tool_list,
+async def commander_runtime(shard: int = 0, shards: int = 1) -> GrpcWorkerAgentRuntime:
+    """
+    一个 Commander 分片的运行时：只订阅本分片的用户主题，多个分片时智能体类型为 "Commander.<分片>"
+    """
+    agent_name = "Commander" if shards <= 1 else f"Commander.{shard}"
+    return await worker_runtime(
+        agent_type="Commander",
+        agent_name=agent_name,
+        model_client=models.model,
+        tools=tool_box_for_agent,
         delegate_tools=[],
         system_message=commander_prompt,
         message_serializer_types=MESSAGES,
         subscriptions=[
             {
-                "topic_type": USER_TOPIC_TYPE,
-                "agent_type": agent_type["Commander"],
+                "topic_type": shard_topic_type(USER_TOPIC_TYPE, shard, shards),
+                "agent_type": agent_name,
             },
         ]
     )
 
+async def wait_for_shutdown(*runtimes) -> None:
+    try:
+        # Wait for the service to stop
+        if os.name == "nt":
+            # On Windows, the signal is not available, so we wait for a new event
+            await asyncio.Event().wait()
+        else:
+            for runtime in runtimes:
+                await runtime.stop_when_signal()
+    except KeyboardInterrupt:
+        print("Stopping service...")
+
+async def mas_main() -> None:
+    # 单进程模式：gRPC 主机与全部 Commander 分片在同一进程内
+    service = GrpcWorkerAgentRuntimeHost(address=HOST_ADDRESS)
+    service.start()
+    runtime_commanders = [await commander_runtime(shard, COMMANDER_SHARDS) for shard in range(COMMANDER_SHARDS)]
+
     runtime_closure.add_message_serializer(try_get_known_serializers_for_type(AgentResponse))
     runtime_closure.add_message_serializer(try_get_known_serializers_for_type(UserRequest))
     await runtime_closure.start()
@@ -116,18 +156,47 @@ async def mas_main() -> None:
     )
 
     try:
-        # Wait for the service to stop
-        if os.name == "nt":
-            # On Windows, the signal is not available, so we wait for a new event
-            await asyncio.Event().wait()
-        else:
-            await runtime_closure.stop_when_signal()
-            await runtime_commander.stop_when_signal()
-            await service.stop_when_signal()
-    except KeyboardInterrupt:
-        print("Stopping service...")
+        await wait_for_shutdown(runtime_closure, *runtime_commanders, service)
+    finally:
+        await service.stop()
+
+async def host_main() -> None:
+    # 只运行 gRPC 主机，负责在接口进程与 Commander 工作进程之间转发消息
+    service = GrpcWorkerAgentRuntimeHost(address=HOST_ADDRESS)
+    service.start()
+    print(f"gRPC 主机已启动: {HOST_ADDRESS}")
+    try:
+        await wait_for_shutdown(service)
     finally:
         await service.stop()
+
+async def commander_main(shard: int, shards: int) -> None:
+    runtime = await commander_runtime(shard, shards)
+    print(f"Commander 分片 {shard}/{shards} 已连接到 {HOST_ADDRESS}")
+    await wait_for_shutdown(runtime)
+
+def run_commander(shard: int, shards: int) -> None:
+    asyncio.run(commander_main(shard, shards))
+
+def run_commanders(shards: int, shard: int = None) -> None:
+    """
+    启动 Commander 工作进程：指定 shard 时只运行该分片，否则每个分片一个进程
+    """
+    if shard is not None:
+        run_commander(shard, shards)
+        return
+    processes = [multiprocessing.Process(target=run_commander, args=(i, shards), name=f"Commander.{i}")
+                 for i in range(shards)]
+    for process in processes:
+        process.start()
+    for process in processes:
+        process.join()
+
+def run_api(workers: int, port: int) -> None:
+    import uvicorn
+    # 多个 worker 进程，各自连接 gRPC 主机并通过自己的响应主题接收结果
+    uvicorn.run("Server.fast_api.resources:app", host="0.0.0.0", port=port, workers=workers)
+
 async def run_both():
     import uvicorn
     # 在一个事件循环中同时运行两个服务
@@ -135,7 +204,7 @@ async def run_both():
         config=uvicorn.Config(
             app="Server.fast_api.resources:app",
             host="0.0.0.0",
-            port=8080,
+            port=API_PORT,
             reload=True
         )
     )
@@ -144,6 +213,26 @@ async def run_both():
         mas_main()
     )
 
-if __name__ == "__main__":
-    asyncio.run(run_both())
+def parse_args():
+    parser = argparse.ArgumentParser(description="启动服务。不带参数时在单个进程中运行接口、gRPC 主机与 Commander；"
+                                                 "生产部署依次启动 host、agents、api 三类进程")
+    subparsers = parser.add_subparsers(dest="role")
+    subparsers.add_parser("all", help="单进程运行全部服务（默认）")
+    subparsers.add_parser("host", help="只运行 gRPC 主机")
+    agents_parser = subparsers.add_parser("agents", help="运行 Commander 工作进程，每个分片一个进程")
+    agents_parser.add_argument("--shard", type=int, default=None, help="只运行指定分片（多机部署时使用）")
+    api_parser = subparsers.add_parser("api", help="运行接口进程")
+    api_parser.add_argument("--workers", type=int, default=API_WORKERS, help="uvicorn worker 进程数")
+    api_parser.add_argument("--port", type=int, default=API_PORT)
+    return parser.parse_args()
 
+if __name__ == "__main__":
+    args = parse_args()
+    if args.role == "host":
+        asyncio.run(host_main())
+    elif args.role == "agents":
+        run_commanders(COMMANDER_SHARDS, args.shard)
+    elif args.role == "api":
+        run_api(args.workers, args.port)
+    else:
+        asyncio.run(run_both())
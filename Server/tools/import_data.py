@@ -0,0 +1,555 @@
+"""
+数据导入（替代 data/import_geo_data.sh + ogr2ogr）
+
+用法（在仓库根目录下）:
+    python -m Server.tools.import_data                       # 导入 data/ 下全部数据
+    python -m Server.tools.import_data --only college,climate --truncate --batch-size 2000
+
+- college.gpkg / admindivision.gpkg 本身是 SQLite 数据库，直接读取并解码 GeoPackage 几何 blob
+- evaluation.xlsx 用 zipfile + iterparse 逐行读取；climate.xls（BIFF 格式）需要安装 xlrd
+- 每张表按批次 executemany 写入，输出进度与吞吐量
+- 导入高校时按经纬度与行政区划多边形做空间归属，写入 admin_code；
+  --assign-admin-codes 可对库中已有高校重新计算
+- 导入行政区划后预计算各分辨率的化简几何（AdminDivisionShape）；--simplify 可单独重建
+- 气候数据按 (区划, 月份, 指标) 写入长表 ClimateValue；--migrate-climate 可转换原宽表 ClimateData
+- 缺少的数据表按模型定义建立（CREATE TABLE IF NOT EXISTS），可直接导入新建的空库
+"""
+import argparse
+import os
+import sqlite3
+import sys
+import time
+import zipfile
+from typing import Callable, Dict, Iterator, List, Optional, Tuple
+from xml.etree.ElementTree import iterparse
+
+from sqlalchemy import bindparam, delete, func, insert, select, update
+
+from Server.fast_api.common.climate import wide_to_long
+from Server.fast_api.common.geometry import geometry_column, gpkg_to_wkb, gpkg_to_wkt, read_wkb, to_geometry
+from Server.fast_api.common.spatial import AdminDivisionLocator
+
+DATA_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))), 'data')
+SRID = 4326
+
+_XLSX_NS = '{http://schemas.openxmlformats.org/spreadsheetml/2006/main}'
+_REL_NS = '{http://schemas.openxmlformats.org/officeDocument/2006/relationships}'
+_PKG_REL_NS = '{http://schemas.openxmlformats.org/package/2006/relationships}'
+
+
+# ---------------------------------------------------------------- 读取
+
+def iter_gpkg(path: str, table: Optional[str] = None, decode: Callable = gpkg_to_wkt) -> Iterator[dict]:
+    """
+    逐行读取 GeoPackage 要素表，几何列默认转换为 WKT
+    :param table: 要素表名，默认取 gpkg_geometry_columns 中的第一张
+    :param decode: 几何 blob 的解码函数
+    """
+    connection = sqlite3.connect(f"file:{path}?mode=ro", uri=True)
+    connection.row_factory = sqlite3.Row
+    try:
+        query = "SELECT table_name, column_name FROM gpkg_geometry_columns"
+        geometry_columns = dict(connection.execute(query).fetchall())
+        if table is None:
+            table = next(iter(geometry_columns))
+        geometry_column = geometry_columns[table]
+        for row in connection.execute(f'SELECT * FROM "{table}"'):
+            record = dict(row)
+            blob = record.get(geometry_column)
+            record[geometry_column] = decode(blob) if blob else None
+            yield record
+    finally:
+        connection.close()
+
+
+def _column_index(reference: str) -> int:
+    index = 0
+    for char in reference:
+        if not char.isalpha():
+            break
+        index = index * 26 + ord(char.upper()) - ord('A') + 1
+    return index - 1
+
+
+def _xlsx_text(element) -> str:
+    # 富文本由多个 <r><t> 组成；<rPh> 为注音，不计入文本
+    parts = []
+    for child in element:
+        if child.tag == _XLSX_NS + 't':
+            parts.append(child.text or '')
+        elif child.tag == _XLSX_NS + 'r':
+            parts.extend(t.text or '' for t in child.iter(_XLSX_NS + 't'))
+    return ''.join(parts)
+
+
+def _xlsx_number(text: str):
+    value = float(text)
+    return int(value) if value.is_integer() and 'E' not in text.upper() else value
+
+
+def iter_xlsx(path: str) -> Iterator[list]:
+    """
+    逐行读取 xlsx 第一个工作表，返回单元格值列表
+    """
+    with zipfile.ZipFile(path) as archive:
+        names = set(archive.namelist())
+        shared_strings = []
+        if 'xl/sharedStrings.xml' in names:
+            with archive.open('xl/sharedStrings.xml') as f:
+                for _, element in iterparse(f):
+                    if element.tag == _XLSX_NS + 'si':
+                        shared_strings.append(_xlsx_text(element))
+                        element.clear()
+
+        # workbook.xml 中第一个 sheet 的 r:id -> workbook.xml.rels 中的文件路径
+        with archive.open('xl/workbook.xml') as f:
+            sheet_rel = next(element.get(_REL_NS + 'id') for _, element in iterparse(f)
+                             if element.tag == _XLSX_NS + 'sheet')
+        with archive.open('xl/_rels/workbook.xml.rels') as f:
+            target = next(element.get('Target') for _, element in iterparse(f)
+                          if element.tag == _PKG_REL_NS + 'Relationship' and element.get('Id') == sheet_rel)
+        sheet_path = target.lstrip('/') if target.startswith('/') else f"xl/{target}"
+
+        with archive.open(sheet_path) as f:
+            for _, element in iterparse(f):
+                if element.tag != _XLSX_NS + 'row':
+                    continue
+                values = []
+                for cell in element.iter(_XLSX_NS + 'c'):
+                    reference = cell.get('r')
+                    index = _column_index(reference) if reference else len(values)
+                    values.extend([None] * (index - len(values)))
+                    cell_type = cell.get('t')
+                    value_element = cell.find(_XLSX_NS + 'v')
+                    text = value_element.text if value_element is not None else None
+                    if cell_type == 'inlineStr':
+                        inline = cell.find(_XLSX_NS + 'is')
+                        value = _xlsx_text(inline) if inline is not None else None
+                    elif text is None:
+                        value = None
+                    elif cell_type == 's':
+                        value = shared_strings[int(text)]
+                    elif cell_type == 'b':
+                        value = text == '1'
+                    elif cell_type in ('str', 'e'):
+                        value = text
+                    else:
+                        value = _xlsx_number(text)
+                    values.append(value)
+                element.clear()
+                yield values
+
+
+def iter_xls(path: str) -> Iterator[list]:
+    """
+    逐行读取 xls（BIFF）第一个工作表，依赖可选的 xlrd
+    """
+    try:
+        import xlrd
+    except ImportError:
+        raise SystemExit("读取 .xls 文件需要安装 xlrd: pip install xlrd")
+    book = xlrd.open_workbook(path, on_demand=True)
+    try:
+        sheet = book.sheet_by_index(0)
+        for row in sheet.get_rows():
+            yield [None if cell.ctype in (xlrd.XL_CELL_EMPTY, xlrd.XL_CELL_BLANK) else cell.value for cell in row]
+    finally:
+        book.release_resources()
+
+
+def iter_sheet(path: str) -> Iterator[dict]:
+    """
+    按首行表头将工作表的每一行转换为 dict
+    """
+    rows = iter_xls(path) if path.lower().endswith('.xls') else iter_xlsx(path)
+    header = None
+    for values in rows:
+        if header is None:
+            header = [str(name).strip() if name is not None else '' for name in values]
+            continue
+        if all(value is None or value == '' for value in values):
+            continue
+        yield dict(zip(header, values))
+
+
+# ---------------------------------------------------------------- 字段映射
+# 映射函数返回目标表的一行，或 (None, 跳过原因)
+
+def _code(value) -> Optional[str]:
+    # Excel 中的编码常被存成浮点数，如 110000.0
+    if value is None or value == '':
+        return None
+    if isinstance(value, float) and value.is_integer():
+        value = int(value)
+    return str(value).strip()
+
+
+def _flag(value) -> int:
+    return 1 if value not in (None, '', 0, '0') and float(value) else 0
+
+
+def college_row_mapper(locator: Optional[AdminDivisionLocator]):
+    def college_row(record: dict):
+        row, reason = _college_row(record)
+        if row is not None and locator is not None:
+            row['admin_code'] = locator.locate(row['longitude'], row['latitude'])
+        return row, reason
+
+    return college_row
+
+
+def _college_row(record: dict):
+    college_id = _code(record.get('院校ID'))
+    if not record.get('Shape'):
+        return None, "缺少几何数据"
+    return {
+        # 部分高校缺少院校ID，以 OBJECTID 代替，保证主键非空
+        'college_id': int(college_id) if college_id else record['OBJECTID'],
+        'OBJECTID': record['OBJECTID'],
+        'shape_wkt': record['Shape'],
+        'province': record.get('省份'),
+        'name': record.get('名称'),
+        'category': record.get('专业类别') or None,
+        'nature': record.get('办学性质') or None,
+        'type': record.get('学校类型') or None,
+        'is_985': _flag(record.get('F985高校')),
+        'is_211': _flag(record.get('F211院校')),
+        'is_double_first': _flag(record.get('双一流')),
+        'city': record.get('城市') or None,
+        'affiliation': record.get('隶属') or None,
+        'address': record.get('地址') or None,
+        'longitude': record.get('经度'),
+        'latitude': record.get('纬度'),
+        'admin_code': None,
+    }, None
+
+
+def admin_row(record: dict):
+    admin_code = _code(record.get('gb'))
+    if not admin_code:
+        return None, "缺少行政区划代码"
+    if not record.get('Shape'):
+        return None, "缺少几何数据"
+    return {
+        'admin_code': admin_code,
+        'OBJECTID': record['OBJECTID'],
+        'shape_wkt': record['Shape'],
+        'name': record.get('name'),
+    }, None
+
+
+def climate_rows(record: dict):
+    # 表头 202201_avg_temp -> 长表 (admin_code, 202201, avg_temp, 数值)，一行拆为多条，空值与非气候列忽略
+    admin_code = _code(record.get('admin_code'))
+    if not admin_code:
+        return None, "缺少行政区划代码"
+    return [{'admin_code': code, 'month': month, 'metric': metric, 'value': value}
+            for code, month, metric, value in wide_to_long(record, admin_code)], None
+
+
+def evaluation_row(record: dict):
+    evaluation_id = _code(record.get('evaluation_id'))
+    if not evaluation_id:
+        return None, "缺少评价ID"
+    user_id = _code(record.get('user_id'))
+    return {
+        'evaluation_id': int(evaluation_id),
+        'college_id': _code(record.get('college_id')),
+        'user_id': int(user_id) if user_id else None,
+        'Dietary_evaluation': record.get('Dietary_evaluation'),
+        'Traffic_evaluation': record.get('Traffic_evaluation'),
+        'Evaluation': record.get('Evaluation'),
+    }, None
+
+
+# ---------------------------------------------------------------- 写入
+
+class Progress:
+    """
+    导入进度与吞吐量统计
+    """
+
+    def __init__(self, name: str, every: int):
+        self.name = name
+        self.every = every
+        self.read = 0
+        self.inserted = 0
+        self.skipped: Dict[str, int] = {}
+        self.start = time.perf_counter()
+        self._next_report = every
+
+    @property
+    def elapsed(self) -> float:
+        return time.perf_counter() - self.start
+
+    def skip(self, reason: str):
+        self.skipped[reason] = self.skipped.get(reason, 0) + 1
+
+    def add(self, count: int):
+        self.inserted += count
+        if self.every and self.inserted >= self._next_report:
+            self._next_report += self.every
+            print(f"[{self.name}] 已写入 {self.inserted} 行，{self.elapsed:.1f}s，"
+                  f"{self.inserted / self.elapsed:.0f} 行/秒", file=sys.stderr)
+
+    def summary(self) -> str:
+        skipped = sum(self.skipped.values())
+        details = "，".join(f"{reason} {count}" for reason, count in self.skipped.items())
+        return (f"[{self.name}] 读取 {self.read} 行，写入 {self.inserted} 行，跳过 {skipped} 行"
+                f"{f'（{details}）' if details else ''}，耗时 {self.elapsed:.2f}s，"
+                f"{self.inserted / self.elapsed if self.elapsed else 0:.0f} 行/秒")
+
+
+def load_table(engine, name: str, table, records: Iterator[dict], mapper, batch_size: int,
+               truncate: bool = False, progress_every: int = 5000) -> Progress:
+    """
+    将记录映射后按批次写入数据表，整张表在一个事务中完成
+    """
+    progress = Progress(name, progress_every)
+    statement = insert(table)
+    geometry = 'shape' in table.c
+    if geometry and engine.dialect.name == 'mysql':
+        # GeoPackage 坐标为 经度/纬度 顺序，需显式指定，否则 MySQL 8 对 4326 按 纬度/经度 解析
+        statement = statement.values(shape=func.ST_GeomFromText(bindparam('shape_wkt'), SRID, 'axis-order=long-lat'))
+
+    with engine.begin() as connection:
+        if truncate:
+            connection.execute(delete(table))
+        batch = []
+        for record in records:
+            progress.read += 1
+            row, reason = mapper(record)
+            if row is None:
+                progress.skip(reason)
+                continue
+            if isinstance(row, list):
+                # 宽表一行对应长表多行
+                batch.extend(row)
+            else:
+                if geometry and engine.dialect.name != 'mysql':
+                    row['shape'] = row.pop('shape_wkt')
+                batch.append(row)
+            if len(batch) >= batch_size:
+                connection.execute(statement, batch)
+                progress.add(len(batch))
+                batch = []
+        if batch:
+            connection.execute(statement, batch)
+            progress.add(len(batch))
+    return progress
+
+
+def build_locator(engine, data_dir: str) -> AdminDivisionLocator:
+    """
+    行政区划空间索引：优先读取 admindivision.gpkg，不存在时读取数据库中的行政区划
+    """
+    path = os.path.join(data_dir, 'admindivision.gpkg')
+    if os.path.exists(path):
+        decode = lambda blob: read_wkb(gpkg_to_wkb(blob)[1])
+        return AdminDivisionLocator((_code(record.get('gb')), record['Shape'])
+                                    for record in iter_gpkg(path, decode=decode) if record.get('Shape'))
+
+    from Server.fast_api.model import AdminDivisionModel
+    shape = geometry_column(AdminDivisionModel.shape, engine.dialect.name)
+    with engine.connect() as connection:
+        return AdminDivisionLocator(connection.execute(select(AdminDivisionModel.admin_code, shape)).all())
+
+
+def assign_admin_codes(engine, locator: AdminDivisionLocator, only_missing: bool = False) -> str:
+    """
+    对库中已有高校按经纬度重新计算 admin_code，只更新发生变化的行
+    """
+    from Server.fast_api.model import CollegeModel
+
+    start = time.perf_counter()
+    table = CollegeModel.__table__
+    with engine.begin() as connection:
+        colleges = connection.execute(
+            select(table.c.college_id, table.c.longitude, table.c.latitude, table.c.admin_code)).all()
+        changes = []
+        unresolved = 0
+        for college_id, longitude, latitude, admin_code in colleges:
+            if only_missing and admin_code:
+                continue
+            located = locator.locate(longitude, latitude)
+            if located is None:
+                unresolved += 1
+            elif located != admin_code:
+                changes.append({'b_college_id': college_id, 'b_admin_code': located})
+        if changes:
+            connection.execute(update(table).where(table.c.college_id == bindparam('b_college_id'))
+                               .values(admin_code=bindparam('b_admin_code')), changes)
+    elapsed = time.perf_counter() - start
+    return (f"[admin_code] 高校 {len(colleges)} 所，更新 {len(changes)} 所，未落入任何行政区划 {unresolved} 所，"
+            f"耗时 {elapsed:.2f}s")
+
+
+def build_admin_shapes(engine, batch_size: int = 200) -> str:
+    """
+    由 AdminDivision 的原始几何重建全部化简几何
+    """
+    from Server.fast_api.model import AdminDivisionModel, AdminDivisionShapeModel
+    from Server.fast_api.services.admindivision_service import shape_rows
+
+    start = time.perf_counter()
+    shape = geometry_column(AdminDivisionModel.shape, engine.dialect.name)
+    table = AdminDivisionShapeModel.__table__
+    points = {}
+    with engine.begin() as connection:
+        divisions = connection.execute(select(AdminDivisionModel.admin_code, shape)).all()
+        connection.execute(delete(table))
+        batch = []
+        for admin_code, value in divisions:
+            if value is None:
+                continue
+            for row in shape_rows(admin_code, to_geometry(value)):
+                points[row['resolution']] = points.get(row['resolution'], 0) + row['point_count']
+                batch.append(row)
+            if len(batch) >= batch_size:
+                connection.execute(insert(table), batch)
+                batch = []
+        if batch:
+            connection.execute(insert(table), batch)
+    elapsed = time.perf_counter() - start
+    summary = '，'.join(f"{resolution} {count} 点" for resolution, count in points.items())
+    return f"[AdminDivisionShape] 区划 {len(divisions)} 个，{summary}，耗时 {elapsed:.2f}s"
+
+
+def migrate_climate(engine, batch_size: int = 5000) -> str:
+    """
+    将原宽表 ClimateData 转换写入长表 ClimateValue，长表中已有的区划跳过
+    """
+    from Server.fast_api.model import ClimateDataModel, ClimateValueModel
+
+    start = time.perf_counter()
+    wide = ClimateDataModel.__table__
+    table = ClimateValueModel.__table__
+    with engine.begin() as connection:
+        existing = set(connection.execute(select(table.c.admin_code).distinct()).scalars())
+        regions = 0
+        written = 0
+        batch = []
+        for record in connection.execute(select(wide)).mappings():
+            if record['admin_code'] in existing:
+                continue
+            regions += 1
+            batch.extend({'admin_code': code, 'month': month, 'metric': metric, 'value': value}
+                         for code, month, metric, value in wide_to_long(record, record['admin_code']))
+            if len(batch) >= batch_size:
+                connection.execute(insert(table), batch)
+                written += len(batch)
+                batch = []
+        if batch:
+            connection.execute(insert(table), batch)
+            written += len(batch)
+    elapsed = time.perf_counter() - start
+    return (f"[ClimateValue] 迁移区划 {regions} 个，写入 {written} 行，跳过已存在 {len(existing)} 个，"
+            f"耗时 {elapsed:.2f}s")
+
+
+# 数据集 -> 受影响的服务进程内缓存（CacheVersion 表中的名称）
+CACHE_NAMES = {'admindivision': ('admin_locator',), 'college': ('college',), 'climate': ('climate',)}
+
+
+def bump_cache_versions(engine, names) -> None:
+    """
+    递增缓存版本号，正在运行的服务进程下次检查时重新加载对应缓存
+    """
+    from Server.fast_api.model import CacheVersionModel
+
+    table = CacheVersionModel.__table__
+    with engine.begin() as connection:
+        for name in names:
+            increment = update(table).where(table.c.name == name).values(version=table.c.version + 1)
+            if connection.execute(increment).rowcount == 0:
+                connection.execute(insert(table).values(name=name, version=1))
+
+
+def datasets(data_dir: str, locator_factory: Callable[[], Optional[AdminDivisionLocator]]) \
+        -> Dict[str, Tuple[str, Callable[[str], Iterator[dict]], object, Callable]]:
+    """
+    名称 -> (文件, 读取函数, 数据表, 映射函数工厂)，按依赖顺序排列
+    映射函数在真正导入该数据集时才创建，未导入高校时不必构建行政区划索引
+    """
+    from Server.fast_api.model import AdminDivisionModel, ClimateValueModel, CollegeModel, EvaluationModel
+
+    return {
+        'admindivision': ('admindivision.gpkg', iter_gpkg, AdminDivisionModel.__table__, lambda: admin_row),
+        'college': ('college.gpkg', iter_gpkg, CollegeModel.__table__, lambda: college_row_mapper(locator_factory())),
+        'climate': ('climate.xls', iter_sheet, ClimateValueModel.__table__, lambda: climate_rows),
+        'evaluation': ('evaluation.xlsx', iter_sheet, EvaluationModel.__table__, lambda: evaluation_row),
+    }
+
+
+def main(argv: Optional[List[str]] = None):
+    parser = argparse.ArgumentParser(description="导入高校、行政区划、气候与评价数据")
+    parser.add_argument('--data-dir', default=DATA_DIR, help="数据文件所在目录")
+    parser.add_argument('--only', default=None, help="只导入指定数据集，逗号分隔：admindivision,college,climate,evaluation")
+    parser.add_argument('--batch-size', type=int, default=1000, help="每批写入的行数")
+    parser.add_argument('--truncate', action='store_true', help="导入前清空目标表")
+    parser.add_argument('--progress', type=int, default=5000, help="每写入多少行输出一次进度，0 表示不输出")
+    parser.add_argument('--no-admin-codes', action='store_true', help="导入高校时不计算所属行政区划")
+    parser.add_argument('--assign-admin-codes', choices=('all', 'missing'), default=None,
+                        help="只为库中已有高校重新计算 admin_code（all：全部，missing：仅空值），不导入文件")
+    parser.add_argument('--simplify', action='store_true', help="只重建行政区划的化简几何，不导入文件")
+    parser.add_argument('--migrate-climate', action='store_true',
+                        help="只将原宽表 ClimateData 转换为长表 ClimateValue，不导入文件")
+    args = parser.parse_args(argv)
+
+    from Server.fast_api.model import create_tables
+    from Server.fast_api.resources import engine
+
+    # 新建的空库上由导入脚本建表（原先由 ogr2ogr 建表），已存在的表不受影响
+    create_tables(engine)
+    locator = None
+
+    def locator_factory() -> Optional[AdminDivisionLocator]:
+        nonlocal locator
+        if locator is None and not args.no_admin_codes:
+            start = time.perf_counter()
+            locator = build_locator(engine, args.data_dir)
+            print(f"[admin_code] 行政区划索引：{len(locator)} 个区划，耗时 {time.perf_counter() - start:.2f}s")
+        return locator
+
+    if args.assign_admin_codes:
+        print(assign_admin_codes(engine, locator_factory() or build_locator(engine, args.data_dir),
+                                 only_missing=args.assign_admin_codes == 'missing'))
+        bump_cache_versions(engine, CACHE_NAMES['college'])
+        return
+
+    if args.simplify:
+        print(build_admin_shapes(engine))
+        return
+
+    if args.migrate_climate:
+        print(migrate_climate(engine))
+        bump_cache_versions(engine, CACHE_NAMES['climate'])
+        return
+
+    available = datasets(args.data_dir, locator_factory)
+    names = [name.strip() for name in args.only.split(',')] if args.only else list(available)
+    unknown = [name for name in names if name not in available]
+    if unknown:
+        parser.error(f"未知的数据集: {', '.join(unknown)}")
+
+    start = time.perf_counter()
+    total = 0
+    for name in names:
+        filename, reader, table, mapper_factory = available[name]
+        path = os.path.join(args.data_dir, filename)
+        if not os.path.exists(path):
+            print(f"[{name}] 文件不存在，跳过: {path}", file=sys.stderr)
+            continue
+        progress = load_table(engine, name, table, reader(path), mapper_factory(), args.batch_size,
+                              truncate=args.truncate, progress_every=args.progress)
+        total += progress.inserted
+        print(progress.summary())
+        if name == 'admindivision':
+            print(build_admin_shapes(engine))
+        bump_cache_versions(engine, CACHE_NAMES.get(name, ()))
+    elapsed = time.perf_counter() - start
+    print(f"全部完成：写入 {total} 行，耗时 {elapsed:.2f}s，{total / elapsed if elapsed else 0:.0f} 行/秒")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,76 @@
+"""
+接口并发压测
+
+用法（在仓库根目录下）:
+    python -m Server.tools.load_test --url "http://127.0.0.1:8080/colleges/search/?province=湖南" \
+        --requests 500 --concurrency 1,8,32,64
+
+对每个并发度发送相同数量的请求，输出吞吐量与延迟分位数；
+数据库访问不阻塞事件循环时，吞吐量应随并发度上升而不是停留在单并发水平。
+"""
+import argparse
+import asyncio
+import statistics
+import time
+from typing import List
+
+import httpx
+
+
+async def run_level(client: httpx.AsyncClient, url: str, total: int, concurrency: int) -> dict:
+    """
+    以固定并发度发送 total 个请求
+    """
+    latencies: List[float] = []
+    errors = 0
+    pending = iter(range(total))
+
+    async def worker():
+        nonlocal errors
+        # 所有 worker 共享同一个迭代器，请求总数恒为 total
+        for _ in pending:
+            start = time.perf_counter()
+            try:
+                response = await client.get(url)
+                response.raise_for_status()
+            except Exception:
+                errors += 1
+            latencies.append(time.perf_counter() - start)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - start
+
+    latencies.sort()
+    return {
+        "concurrency": concurrency,
+        "throughput": total / elapsed if elapsed else 0.0,
+        "p50_ms": statistics.median(latencies) * 1000,
+        "p95_ms": latencies[int(len(latencies) * 0.95) - 1] * 1000 if latencies else 0.0,
+        "errors": errors,
+    }
+
+
+async def main(url: str, total: int, levels: List[int], headers: dict):
+    limits = httpx.Limits(max_connections=max(levels), max_keepalive_connections=max(levels))
+    async with httpx.AsyncClient(timeout=30.0, limits=limits, headers=headers) as client:
+        # 预热：建立连接并填充服务端缓存
+        await run_level(client, url, min(total, 20), 1)
+        print(f"{'并发':>6} {'吞吐(req/s)':>12} {'P50(ms)':>10} {'P95(ms)':>10} {'错误':>6}")
+        for concurrency in levels:
+            result = await run_level(client, url, total, concurrency)
+            print(f"{result['concurrency']:>6} {result['throughput']:>12.1f} {result['p50_ms']:>10.2f} "
+                  f"{result['p95_ms']:>10.2f} {result['errors']:>6}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="接口并发压测")
+    parser.add_argument("--url", default="http://127.0.0.1:8080/colleges/", help="压测的接口地址（GET）")
+    parser.add_argument("--requests", type=int, default=200, help="每个并发度发送的请求数")
+    parser.add_argument("--concurrency", default="1,8,32", help="逗号分隔的并发度列表")
+    parser.add_argument("--token", default="", help="需要认证的接口使用的JWT")
+    args = parser.parse_args()
+
+    headers = {"Authorization": f"Bearer {args.token}"} if args.token else {}
+    levels = [int(level) for level in args.concurrency.split(',') if level.strip()]
+    asyncio.run(main(args.url, args.requests, levels, headers))